@@ -1,5 +1,5 @@
 from abc import ABC
-from typing import Callable, Any, Iterable, TypeVar
+from typing import Callable, Any, Iterable, TypeVar, Tuple
 from inspect import currentframe
 
 from .Logging import logger
@@ -49,7 +49,7 @@ class SQLType:
             return False
 
     def __hash__(self):
-        return hash((self.name, self.args))
+        return hash((self._name, self._args))
 
     def __repr__(self):
         return f'<SQLTYPE "{self.name}">'
@@ -62,6 +62,10 @@ class SQLType:
     def tags(self):
         return self._tags
 
+    @property
+    def caster(self) -> Callable[[Any], Any]:
+        return self._caster
+
     def cast(self, value):
         return self._caster(value)
 
@@ -127,6 +131,12 @@ class SQLCommand(ABC):
     def get_value(self, *args, **kwargs) -> str:
         raise NotImplementedError
 
+    def get_query(self) -> Tuple[str, tuple]:
+        """
+        The command with `%s` placeholders and the parameters to bind to them, without the trailing semicolon
+        """
+        return self.get_value().rstrip(';'), ()
+
 
 class SQLCommandExecutable(SQLCommand, ABC):
     _executed = False
@@ -142,6 +152,9 @@ class SQLCommandExecutable(SQLCommand, ABC):
     def execute(self, *args, **kwargs):
         raise NotImplementedError
 
+    async def execute_async(self, *args, **kwargs):
+        raise NotImplementedError
+
 
 def make_collection(value):
     return value if is_collection(value) else [value]
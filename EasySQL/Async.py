@@ -0,0 +1,219 @@
+import asyncio
+from contextlib import asynccontextmanager, nullcontext
+from logging import DEBUG
+from time import perf_counter, monotonic
+from typing import AsyncIterator, List, Tuple
+
+from .ABC import SQLCommandExecutable
+from .Classes import EasyDatabase, _ordinal, _Transaction, _REPLICA_ERRORS, _replica_unreachable
+from .Exceptions import DatabaseConnectionException
+from .Logging import logger
+from .Metrics import QueryEvent
+from .Pool import AsyncEasyConnectionPool, SQLResult
+
+__all__ = ['AsyncEasyDatabase']
+
+
+class AsyncEasyDatabase(EasyDatabase):
+    """
+    Database running the asynchronous commands on an asyncio connection pool
+
+    The synchronous API keeps working on its own pool, tables are still prepared synchronously when they are created.
+    Every driver call runs in a worker thread so the event loop is never blocked.
+    """
+
+    def __init__(self, *, _force=False):
+        super().__init__(_force=_force)
+
+        self._async_pool = AsyncEasyConnectionPool(self._connect_async, self._pool_min_size, self._pool_max_size, self._pool_timeout,
+                                                   self._pool_health_interval, self._statement_cache_size)
+
+    async def _connect_async(self, deadline: float = None, *, attempt=1):
+        while self._auto_connect or attempt == 1:
+            try:
+                logger.info(f'Attempting to make a connection to database \'{self._database}\' on \'{self._host}\'({_ordinal(attempt)} attempt)')
+                connection = await asyncio.to_thread(self._open_connection, timeout=None if deadline is None else deadline - monotonic())
+                logger.info(f'Connection was successful')
+                return connection
+
+            except Exception as e:
+                logger.warning(f'Connection failed due {e}')
+
+                if self._auto_connect:
+                    if deadline is not None and monotonic() + self._auto_connect_delay >= deadline:
+                        raise DatabaseConnectionException(f'Unable to connect to database \'{self._database}\' before the timeout, {_ordinal(attempt)} attempt failed due {e}') from e
+                    await asyncio.sleep(self._auto_connect_delay)
+            finally:
+                attempt += 1
+
+        return None
+
+    @property
+    def async_pool(self) -> AsyncEasyConnectionPool:
+        return self._async_pool
+
+    def async_connection(self, timeout: float = None):
+        """
+        Check out a connection from the asyncio pool, use it with `async with` to return it afterwards
+        """
+        return self._async_pool.connection(timeout)
+
+    async def execute_async(self, sql: SQLCommandExecutable, params=(), buffered=False, auto_commit=True) -> SQLResult:
+        if not auto_commit and self._transaction.get() is None:
+            logger.warning('auto_commit=False is ignored outside a transaction block, the statement is committed as it runs')
+
+        event = self._event(sql)
+        if self._prepared and not params:
+            operation, params = sql.get_query()
+            result = await self.execute_command_async(operation, params, prepared=True, _event=event)
+        else:
+            result = await self.execute_command_async(sql.get_value(), params, _event=event)
+
+        setattr(sql, '_executed', True)
+        return result
+
+    async def _read_async(self, sql: SQLCommandExecutable, operation: str, params) -> Tuple[List[tuple], bool]:
+        replica = self._choose_replica(sql)
+        if replica is not None:
+            # Replicas keep their thread safe pools, the read runs in a worker thread and falls back to the asyncio pool of the primary
+            rows = await asyncio.to_thread(self._read_replica, replica, sql, operation, params)
+            if rows is not None:
+                return rows, True
+
+        return (await self.execute_command_async(operation, params, prepared=self._prepared, _event=self._event(sql))).fetchall(), False
+
+    async def fetch_async(self, sql: SQLCommandExecutable, tables: Tuple[str, ...] = (), cache: bool = True) -> List[tuple]:
+        key = self._operation(sql)
+        if not cache or self._result_cache is None or self._transaction.get() is not None:
+            rows, _ = await self._read_async(sql, *key)
+            setattr(sql, '_executed', True)
+            return rows
+
+        rows = self._result_cache.get(key, replica=not self._on_primary(sql))
+        if rows is None:
+            generation = self._result_cache.generation(tables)
+            rows, replica = await self._read_async(sql, *key)
+            self._result_cache.put(key, rows, tables, generation, replica)
+
+        setattr(sql, '_executed', True)
+        return rows
+
+    async def execute_command_async(self, operation, params=(), prepared=False, *, _event: QueryEvent = None) -> SQLResult:
+        if logger.isEnabledFor(DEBUG):
+            logger.debug(f'SQL command has been requested to be executed asynchronously:\n\tCommand: "{operation}"\n\tParameters: {params}')
+
+        event = _event or self._event(shape=operation, params=params)
+        if event is None:
+            return await self._execute_async_on(operation, params, prepared)
+
+        with self._observe(event) as start:
+            result = await self._execute_async_on(operation, params, prepared, event, start)
+            event.rows = result.rowcount
+            return result
+
+    async def _execute_async_on(self, operation, params, prepared, event: QueryEvent = None, start: float = None) -> SQLResult:
+        transaction = self._transaction.get()
+        if transaction is not None:
+            return await asyncio.to_thread(self._execute_on, transaction.connection, operation, params, prepared)
+
+        async with self.async_connection() as connection:
+            if event is not None:
+                event.wait_time = perf_counter() - start
+            return await asyncio.to_thread(self._execute_on, connection, operation, params, prepared)
+
+    @asynccontextmanager
+    async def transaction_async(self):
+        """
+        Asynchronous version of `transaction`, the transaction follows the current asyncio task
+        """
+        transaction = self._transaction.get()
+        if transaction is not None:
+            savepoint = f'easysql_{transaction.depth}'
+            await asyncio.to_thread(self._execute_on, transaction.connection, f'SAVEPOINT {savepoint}')
+            transaction.depth += 1
+            try:
+                yield transaction.connection
+            except BaseException:
+                await asyncio.to_thread(self._execute_on, transaction.connection, f'ROLLBACK TO SAVEPOINT {savepoint}')
+                raise
+            else:
+                await asyncio.to_thread(self._execute_on, transaction.connection, f'RELEASE SAVEPOINT {savepoint}')
+            finally:
+                transaction.depth -= 1
+            return
+
+        connection = await self._async_pool.checkout()
+        transaction = _Transaction(connection)
+        token = self._transaction.set(transaction)
+        healthy = True
+        try:
+            await asyncio.to_thread(connection.start_transaction)
+            yield connection
+        except BaseException:
+            try:
+                await asyncio.to_thread(connection.rollback)
+            except Exception as e:
+                healthy = False
+                logger.warning(f'Rolling back the transaction failed due {e}')
+            raise
+        else:
+            try:
+                await asyncio.to_thread(connection.commit)
+            except BaseException:
+                healthy = False
+                raise
+        finally:
+            self._transaction.reset(token)
+            await self._async_pool.release(connection, discard=not healthy)
+            self._invalidate_all(transaction.tables)
+
+    async def iterate_async(self, sql: SQLCommandExecutable, chunk_size: int = 1000) -> AsyncIterator[List[tuple]]:
+        operation, params = self._operation(sql)
+        if logger.isEnabledFor(DEBUG):
+            logger.debug(f'SQL command has been requested to be streamed asynchronously:\n\tCommand: "{operation}"\n\tParameters: {params}\n\tChunk: {chunk_size}')
+        setattr(sql, '_executed', True)
+
+        event = self._event(sql)
+        with nullcontext() if event is None else self._observe(event) as start:
+            transaction = self._transaction.get()
+            replica, pool = self._choose_replica(sql), None
+            if replica is not None:
+                try:
+                    connection, pool = await asyncio.to_thread(replica.pool.checkout), replica.pool
+                except _REPLICA_ERRORS as e:
+                    if not _replica_unreachable(e):
+                        raise
+                    self._replica_set.eject(replica, e)
+                except DatabaseConnectionException as e:
+                    logger.debug(f'Reading from the primary, replica {replica.host}:{replica.port} has no free connection due {e}')
+            if transaction is not None:
+                connection = transaction.connection
+            elif pool is None:
+                connection = await self._async_pool.checkout()
+            if event is not None:
+                event.wait_time, event.rows = perf_counter() - start, 0
+
+            finished = False
+            try:
+                cursor = connection.cursor(prepared=True) if self._prepared else connection.cursor()
+                await asyncio.to_thread(cursor.execute, operation, params)
+                while True:
+                    rows = await asyncio.to_thread(cursor.fetchmany, chunk_size)
+                    if not rows:
+                        break
+                    if event is not None:
+                        event.rows += len(rows)
+                    yield rows
+
+                cursor.close()
+                finished = True
+            finally:
+                if pool is not None:
+                    await asyncio.to_thread(pool.release, connection, not finished)
+                elif transaction is None:
+                    await self._async_pool.release(connection, discard=not finished)
+                elif not finished:
+                    await asyncio.to_thread(connection.consume_results)
+
+    async def close_async(self):
+        await self._async_pool.close()
@@ -0,0 +1,239 @@
+import sys
+from collections import OrderedDict
+from threading import RLock
+from time import monotonic
+from typing import Callable, Any, Hashable, Iterable, List, Optional, Tuple
+
+from .Logging import logger
+
+__all__ = ['LRUCache', 'StatementCache', 'ResultCache']
+
+_MISSING = object()
+
+
+class LRUCache:
+    def __init__(self, size: int, on_evict: Callable[[Hashable, Any], Any] = None):
+        """
+        Thread-safe least recently used cache
+
+        :param size: maximum number of items, older items will be evicted
+        :param on_evict: called with the key and the value of each evicted item
+        """
+        if size < 1:
+            raise ValueError(f'cache size must be at least 1, got {size}')
+
+        self._size = size
+        self._on_evict = on_evict
+        self._items = OrderedDict()
+        self._lock = RLock()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def __repr__(self):
+        return f'<LRUCache {len(self._items)}/{self._size}>'
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._items.get(key, _MISSING)
+            if value is _MISSING:
+                self._misses += 1
+                return default
+
+            self._items.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, key, value):
+        evicted = []
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self._size:
+                evicted.append(self._items.popitem(last=False))
+                self._evictions += 1
+
+        if self._on_evict is not None:
+            for item in evicted:
+                self._on_evict(*item)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._items.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            items = list(self._items.items())
+            self._items.clear()
+
+        if self._on_evict is not None:
+            for item in items:
+                self._on_evict(*item)
+
+    @property
+    def stats(self) -> dict:
+        with self._lock:
+            return {'size': len(self._items), 'capacity': self._size, 'hits': self._hits, 'misses': self._misses, 'evictions': self._evictions}
+
+
+def _close_cursor(_, entry):
+    try:
+        entry[1].close()
+    except Exception as e:
+        logger.debug(f'Closing a prepared statement failed due {e}')
+
+
+class StatementCache:
+    def __init__(self, connection, size: int = 64):
+        """
+        Prepared statements of one connection, keyed by their placeholder SQL
+
+        :param connection: the driver connection owning the statements
+        :param size: maximum prepared statements kept open on the server
+        """
+        self._connection = connection
+        self._statements = LRUCache(size, on_evict=_close_cursor)
+
+    def execute(self, operation: str, params=()):
+        entry = self._statements.get(operation)
+        if entry is None:
+            entry = (operation, self._connection.cursor(prepared=True))
+            self._statements.put(operation, entry)
+
+        # The driver only skips the prepare step when it receives the very same string object
+        operation, cursor = entry
+        try:
+            cursor.execute(operation, params)
+        except Exception:
+            _close_cursor(operation, self._statements.pop(operation, entry))
+            raise
+
+        return cursor
+
+    def clear(self):
+        self._statements.clear()
+
+    @property
+    def stats(self) -> dict:
+        return self._statements.stats
+
+
+def _size_of(rows: List[tuple]) -> int:
+    return sys.getsizeof(rows) + sum(sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row) for row in rows)
+
+
+class ResultCache:
+    def __init__(self, max_bytes: int, ttl: float = 60.0):
+        """
+        Rows of read commands kept for `ttl` seconds, least recently used rows are evicted above `max_bytes`
+
+        Entries are tagged with the tables they read and dropped when one of those tables is invalidated,
+        they are also tagged when their rows came from a read replica that may lag behind the primary.
+        """
+        self._max_bytes = max_bytes
+        self._ttl = ttl
+        self._items = OrderedDict()
+        self._tables = {}
+        self._generations = {}
+        self._bytes = 0
+        self._lock = RLock()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    def __repr__(self):
+        return f'<ResultCache {self._bytes}/{self._max_bytes} bytes>'
+
+    def __len__(self):
+        return len(self._items)
+
+    def _drop(self, key):
+        _, size, tables, _, _ = self._items.pop(key)
+        self._bytes -= size
+        for table in tables:
+            keys = self._tables.get(table)
+            if keys is not None:
+                keys.discard(key)
+
+    def generation(self, tables: Iterable[str]) -> tuple:
+        """
+        Version of the tables, take it before reading so a write happening meanwhile stops the rows from being cached
+        """
+        with self._lock:
+            return tuple(self._generations.get(table, 0) for table in tables)
+
+    def get(self, key, replica: bool = True) -> Optional[List[tuple]]:
+        """
+        Cached rows of the key, None on a miss
+
+        :param replica: whether rows read from a replica may be returned
+        """
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or (item[4] and not replica):
+                self._misses += 1
+                return None
+
+            if item[0] < monotonic():
+                self._drop(key)
+                self._expirations += 1
+                self._misses += 1
+                return None
+
+            self._items.move_to_end(key)
+            self._hits += 1
+            return item[3]
+
+    def put(self, key, rows: List[tuple], tables: Tuple[str, ...], generation: tuple = None, replica: bool = False):
+        size = _size_of(rows)
+        if size > self._max_bytes:
+            return
+
+        with self._lock:
+            if generation is not None and generation != self.generation(tables):
+                return
+
+            if key in self._items:
+                self._drop(key)
+
+            self._items[key] = (monotonic() + self._ttl, size, tables, rows, replica)
+            self._bytes += size
+            for table in tables:
+                self._tables.setdefault(table, set()).add(key)
+
+            while self._bytes > self._max_bytes:
+                self._drop(next(iter(self._items)))
+                self._evictions += 1
+
+    def invalidate(self, table: str):
+        with self._lock:
+            self._generations[table] = self._generations.get(table, 0) + 1
+            keys = self._tables.pop(table, ())
+            for key in keys:
+                if key in self._items:
+                    self._drop(key)
+                    self._invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._tables.clear()
+            self._bytes = 0
+
+    @property
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'size': len(self._items), 'bytes': self._bytes, 'max_bytes': self._max_bytes, 'ttl': self._ttl, 'hits': self._hits,
+                'misses': self._misses, 'evictions': self._evictions, 'expirations': self._expirations, 'invalidations': self._invalidations
+            }
@@ -1,17 +1,37 @@
+import asyncio
+import base64
+import copy
 import inspect
-from itertools import zip_longest
-from time import sleep
-from typing import Optional, Union, Any, Sequence, TypeVar, Tuple, List, Type, Iterable
+import json
+import math
+import os
+import tempfile
+import warnings
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from itertools import zip_longest, chain
+from logging import DEBUG
+from datetime import timedelta
+from time import sleep, perf_counter, time, monotonic
+from typing import Optional, Union, Any, Sequence, TypeVar, Tuple, List, Type, Iterable, Iterator, Callable, AsyncIterator, Dict
 
 import mysql.connector
 
 from .ABC import SQLType, CHARSET, SQLConstraints, SQLCommandExecutable
-from .Constraints import NOT_NULL, Unique, UNIQUE, PRIMARY
+from .Cache import LRUCache, ResultCache
+from .Columnar import fetch_columns
+from .Constraints import NOT_NULL, Unique, UNIQUE, PRIMARY, Index, INDEX
 from .Exceptions import DatabaseConnectionException, DatabaseSafetyException
+from .Explain import QueryPlan, QuerySampler
 from .Logging import logger
+from .Metrics import QueryEvent, LatencyHistogram
+from .Pool import EasyConnectionPool, SQLResult
+from .Replicas import Replica, ReplicaSet
+from .Types import BOOL, DOUBLE
 from .Where import *
 
-__all__ = ['EasyDatabase', 'EasyTable', 'EasyColumn', 'EasyForeignColumn', 'SQLData', 'EmptySQLData']
+__all__ = ['EasyDatabase', 'EasyTable', 'EasyColumn', 'EasyForeignColumn', 'EasyAggregate', 'SQLData', 'EmptySQLData', 'SQLSchema', 'Page',
+           'TEMPLATE_CACHE', 'GET_MANY_SIZES', 'compiled_template']
 
 
 def _safe_pop(d: dict, k):
@@ -21,6 +41,61 @@ def _safe_pop(d: dict, k):
         return None
 
 
+def _batches(iterable: Iterable, size: int, weight: Callable[[Any], int] = None, limit: int = None):
+    # With a weight the batches are also kept under the limit, an item heavier than the limit goes alone
+    batch, total = [], 0
+    for item in iterable:
+        if weight is not None:
+            cost = weight(item)
+            if batch and total + cost > limit:
+                yield batch
+                batch, total = [], 0
+            total += cost
+
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch, total = [], 0
+
+    if batch:
+        yield batch
+
+
+def _param_size(value) -> int:
+    # Estimated length of a bound value once the driver inlines it into a multi-row statement
+    if isinstance(value, str):
+        return len(value.encode()) + 2
+    if isinstance(value, (bytes, bytearray)):
+        return 2 * len(value) + 3
+    return 24
+
+
+def _id_range(first_id, count: int) -> range:
+    return range(first_id, first_id + count) if first_id else range(0)
+
+
+def _text(value):
+    return value.decode() if isinstance(value, (bytes, bytearray)) else value
+
+
+# Placeholders a prepared statement may bind, the count is sent as a 2 byte integer
+_MAX_PLACEHOLDERS = 65535
+
+_INFILE_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r', '\0': '\\0'})
+
+
+def _infile_value(value) -> str:
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    return str(value).translate(_INFILE_ESCAPES)
+
+
+def _sql_names(columns: Optional[Sequence["EasyColumn"]]) -> Optional[Tuple[str, ...]]:
+    return None if columns is None else tuple(column.sql_name for column in columns)
+
+
 def _ordinal(i: int):
     if 10 < i % 100 < 20:
         return f'{i}th'
@@ -33,39 +108,92 @@ def _ordinal(i: int):
     return f'{i}th'
 
 
+class SQLSchema:
+    """
+    Layout of result rows shared by all rows of one query, maps the column names to the index of their values
+    """
+    __slots__ = ('table', 'columns', 'casters', 'index')
+
+    def __init__(self, table: "EasyTable", columns: Sequence["EasyColumn"]):
+        self.table = table
+        self.columns = tuple(columns)
+        self.casters = tuple(column.sql_type.cast for column in self.columns)
+        self.index = {}
+        for i, column in enumerate(self.columns):
+            self.index.setdefault(column.name, i)
+            self.index.setdefault(column.sql_name, i)
+
+    def __len__(self):
+        return len(self.columns)
+
+    def index_of(self, column) -> Optional[int]:
+        if isinstance(column, str):
+            return self.index.get(column)
+
+        # The qualified name tells apart the same named columns of joined tables
+        i = self.index.get(getattr(column, 'sql_name', None))
+        if i is None:
+            i = self.index.get(getattr(column, 'name', None))
+        return i if i is not None and self.columns[i] == column else None
+
+
+_UNDECODED = object()
+
+
 class SQLData:
-    def __init__(self, table: "EasyTable", data_array: Union[tuple, list], columns: Union[tuple, list]):
-        if len(data_array) != len(columns):
-            raise ValueError('Data does not match the columns')
+    __slots__ = ('_table', '_schema', '_row', '_decoded', '_related')
 
-        columns = table.assert_columns(columns)
+    def __init__(self, table: "EasyTable", data_array: Union[tuple, list], columns: Union[tuple, list, SQLSchema]):
+        schema = columns if isinstance(columns, SQLSchema) else SQLSchema(table, table.assert_columns(columns))
+        if len(data_array) != len(schema.columns):
+            raise ValueError('Data does not match the columns')
 
         self._table = table
-        self._data = dict(zip(columns, data_array))
+        self._schema = schema
+        self._row = data_array
+        self._decoded = None
+        self._related = None
 
     def __repr__(self):
-        return f'<SelectData source="{self._table.name}" values={self._data}>'
+        return f'<SelectData source="{self._table.name}" values={self.data}>'
 
     def get(self, column):
-        col = self._table.get_column(column)
-
-        if col is None or col not in self._data.keys():
+        i = self._schema.index_of(column)
+        if i is None:
             raise ValueError(f'Unable to find `{column}` in data')
 
-        return col.cast(self._data[col])
+        if self._decoded is None:
+            self._decoded = [_UNDECODED] * len(self._row)
+
+        value = self._decoded[i]
+        if value is _UNDECODED:
+            value = self._decoded[i] = self._schema.casters[i](self._row[i])
+
+        return value
+
+    def related(self, column):
+        """
+        Row referenced by a prefetched foreign column, None when the reference is NULL or missing
+        """
+        if self._related is None or column not in self._related:
+            raise ValueError(f'`{column}` was not prefetched')
+
+        return self._related[column]
 
     def __iter__(self):
         return iter([self])
 
     def __len__(self):
-        return len(self._data.keys())
+        return len(self._schema.columns)
 
     @property
     def data(self):
-        return self._data.copy()
+        return dict(zip(self._schema.columns, self._row))
 
 
 class EmptySQLData(SQLData):
+    __slots__ = ()
+
     def __init__(self, table: "EasyTable"):
         super().__init__(table, [], [])
 
@@ -94,9 +222,11 @@ class EasyColumn:
         #    self.tags = (tag for tag in self.tags if tag != NOT_NULL)
 
         self.table = None
+        self.sql_name = name
 
     def prepare(self, table):
         self.table = table
+        self.sql_name = f'{table.name}.{self.name}'
 
     def __hash__(self):
         return hash((self.name, self.sql_type))
@@ -155,6 +285,62 @@ class EasyColumn:
     def is_between(self, a, b) -> WhereIsBetween:
         return WhereIsBetween(self, a, b)
 
+    def count(self) -> 'EasyAggregate':
+        return EasyAggregate('COUNT', self)
+
+    def count_distinct(self) -> 'EasyAggregate':
+        return EasyAggregate('COUNT', self, distinct=True)
+
+    def sum(self) -> 'EasyAggregate':
+        return EasyAggregate('SUM', self)
+
+    def avg(self) -> 'EasyAggregate':
+        return EasyAggregate('AVG', self)
+
+    def min(self) -> 'EasyAggregate':
+        return EasyAggregate('MIN', self)
+
+    def max(self) -> 'EasyAggregate':
+        return EasyAggregate('MAX', self)
+
+
+# Aggregated integers may leave the range of their column, so they are cast without a range
+_AGGREGATE_INTEGER = SQLType('BIGINT', caster=lambda value: None if value is None else int(value))
+
+
+class EasyAggregate(EasyColumn):
+    """
+    Aggregate computed by the server, select it like a column and read it from the rows by itself or by its expression
+
+    Counts and sums of integers are cast to int, averages and other sums to float, minimums and maximums by their column.
+    """
+
+    def __init__(self, function: str, column: EasyColumn = None, distinct: bool = False):
+        self.function = function.upper()
+        self.column = column
+        self.distinct = distinct
+
+        if self.function == 'COUNT':
+            sql_type = _AGGREGATE_INTEGER
+        elif self.function == 'AVG':
+            sql_type = DOUBLE
+        elif self.function == 'SUM':
+            integral = hasattr(column.sql_type.caster, 'bit_size') or column.sql_type is BOOL
+            sql_type = _AGGREGATE_INTEGER if integral else DOUBLE
+        else:
+            sql_type = column.sql_type
+
+        distinct = 'DISTINCT ' if distinct else ''
+        super().__init__(f"{self.function}({'*' if column is None else distinct + column.name})", sql_type)
+        self.table = None if column is None else column.table
+        self.sql_name = self.name if column is None else f'{self.function}({distinct}{column.sql_name})'
+
+    def __repr__(self):
+        return f'<EasyAggregate "{self.name}" of "{self.table}">'
+
+
+_ONE = EasyColumn('1', _AGGREGATE_INTEGER)
+
 
 class EasyForeignColumn(EasyColumn):
     @staticmethod
@@ -188,7 +374,61 @@ class EasyForeignColumn(EasyColumn):
         return EasyColumn.get_sql(self)
 
 
+_CATALOG_TABLES = 'SELECT TABLE_NAME, TABLE_COLLATION FROM information_schema.TABLES WHERE TABLE_SCHEMA = %s'
+_CATALOG_COLUMNS = ('SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE, COLUMN_KEY, COLUMN_DEFAULT FROM information_schema.COLUMNS '
+                    'WHERE TABLE_SCHEMA = %s ORDER BY TABLE_NAME, ORDINAL_POSITION')
+_CATALOG_INDEXES = ('SELECT TABLE_NAME, INDEX_NAME, COLUMN_NAME, SUB_PART FROM information_schema.STATISTICS '
+                    'WHERE TABLE_SCHEMA = %s ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX')
+_CATALOG_CHECKSUM = (
+    "SELECT (SELECT COUNT(*) FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = %s), "
+    "(SELECT COALESCE(SUM(CRC32(CONCAT_WS('|', TABLE_NAME, COLUMN_NAME, ORDINAL_POSITION, COLUMN_TYPE, IS_NULLABLE, COLUMN_KEY, "
+    "COALESCE(COLUMN_DEFAULT, '<null>')))), 0) FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = %s), "
+    "(SELECT COALESCE(SUM(CRC32(CONCAT_WS('|', TABLE_NAME, TABLE_COLLATION))), 0) FROM information_schema.TABLES WHERE TABLE_SCHEMA = %s), "
+    "(SELECT COALESCE(SUM(CRC32(CONCAT_WS('|', TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX, COLUMN_NAME, COALESCE(SUB_PART, 0)))), 0) "
+    "FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = %s)"
+)
+
+
+class Page(list):
+    """
+    Rows of one page, `token` continues after the last row and is None on the last page
+    """
+
+    def __init__(self, rows: Iterable = (), token: Optional[str] = None):
+        super().__init__(rows)
+        self.token = token
+
+
+# Errors a replica may raise while it is unreachable, a replica without a free connection raises
+# DatabaseConnectionException and is skipped for the read without being ejected
+_REPLICA_ERRORS = (mysql.connector.errors.InterfaceError, mysql.connector.errors.OperationalError)
+
+# Client and server errors of a lost or refused connection, a statement failing on a lock wait timeout or a kill does not eject a replica
+_UNREACHABLE_ERRNOS = frozenset((1040, 1053, 1152, 2002, 2003, 2005, 2006, 2013, 2055))
+
+
+def _replica_unreachable(error: Exception) -> bool:
+    return getattr(error, 'errno', None) in _UNREACHABLE_ERRNOS
+
+
+class _Transaction:
+    __slots__ = ('connection', 'depth', 'tables')
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.depth = 0
+        self.tables = set()
+
+
 class EasyDatabase:
+    """
+    Connection info and connection pool of a database
+
+    Concurrency model: a database may be shared by any number of threads. Every command checks a connection out of the pool,
+    runs on it and returns it before its result is read, so threads never share a connection or a cursor while a statement runs.
+    Streams keep their connection until they are exhausted or closed and must stay in the thread that consumes them.
+    At most `_pool_max_size` statements run at once, other threads wait up to `_pool_timeout` seconds for a connection.
+    """
     _database: str = None
     _password: str = None
     _host: str = "127.0.0.1"
@@ -200,9 +440,42 @@ class EasyDatabase:
     _auto_connect: bool = True
     _auto_connect_delay: int = 5
 
+    _pool_min_size: int = 1
+    _pool_max_size: int = 10
+    _pool_timeout: float = 30.0
+    _pool_health_interval: float = 30.0
+
+    _prepared: bool = False
+    _statement_cache_size: int = 64
+
+    _result_cache_size: int = 0
+    _result_cache_ttl: float = 60.0
+
+    _latency_histograms: bool = False
+
+    _explain_sample_rate: float = 0.0
+    _explain_threshold: Optional[float] = None
+    _explain_max_rows: int = 10000
+
+    _schema_catalog: bool = True
+    _schema_snapshot: Optional[str] = None
+
+    _local_infile: bool = False
+
+    _replicas: Sequence[Union[str, Tuple[str, int]]] = ()
+    _replica_selection: str = 'round_robin'
+    _replica_eject_time: float = 30.0
+    _read_your_writes: float = 1.0
+
     def __init_subclass__(cls, **kwargs):
-        for key in ('database', 'password', 'host', 'port', 'user', 'charset', 'auto_connect', 'auto_connect_delay'):
-            setattr(cls, f'_{key}', _safe_pop(kwargs, key) or getattr(cls, f'_{key}'))
+        for key in ('database', 'password', 'host', 'port', 'user', 'charset', 'auto_connect', 'auto_connect_delay',
+                    'pool_min_size', 'pool_max_size', 'pool_timeout', 'pool_health_interval', 'prepared', 'statement_cache_size',
+                    'result_cache_size', 'result_cache_ttl', 'latency_histograms', 'schema_catalog', 'schema_snapshot',
+                    'local_infile', 'explain_sample_rate', 'explain_threshold', 'explain_max_rows', 'replicas', 'replica_selection',
+                    'replica_eject_time', 'read_your_writes'):
+            # Only a missing or None keyword keeps the inherited value, False and 0 are kept
+            value = _safe_pop(kwargs, key)
+            setattr(cls, f'_{key}', getattr(cls, f'_{key}') if value is None else value)
 
     def __init__(self, *, _force=False):
         if self.__class__ == EasyDatabase and not _force:
@@ -215,38 +488,129 @@ class EasyDatabase:
         if self._charset is not None and not isinstance(self._charset, CHARSET):
             raise TypeError(f'charset must be type of "CHARSET" or "NONE", not "{type(self._charset)}"')
 
-        self._cursor = None
+        self._pool = EasyConnectionPool(self._connect, self._pool_min_size, self._pool_max_size, self._pool_timeout, self._pool_health_interval,
+                                        self._statement_cache_size)
         self._connection = None
         self._safe = True
+        self._max_allowed_packet = None
+        self._catalog: Optional[Dict[str, dict]] = None
+        self._transaction: ContextVar[Optional[_Transaction]] = ContextVar(f'{self._database}_transaction', default=None)
+        self._result_cache = ResultCache(self._result_cache_size, self._result_cache_ttl) if self._result_cache_size else None
+        self._last_write: ContextVar[float] = ContextVar(f'{self._database}_last_write', default=float('-inf'))
+        self._replica_set = ReplicaSet([self._replica(address) for address in self._replicas], self._replica_selection,
+                                       self._replica_eject_time) if self._replicas else None
+
+        self._before_hooks: Tuple[Callable[[QueryEvent], Any], ...] = ()
+        self._after_hooks: Tuple[Callable[[QueryEvent], Any], ...] = ()
+        self._histograms = {}
+        if self._latency_histograms:
+            self.on_after_execute(self._record_latency)
+        self._sampler = None
+        if self._explain_sample_rate or self._explain_threshold is not None:
+            self._sampler = self.on_after_execute(QuerySampler(self, self._explain_sample_rate, self._explain_threshold, self._explain_max_rows))
 
         self.set_charset(self._charset)
 
-    def _connect(self, *, attempt=1):
+    def _open_connection(self, host: str = None, port: int = None, timeout: float = None):
+        """
+        Make one attempt to connect to the primary or to the given replica, override it to use another driver
+
+        :param timeout: seconds the attempt may take, the driver's default connect timeout if not provided
+        """
+        options = dict(host=self._host if host is None else host, port=self._port if port is None else port, database=self._database,
+                       user=self._user, password=self._password, autocommit=True, allow_local_infile=self._local_infile)
+        if timeout is not None:
+            options['connection_timeout'] = max(1, math.ceil(timeout))
+
+        if self.charset is not None:
+            connection = mysql.connector.connect(**options, charset=self._charset.name, collation=self._charset.collation)
+            connection.set_charset_collation(self._charset.name, self._charset.collation)
+        else:
+            connection = mysql.connector.connect(**options)
+
+        if not connection.is_connected():
+            raise Exception('unknown reason...')
+
+        return connection
+
+    def _connect(self, deadline: float = None, *, attempt=1):
+        """
+        Connect to the primary, retrying every `_auto_connect_delay` seconds while `_auto_connect` is set
+
+        :param deadline: monotonic time after which no attempt is started, the pool passes the deadline of its checkout
+        """
         while self._auto_connect or attempt == 1:
             try:
                 logger.info(f'Attempting to make a connection to database \'{self._database}\' on \'{self._host}\'({_ordinal(attempt)} attempt)')
-                if self.charset is not None:
-                    self._connection = mysql.connector.connect(host=self._host, port=self._port, database=self._database, user=self._user,
-                                                               password=self._password, charset=self._charset.name, collation=self._charset.collation)
-                    self._connection.set_charset_collation(self._charset.name, self._charset.collation)
-                else:
-                    self._connection = mysql.connector.connect(host=self._host, port=self._port, database=self._database, user=self._user,
-                                                               password=self._password)
-
-                if self._connection.is_connected():
-                    logger.info(f'Connection was successful')
-                    break
-                else:
-                    raise Exception('unknown reason...')
+                connection = self._open_connection(timeout=None if deadline is None else deadline - monotonic())
+                logger.info(f'Connection was successful')
+                return connection
 
             except Exception as e:
-                logger.warn(f'Connection failed due {e}')
+                logger.warning(f'Connection failed due {e}')
 
                 if self._auto_connect:
+                    if deadline is not None and monotonic() + self._auto_connect_delay >= deadline:
+                        raise DatabaseConnectionException(f'Unable to connect to database \'{self._database}\' before the timeout, {_ordinal(attempt)} attempt failed due {e}') from e
                     sleep(self._auto_connect_delay)
             finally:
                 attempt += 1
 
+        return None
+
+    def _replica(self, address: Union[str, Tuple[str, int]]) -> Replica:
+        host, port = (address, self._port) if isinstance(address, str) else address
+        # Replicas are connected once per attempt and within the deadline of the checkout, a replica that is down is ejected instead of waited for
+        pool = EasyConnectionPool(lambda deadline: self._open_connection(host, port, deadline - monotonic()), self._pool_min_size,
+                                  self._pool_max_size, self._pool_timeout, self._pool_health_interval, self._statement_cache_size)
+        return Replica(host, port, pool)
+
+    @property
+    def replicas(self) -> Optional[ReplicaSet]:
+        return self._replica_set
+
+    def _on_primary(self, sql: SQLCommandExecutable) -> bool:
+        """
+        Whether the read has to see every write, forced by `on_primary`, a transaction or the read-your-writes window
+        """
+        if self._replica_set is None or getattr(sql, '_primary', False) or self._transaction.get() is not None:
+            return True
+        return monotonic() - self._last_write.get() < self._read_your_writes
+
+    def _choose_replica(self, sql: SQLCommandExecutable) -> Optional[Replica]:
+        return None if self._on_primary(sql) else self._replica_set.choose()
+
+    def _read_replica(self, replica: Replica, sql: SQLCommandExecutable, operation: str, params) -> Optional[List[tuple]]:
+        """
+        Rows read from the replica, None when the replica failed and the primary has to answer
+        """
+        start = perf_counter()
+        try:
+            rows = self.execute_command(operation, params, prepared=self._prepared, _event=self._event(sql), _pool=replica.pool).fetchall()
+        except _REPLICA_ERRORS as e:
+            if not _replica_unreachable(e):
+                raise
+            self._replica_set.eject(replica, e)
+            return None
+        except DatabaseConnectionException as e:
+            logger.debug(f'Reading from the primary, replica {replica.host}:{replica.port} has no free connection due {e}')
+            return None
+
+        self._replica_set.record(replica, perf_counter() - start)
+        return rows
+
+    def _read(self, sql: SQLCommandExecutable, operation: str, params) -> Tuple[List[tuple], bool]:
+        """
+        Rows of the read and whether a replica returned them
+        """
+        replica = self._choose_replica(sql)
+        if replica is not None:
+            rows = self._read_replica(replica, sql, operation, params)
+            if rows is not None:
+                return rows, True
+
+        return self.execute_command(operation, params, prepared=self._prepared, _event=self._event(sql)).fetchall(), False
+
     @property
     def safe(self):
         return self._safe
@@ -255,24 +619,41 @@ class EasyDatabase:
         self._safe = not confirm
 
     @property
-    def connection(self):
+    def pool(self) -> EasyConnectionPool:
+        return self._pool
+
+    def _legacy_connection(self):
         if self._connection is None or not self._connection.is_connected():
-            self._connect()
+            self._connection = self._connect()
 
         if self._connection is None or not self._connection.is_connected():
             raise DatabaseConnectionException('Database is not connected')
 
         return self._connection
 
+    @property
+    def connection(self):
+        """
+        Deprecated, a connection of its own outside the pool, use `pool.connection()` or `transaction()` instead
+        """
+        warnings.warn('EasyDatabase.connection is deprecated, check a connection out with `pool.connection()` instead', DeprecationWarning, stacklevel=2)
+        return self._legacy_connection()
+
     @property
     def cursor(self):
-        self._cursor = self.connection.cursor()
-        return self._cursor
+        """
+        Deprecated, a cursor of the connection kept outside the pool, use `execute_command` instead
+        """
+        warnings.warn('EasyDatabase.cursor is deprecated, use `execute_command` instead', DeprecationWarning, stacklevel=2)
+        return self._legacy_connection().cursor()
 
     @property
     def buffered_cursor(self):
-        self._cursor = self.connection.cursor(buffered=True)
-        return self._cursor
+        """
+        Deprecated, a buffered cursor of the connection kept outside the pool, use `execute_command` instead
+        """
+        warnings.warn('EasyDatabase.buffered_cursor is deprecated, use `execute_command` instead', DeprecationWarning, stacklevel=2)
+        return self._legacy_connection().cursor(buffered=True)
 
     @property
     def charset(self):
@@ -282,28 +663,448 @@ class EasyDatabase:
     def name(self):
         return self._database
 
+    @property
+    def prepared(self):
+        return self._prepared
+
+    @property
+    def local_infile(self):
+        return self._local_infile
+
+    def on_before_execute(self, hook: Callable[[QueryEvent], Any]):
+        """
+        Call the hook with a QueryEvent before every statement runs, it may be used as a decorator
+        """
+        self._before_hooks = self._before_hooks + (hook,)
+        return hook
+
+    def on_after_execute(self, hook: Callable[[QueryEvent], Any]):
+        """
+        Call the hook with the completed QueryEvent after every statement, including the failed ones
+        """
+        self._after_hooks = self._after_hooks + (hook,)
+        return hook
+
+    def remove_hook(self, hook: Callable[[QueryEvent], Any]):
+        self._before_hooks = tuple(item for item in self._before_hooks if item != hook)
+        self._after_hooks = tuple(item for item in self._after_hooks if item != hook)
+
+    @staticmethod
+    def _run_hooks(hooks, event: QueryEvent):
+        for hook in hooks:
+            try:
+                hook(event)
+            except Exception as e:
+                logger.warning(f'Execute hook {hook} failed due {e}')
+
+    def _event(self, sql: SQLCommandExecutable = None, shape: str = None, params=()) -> Optional[QueryEvent]:
+        # Events are only made while hooks are registered, so statements pay nothing otherwise
+        if not self._before_hooks and not self._after_hooks:
+            return None
+        if sql is None:
+            return QueryEvent(shape, params)
+
+        shape, params = sql.get_query()
+        table = getattr(sql, '_table', None)
+        return QueryEvent(shape, params, type(sql).__name__, getattr(table, 'name', None))
+
+    @contextmanager
+    def _observe(self, event: QueryEvent):
+        self._run_hooks(self._before_hooks, event)
+        start = perf_counter()
+        try:
+            yield start
+        except GeneratorExit:
+            raise
+        except BaseException as e:
+            event.error = e
+            raise
+        finally:
+            event.duration = perf_counter() - start - event.wait_time
+            self._run_hooks(self._after_hooks, event)
+
+    def _record_latency(self, event: QueryEvent):
+        if event.command is None or event.error is not None:
+            return
+
+        key = (event.table, event.command)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms.setdefault(key, LatencyHistogram())
+        histogram.record(event.duration)
+
+    def latency_snapshot(self) -> dict:
+        """
+        Latency histograms of the commands by table and command type, recorded when `_latency_histograms` is set
+        """
+        snapshot = {}
+        for (table, command), histogram in list(self._histograms.items()):
+            snapshot.setdefault(table, {})[command] = histogram.snapshot()
+        return snapshot
+
+    def plan_findings(self) -> dict:
+        """
+        Sampled statements with a full scan or a large rows estimate by shape, sampled when `_explain_sample_rate` or `_explain_threshold` is set
+        """
+        return self._sampler.findings if self._sampler is not None else {}
+
+    def explain(self, operation: str, params=()) -> QueryPlan:
+        result = self.execute_command(f'EXPLAIN FORMAT=JSON {operation}', params)
+        return QueryPlan(result.fetchone()[0])
+
     def execute(self, sql: SQLCommandExecutable, params=(), buffered=False, auto_commit=True):
-        result = self.execute_command(sql.get_value(), params, buffered, auto_commit)
+        event = self._event(sql)
+        if self._prepared and not params:
+            operation, params = sql.get_query()
+            result = self.execute_command(operation, params, buffered, auto_commit, prepared=True, _event=event)
+        else:
+            result = self.execute_command(sql.get_value(), params, buffered, auto_commit, _event=event)
+
         setattr(sql, '_executed', True)
         return result
 
-    def execute_command(self, operation, params=(), buffered=False, auto_commit=True):
-        cursor = self.buffered_cursor if buffered else self.cursor
+    def execute_command(self, operation, params=(), buffered=False, auto_commit=True, prepared=False, *, _event: QueryEvent = None,
+                        _pool: EasyConnectionPool = None) -> SQLResult:
+        """
+        Execute an operation on a pooled connection and return its detached result
+
+        Pooled connections run in autocommit mode, so every statement is committed by the server as it runs.
+        `auto_commit=False` only delays the commit inside a `transaction()` block, elsewhere it is ignored with a warning.
+        `buffered` is kept for compatibility, results are always fully read before the connection is released.
+        With `prepared` the operation runs as a server-side prepared statement cached on the connection.
+        """
+        if not auto_commit and self._transaction.get() is None:
+            logger.warning('auto_commit=False is ignored outside a transaction block, the statement is committed as it runs')
+
+        if logger.isEnabledFor(DEBUG):
+            logger.debug(f'SQL command has been requested to be executed:\n\tCommand: "{operation}"\n\tParameters: {params}\n\tCommit: {auto_commit}\tBuffered: {buffered}')
+
+        event = _event or self._event(shape=operation, params=params)
+        if event is None:
+            with self._acquire(_pool) as connection:
+                return self._execute_on(connection, operation, params, prepared)
+
+        with self._observe(event) as start:
+            with self._acquire(_pool) as connection:
+                event.wait_time = perf_counter() - start
+                result = self._execute_on(connection, operation, params, prepared)
+            event.rows = result.rowcount
+            return result
+
+    @staticmethod
+    def _execute_on(connection, operation, params=(), prepared=False) -> SQLResult:
+        if prepared:
+            return SQLResult.of(connection.statements.execute(operation, params))
 
-        logger.debug(f'SQL command has been requested to be executed:\n\tCommand: "{operation}"\n\tParameters: {params}\n\tCommit: {auto_commit}\tBuffered: {buffered}')
-        cursor.execute(operation, params)
-        if auto_commit:
-            self.commit()
+        cursor = connection.cursor(buffered=True)
+        try:
+            cursor.execute(operation, params)
+            return SQLResult.of(cursor)
+        finally:
+            cursor.close()
 
-        return cursor
+    def _operation(self, sql: SQLCommandExecutable) -> Tuple[str, tuple]:
+        return sql.get_query() if self._prepared else (sql.get_value(), ())
+
+    @property
+    def result_cache(self) -> Optional[ResultCache]:
+        return self._result_cache
+
+    def fetch(self, sql: SQLCommandExecutable, tables: Tuple[str, ...] = (), cache: bool = True) -> List[tuple]:
+        """
+        Rows of a read command, served from the result cache when it is enabled and no transaction is running
+
+        :param sql: the read command
+        :param tables: names of the tables read by the command, writes to them invalidate the cached rows
+        :param cache: whether this command may use the result cache
+        """
+        key = self._operation(sql)
+        if not cache or self._result_cache is None or self._transaction.get() is not None:
+            rows, _ = self._read(sql, *key)
+            setattr(sql, '_executed', True)
+            return rows
+
+        # Reads that have to see every write skip the rows cached from a replica, it may not have applied the write yet
+        rows = self._result_cache.get(key, replica=not self._on_primary(sql))
+        if rows is None:
+            generation = self._result_cache.generation(tables)
+            rows, replica = self._read(sql, *key)
+            self._result_cache.put(key, rows, tables, generation, replica)
+
+        setattr(sql, '_executed', True)
+        return rows
+
+    def invalidate(self, table: Union['EasyTable', str]):
+        """
+        Drop the cached results reading a table, called after every write to it
+
+        Inside a transaction the table is invalidated again when the transaction ends.
+        """
+        self._last_write.set(monotonic())
+        transaction = self._transaction.get()
+        if transaction is not None:
+            transaction.tables.add(table)
+
+        if self._result_cache is not None:
+            self._result_cache.invalidate(table if isinstance(table, str) else table.name)
+
+    def _invalidate_all(self, tables: Iterable[Union['EasyTable', str]]):
+        for table in tables:
+            if isinstance(table, EasyTable):
+                table.invalidate()
+            else:
+                self.invalidate(table)
+
+    def iterate(self, sql: SQLCommandExecutable, chunk_size: int = 1000) -> Iterator[List[tuple]]:
+        """
+        Execute a command on an unbuffered cursor and lazily yield its rows in chunks
+
+        The connection stays checked out until the generator is exhausted or closed,
+        if it is closed early the connection is dropped instead of reading the remaining rows.
+        """
+        operation, params = self._operation(sql)
+        if logger.isEnabledFor(DEBUG):
+            logger.debug(f'SQL command has been requested to be streamed:\n\tCommand: "{operation}"\n\tParameters: {params}\n\tChunk: {chunk_size}')
+        setattr(sql, '_executed', True)
+
+        event = self._event(sql)
+        with nullcontext() if event is None else self._observe(event) as start:
+            transaction = self._transaction.get()
+            replica, pool = self._choose_replica(sql), self._pool
+            if replica is not None:
+                try:
+                    connection, pool = replica.pool.checkout(), replica.pool
+                except _REPLICA_ERRORS as e:
+                    if not _replica_unreachable(e):
+                        raise
+                    self._replica_set.eject(replica, e)
+                except DatabaseConnectionException as e:
+                    logger.debug(f'Reading from the primary, replica {replica.host}:{replica.port} has no free connection due {e}')
+            if transaction is not None:
+                connection = transaction.connection
+            elif pool is self._pool:
+                connection = pool.checkout()
+            if event is not None:
+                event.wait_time, event.rows = perf_counter() - start, 0
+
+            finished = False
+            try:
+                cursor = connection.cursor(prepared=True) if self._prepared else connection.cursor()
+                cursor.execute(operation, params)
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    if event is not None:
+                        event.rows += len(rows)
+                    yield rows
+
+                cursor.close()
+                finished = True
+            finally:
+                if transaction is None:
+                    pool.release(connection, discard=not finished)
+                elif not finished:
+                    # The transaction must keep its connection, so the remaining rows are read and dropped
+                    connection.consume_results()
+
+    async def execute_async(self, sql: SQLCommandExecutable, params=(), buffered=False, auto_commit=True) -> SQLResult:
+        """
+        Execute a command in a worker thread, AsyncEasyDatabase runs it on its asyncio pool instead
+        """
+        return await asyncio.to_thread(self.execute, sql, params, buffered, auto_commit)
+
+    async def fetch_async(self, sql: SQLCommandExecutable, tables: Tuple[str, ...] = (), cache: bool = True) -> List[tuple]:
+        """
+        Asynchronous version of `fetch`
+        """
+        return await asyncio.to_thread(self.fetch, sql, tables, cache)
+
+    async def iterate_async(self, sql: SQLCommandExecutable, chunk_size: int = 1000) -> AsyncIterator[List[tuple]]:
+        """
+        Asynchronous version of `iterate`, every chunk is fetched in a worker thread
+        """
+        iterator = self.iterate(sql, chunk_size)
+        try:
+            while True:
+                rows = await asyncio.to_thread(next, iterator, None)
+                if rows is None:
+                    break
+                yield rows
+        finally:
+            iterator.close()
+
+    def execute_many(self, operation, seq_params: Sequence[Sequence[Any]], *, _event: QueryEvent = None) -> SQLResult:
+        """
+        Execute one operation for every parameters of the sequence, the driver batches inserts into multi-row statements
+        """
+        if logger.isEnabledFor(DEBUG):
+            logger.debug(f'SQL command has been requested to be executed many times:\n\tCommand: "{operation}"\n\tTimes: {len(seq_params)}')
+
+        event = _event or self._event(shape=operation, params=seq_params)
+        with nullcontext(perf_counter()) if event is None else self._observe(event) as start:
+            with self._acquire() as connection:
+                if event is not None:
+                    event.wait_time = perf_counter() - start
+                cursor = connection.cursor()
+                try:
+                    cursor.executemany(operation, seq_params)
+                    result = SQLResult(None, cursor.lastrowid, cursor.rowcount)
+                finally:
+                    cursor.close()
+
+            if event is not None:
+                event.rows = result.rowcount
+            return result
 
     def commit(self):
-        return self.connection.commit()
+        if self._transaction.get() is not None:
+            raise DatabaseSafetyException('Unable to commit inside a transaction, it is committed when its block ends')
+
+        with self._pool.connection() as connection:
+            return connection.commit()
+
+    @property
+    def in_transaction(self) -> bool:
+        return self._transaction.get() is not None
+
+    @contextmanager
+    def _acquire(self, pool: EasyConnectionPool = None):
+        transaction = self._transaction.get()
+        if transaction is not None:
+            yield transaction.connection
+        else:
+            with (pool or self._pool).connection() as connection:
+                yield connection
+
+    @contextmanager
+    def transaction(self):
+        """
+        Run the commands of the block on one connection and commit them once when the block ends
+
+        Any exception rolls the block back. Nested blocks use savepoints, so only the inner block is rolled back.
+        The transaction follows the current thread or asyncio task, commands must not run concurrently inside one transaction.
+        """
+        transaction = self._transaction.get()
+        if transaction is not None:
+            savepoint = f'easysql_{transaction.depth}'
+            self._execute_on(transaction.connection, f'SAVEPOINT {savepoint}')
+            transaction.depth += 1
+            try:
+                yield transaction.connection
+            except BaseException:
+                self._execute_on(transaction.connection, f'ROLLBACK TO SAVEPOINT {savepoint}')
+                raise
+            else:
+                self._execute_on(transaction.connection, f'RELEASE SAVEPOINT {savepoint}')
+            finally:
+                transaction.depth -= 1
+            return
+
+        connection = self._pool.checkout()
+        transaction = _Transaction(connection)
+        token = self._transaction.set(transaction)
+        healthy = True
+        try:
+            logger.debug('Transaction has been started')
+            connection.start_transaction()
+            yield connection
+        except BaseException:
+            try:
+                connection.rollback()
+                logger.debug('Transaction has been rolled back')
+            except Exception as e:
+                healthy = False
+                logger.warning(f'Rolling back the transaction failed due {e}')
+            raise
+        else:
+            try:
+                connection.commit()
+            except BaseException:
+                healthy = False
+                raise
+            logger.debug('Transaction has been committed')
+        finally:
+            self._transaction.reset(token)
+            self._pool.release(connection, discard=not healthy)
+            self._invalidate_all(transaction.tables)
+
+    @property
+    def max_allowed_packet(self) -> int:
+        if self._max_allowed_packet is None:
+            self._max_allowed_packet = int(self.execute_command('SELECT @@max_allowed_packet;').fetchone()[0])
+
+        return self._max_allowed_packet
+
+    @property
+    def catalog(self) -> Dict[str, dict]:
+        """
+        Collation, columns and indexes of every table in the database, read with three batched queries the first time a table is prepared
+
+        With `_schema_snapshot` set to a file path, the catalog is kept in that file and reused
+        as long as a single checksum query over information_schema still matches it.
+        """
+        if self._catalog is None:
+            self._catalog = self._load_catalog()
+        return self._catalog
+
+    def refresh_catalog(self):
+        self._catalog = None
+
+    def table_info(self, name: str) -> Optional[dict]:
+        return self.catalog.get(name) if self._schema_catalog else None
+
+    def _read_catalog(self) -> Dict[str, dict]:
+        catalog = {}
+        for name, collation in self.execute_command(_CATALOG_TABLES, (self.name,)).fetchall():
+            catalog[_text(name)] = {'collation': _text(collation), 'columns': [], 'indexes': {}}
+
+        # Rows have the same layout as the rows of DESCRIBE
+        for row in self.execute_command(_CATALOG_COLUMNS, (self.name,)).fetchall():
+            table = catalog.get(_text(row[0]))
+            if table is not None:
+                table['columns'].append([_text(value) for value in row[1:]])
+
+        for name, index, column, length in self.execute_command(_CATALOG_INDEXES, (self.name,)).fetchall():
+            table = catalog.get(_text(name))
+            if table is not None:
+                table['indexes'].setdefault(_text(index), []).append([_text(column), None if length is None else int(length)])
+
+        return catalog
+
+    def _load_catalog(self) -> Dict[str, dict]:
+        if self._schema_snapshot is None:
+            return self._read_catalog()
+
+        checksum = [str(value) for value in self.execute_command(_CATALOG_CHECKSUM, (self.name,) * 4).fetchone()]
+        try:
+            with open(self._schema_snapshot) as file:
+                snapshot = json.load(file)
+            if snapshot['database'] == self.name and snapshot['checksum'] == checksum:
+                logger.debug('Schema snapshot is up to date, skipping the introspection')
+                return snapshot['tables']
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+        catalog = self._read_catalog()
+        try:
+            temporary = f'{self._schema_snapshot}.tmp'
+            with open(temporary, 'w') as file:
+                json.dump({'database': self.name, 'checksum': checksum, 'tables': catalog}, file)
+            os.replace(temporary, self._schema_snapshot)
+        except OSError as e:
+            logger.warning(f'Writing the schema snapshot failed due {e}')
+
+        return catalog
 
     def describe_table(self, table: 'EasyTable'):
         from EasySQL.Types import string_to_type
 
-        result = self.execute_command(f'DESCRIBE {self.name}.{table.name};', buffered=True).fetchall()
+        info = self.table_info(table.name)
+        if info is not None:
+            result = info['columns']
+        else:
+            result = self.execute_command(f'DESCRIBE {self.name}.{table.name};', buffered=True).fetchall()
         columns = []
         for column in result:
             sqltype = string_to_type(column[1])
@@ -321,12 +1122,27 @@ class EasyDatabase:
 
         return tuple(columns)
 
+    def table_indexes(self, table: 'EasyTable') -> Dict[str, list]:
+        """
+        Columns and prefix lengths of each index of the table, keyed by the index name
+        """
+        info = self.table_info(table.name)
+        if info is not None and 'indexes' in info:
+            return info['indexes']
+
+        indexes = {}
+        command = ('SELECT INDEX_NAME, COLUMN_NAME, SUB_PART FROM information_schema.STATISTICS '
+                   'WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s ORDER BY INDEX_NAME, SEQ_IN_INDEX')
+        for index, column, length in self.execute_command(command, (self.name, table.name)).fetchall():
+            indexes.setdefault(_text(index), []).append([_text(column), None if length is None else int(length)])
+        return indexes
+
     def set_charset(self, charset: CHARSET):
         if charset is not None:
             try:
                 try:
                     command = f'SELECT DEFAULT_COLLATION_NAME, DEFAULT_CHARACTER_SET_NAME FROM information_schema.SCHEMATA WHERE information_schema.SCHEMATA.SCHEMA_NAME = \'{self.name}\''
-                    col, cha = self.execute_command(command, auto_commit=False).fetchall()[0]
+                    col, cha = self.execute_command(command).fetchall()[0]
                 except Exception:
                     col, cha = (None, None)
 
@@ -340,6 +1156,24 @@ class EasyDatabase:
                 logger.warn(f"Altering the charset of database failed due {e}")
 
 
+TEMPLATE_CACHE = LRUCache(1024)
+
+# Key counts of the IN queries of `EasyTable.get_many`, the largest one is also the most keys sent in one query
+GET_MANY_SIZES = (1, 8, 32, 128, 512)
+
+
+def compiled_template(key: tuple, compile_template: Callable[[], Any]):
+    """
+    Get the template compiled for a command shape from TEMPLATE_CACHE, compiling it on a miss
+    """
+    template = TEMPLATE_CACHE.get(key)
+    if template is None:
+        template = compile_template()
+        TEMPLATE_CACHE.put(key, template)
+
+    return template
+
+
 T = TypeVar('T')
 SOS = Union[T, Sequence[T]]
 ECOS = Union[EasyColumn, str]
@@ -354,18 +1188,26 @@ class EasyTable:
     _data_convertor = None
 
     _charset: CHARSET = None
+    _identity_map_size: int = 0
+
+    _column_index: dict = {}
 
     PRIMARY: List[EasyColumn] = None
     UNIQUES: List[Unique] = None
+    INDEXES: List[Index] = None
 
     def __init_subclass__(cls, **kwargs):
-        for key in ('database', 'name', 'charset', 'data_class'):
-            setattr(cls, f'_{key}', _safe_pop(kwargs, key) or getattr(cls, f'_{key}'))
+        for key in ('database', 'name', 'charset', 'data_class', 'identity_map_size'):
+            value = _safe_pop(kwargs, key)
+            setattr(cls, f'_{key}', getattr(cls, f'_{key}') if value is None else value)
 
         cls.PRIMARY = [] if cls.PRIMARY is None else cls.PRIMARY
         cls.UNIQUES = [] if cls.UNIQUES is None else cls.UNIQUES
+        cls.INDEXES = [] if cls.INDEXES is None else cls.INDEXES
+        cls.INDEXES.extend(value for value in cls.__dict__.values() if isinstance(value, Index) and value not in cls.INDEXES)
 
-        if cls._charset is None:
+        # Abstract tables like ShardedTable have no database yet
+        if cls._charset is None and cls._database is not NotImplemented:
             cls._charset = cls._database.charset
 
         columns: List[EasyColumn] = [value for value in cls.__dict__.values() if isinstance(value, EasyColumn)]
@@ -374,10 +1216,13 @@ class EasyTable:
                 cls.UNIQUES.append(Unique(column))
             if PRIMARY in column.tags:
                 cls.PRIMARY.append(column)
+            if INDEX in column.tags:
+                cls.INDEXES.append(Index(column))
 
-            column.tags = tuple([tag for tag in column.tags if tag != UNIQUE and tag != PRIMARY])
+            column.tags = tuple([tag for tag in column.tags if tag != UNIQUE and tag != PRIMARY and tag != INDEX])
 
         cls._columns = tuple(columns)
+        cls._column_index = {column.name: column for column in cls._columns}
 
         if cls._data_class is not None:
             if not issubclass(cls._data_class, SQLData):
@@ -407,6 +1252,10 @@ class EasyTable:
             raise TypeError('Version 3: Name is not implemented')
 
         self.__prepared = False
+        self._schema: Optional[SQLSchema] = None
+        self._key_index: Tuple[int, ...] = ()
+        self._identity = LRUCache(self._identity_map_size) if self._identity_map_size else None
+        self._generation = 0
 
         if auto_prepare:
             self.prepare()
@@ -417,11 +1266,14 @@ class EasyTable:
         if not isinstance(columns, Sequence):
             columns = (columns,)
 
-        return tuple(self.get_column(column, force=True) for column in columns)
+        return tuple(column if isinstance(column, EasyAggregate) else self.get_column(column, force=True) for column in columns)
 
     def prepare(self, alter_columns=True):
-        command = f'SHOW TABLES FROM {self._database.name} WHERE Tables_in_{self._database.name} = \'{self._name}\';'
-        exists = bool(self._database.execute_command(command, buffered=True).fetchall())
+        exists = self._database.table_info(self._name) is not None
+        if not exists:
+            # The catalog may be older than the table, so a missing table is checked again
+            command = f'SHOW TABLES FROM {self._database.name} WHERE Tables_in_{self._database.name} = \'{self._name}\';'
+            exists = bool(self._database.execute_command(command, buffered=True).fetchall())
         if not exists:
             if self._columns:
                 command = ', '.join([column.get_sql() for column in self._columns])
@@ -438,6 +1290,8 @@ class EasyTable:
 
                 for unique in self.UNIQUES:
                     command += f", {unique.value}"
+                for index in self.INDEXES:
+                    command += f", {index.value}"
 
                 command = f"CREATE TABLE {self._name} ({command});"
                 self._database.execute_command(command)
@@ -447,6 +1301,7 @@ class EasyTable:
             columns = self._database.describe_table(self)
             if self._columns is None or len(self._columns) == 0:
                 self._columns = columns
+                self._column_index = {column.name: column for column in columns}
             else:
                 c1 = set(self._columns)
                 c2 = set(columns)
@@ -464,10 +1319,38 @@ class EasyTable:
             for column in self._columns:
                 column.prepare(self)
 
+            if self.INDEXES:
+                self._add_indexes(alter_columns)
+
         self.set_charset(self.charset)
 
+        self._schema = SQLSchema(self, self._columns)
+        self._key_index = tuple(self._schema.index_of(column) for column in self.PRIMARY)
         self.__prepared = True
 
+    def _add_indexes(self, alter: bool):
+        existing = self._database.table_indexes(self)
+        missing = []
+        for index in self.INDEXES:
+            definition = existing.get(index.name)
+            if definition is None:
+                # An index made under another name still serves the same lookups
+                if index.definition not in existing.values():
+                    missing.append(index)
+            elif definition != index.definition:
+                logger.warning(f'Index {index.name} of Table({self._name}) is on {definition} instead of {index.definition}, leaving it as is')
+
+        if not missing:
+            return
+        if not alter:
+            logger.warning(f'Table({self._name}) is missing the indexes {", ".join(index.name for index in missing)}')
+            return
+
+        logger.info(f'Adding the indexes {", ".join(index.name for index in missing)} to Table({self._name})')
+        self._database.execute_command(f"ALTER TABLE {self._name} {', '.join(f'ADD {index.value}' for index in missing)};")
+        for index in missing:
+            existing[index.name] = index.definition
+
     @property
     def columns(self):
         return self._columns
@@ -487,15 +1370,22 @@ class EasyTable:
     def set_charset(self, charset):
         if charset is not None:
             try:
+                info = self._database.table_info(self.name)
                 try:
-                    command = f'SELECT TABLE_COLLATION FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = \'{self.name}\''
-                    col = self._database.execute_command(command, auto_commit=False).fetchall()[0]
+                    if info is not None:
+                        col = info['collation']
+                    else:
+                        command = (f'SELECT TABLE_COLLATION FROM INFORMATION_SCHEMA.TABLES '
+                                   f'WHERE TABLE_SCHEMA = \'{self._database.name}\' AND TABLE_NAME = \'{self.name}\'')
+                        col = self._database.execute_command(command).fetchall()[0][0]
                 except Exception:
                     col = None
 
                 if charset.collation != col:
                     command = f'ALTER TABLE {self.name} CONVERT TO CHARACTER SET {charset.name} COLLATE {charset.collation};'
                     self._database.execute_command(command)
+                    if info is not None:
+                        info['collation'] = charset.collation
 
                 self._charset = charset
 
@@ -506,16 +1396,126 @@ class EasyTable:
         return int(self._database.execute_command(f"SELECT COUNT(*) FROM {self.name};", buffered=True).fetchone()[0])
 
     def get_column(self, target: Union[ECOS], *, force=False) -> Optional[EasyColumn]:
-        if target in self._columns:
-            return target
-        for column in self._columns:
-            if column.name == target:
-                return column
+        key = target.name if isinstance(target, EasyColumn) else target
+        column = self._column_index.get(key) if isinstance(key, str) else None
+        if column is not None and (column.name == target or column == target):
+            return column
 
         if not force:
             return None
         raise ValueError(f'"{target}" is not implemented in the table({self.name}).')
 
+    def _primary_key(self, values: Sequence[Any]) -> tuple:
+        if not self.PRIMARY:
+            raise ValueError(f'Table({self.name}) does not have a primary key')
+        if len(values) != len(self.PRIMARY):
+            raise ValueError(f'Table({self.name}) has {len(self.PRIMARY)} primary key columns but {len(values)} values were given')
+
+        return tuple(column.cast(value) for column, value in zip(self.PRIMARY, values))
+
+    def _wrap(self, row: tuple) -> SD:
+        data = SQLData(self, row, self._schema)
+        return self._data_convertor(data) if self._data_convertor else data
+
+    def _remember(self, key: tuple, data: SD, generation: int):
+        # Rows read while a write was running may already be stale, they are not kept
+        if generation == self._generation:
+            self._identity.put(key, data)
+
+    def get(self, *pk_values: Any) -> Optional[SD]:
+        """
+        Row of the primary key values, None if it does not exist
+
+        The lookup statement is compiled once per table, found rows are kept in the identity map when `_identity_map_size` is set.
+        """
+        assert self.prepared, 'Unable to perform action before preparing the table'
+        key = self._primary_key(pk_values)
+        identity = None if self._identity is None or self._database.in_transaction else self._identity
+        if identity is not None:
+            data = identity.get(key)
+            if data is not None:
+                return data
+
+        def compile_template():
+            condition = ' AND '.join(f'{column.name} = %s' for column in self.PRIMARY)
+            return f"SELECT {', '.join(column.name for column in self._columns)} FROM {self.name} WHERE {condition}"
+
+        generation = self._generation
+        operation = compiled_template(('GET', self.name, self._columns), compile_template)
+        row = self._database.execute_command(operation, key, prepared=self._database.prepared).fetchone()
+        if row is None:
+            return None
+
+        data = self._wrap(row)
+        if identity is not None:
+            self._remember(key, data, generation)
+        return data
+
+    def get_many(self, pks: Iterable[Any]) -> List[Optional[SD]]:
+        """
+        Rows of many primary keys in the same order, None for the missing ones
+
+        Keys missing from the identity map are fetched with IN queries of at most `GET_MANY_SIZES[-1]` keys,
+        the last query is padded by repeating its last key to the next size so only a few statement shapes are prepared.
+
+        :param pks: primary key values, tuples of values for composite primary keys
+        """
+        assert self.prepared, 'Unable to perform action before preparing the table'
+        keys = [self._primary_key(pk if isinstance(pk, (tuple, list)) else (pk,)) for pk in pks]
+        identity = None if self._identity is None or self._database.in_transaction else self._identity
+
+        found = {}
+        if identity is not None:
+            for key in keys:
+                data = identity.get(key)
+                if data is not None:
+                    found[key] = data
+
+        missing = list(dict.fromkeys(key for key in keys if key not in found))
+        if missing:
+            generation = self._generation
+            fetched = self._fetch_keys(missing)
+            if identity is not None:
+                for key, data in fetched.items():
+                    self._remember(key, data, generation)
+            found.update(fetched)
+
+        return [found.get(key) for key in keys]
+
+    def _fetch_keys(self, keys: List[tuple]) -> Dict[tuple, SD]:
+        found = {}
+        for chunk in _batches(keys, GET_MANY_SIZES[-1]):
+            size = next(size for size in GET_MANY_SIZES if size >= len(chunk))
+            chunk += [chunk[-1]] * (size - len(chunk))
+
+            def compile_template():
+                names = [column.name for column in self.PRIMARY]
+                value = '%s' if len(names) == 1 else f"({', '.join(['%s'] * len(names))})"
+                target = names[0] if len(names) == 1 else f"({', '.join(names)})"
+                return f"SELECT {', '.join(column.name for column in self._columns)} FROM {self.name} WHERE {target} IN ({', '.join([value] * size)})"
+
+            operation = compiled_template(('GET_MANY', self.name, self._columns, size), compile_template)
+            params = tuple(item for key in chunk for item in key)
+            for row in self._database.execute_command(operation, params, prepared=self._database.prepared).fetchall():
+                found[tuple(column.cast(row[index]) for column, index in zip(self.PRIMARY, self._key_index))] = self._wrap(row)
+
+        return found
+
+    def invalidate(self, *pk_values: Any):
+        """
+        Forget the kept rows of the table, only the row of the primary key values when they are given
+
+        Called after every write made through the table, call it after changing the table by other means.
+        """
+        self._generation += 1
+        if self._identity is not None:
+            if pk_values:
+                self._identity.pop(self._primary_key(pk_values))
+            else:
+                self._identity.clear()
+
+        self._database.invalidate(self)
+
     def select(self, *columns: ECOS):
         assert self.prepared, 'Unable to perform action before preparing the table'
         return Select(self._database, self, *columns).convert_by(self._data_convertor)
@@ -524,6 +1524,230 @@ class EasyTable:
         assert self.prepared, 'Unable to perform action before preparing the table'
         return Insert(self._database, self, *values)
 
+    def insert_many(self, rows: Iterable[Sequence[Any]], columns: SOS_ECOS = None, update: bool = True, batch_size: int = 1000) -> List[range]:
+        """
+        Insert rows with multi-row statements instead of one statement per row
+
+        :param rows: values of each row in the order of the columns, may be a generator
+        :param columns: columns receiving the values, all columns of the table if not provided
+        :param update: update the existing row on a duplicate key like `insert` does
+        :param batch_size: maximum rows per statement, statements are also kept under the server's max_allowed_packet
+        :return: the auto increment ids generated by each batch, valid for rows that did not update an existing one
+        """
+        assert self.prepared, 'Unable to perform action before preparing the table'
+        columns = self.assert_columns(columns) or self._columns
+
+        head = f"INSERT INTO {self.name} ({', '.join(column.name for column in columns)}) VALUES "
+        tail = " ON DUPLICATE KEY UPDATE " + ', '.join(f"{column.name}=VALUES({column.name})" for column in columns) if update else ""
+
+        def check(row):
+            if len(row) != len(columns):
+                raise ValueError('Values length do not match with the columns of the table')
+            return zip(columns, row)
+
+        ranges = []
+        prepared = self._database.prepared
+        operation = f"{head}({', '.join(['%s'] * len(columns))}){tail}"
+
+        def flush():
+            # The driver rewrites the prepared batch into one multi-row statement, so both paths send a statement per batch
+            event = self._database._event(shape=operation, params=values if prepared else ())
+            if event is not None:
+                event.command, event.table = 'Insert', self.name
+            if prepared:
+                result = self._database.execute_many(operation, values, _event=event)
+            else:
+                result = self._database.execute_command(head + ', '.join(values) + tail + ';', _event=event)
+            ranges.append(_id_range(result.lastrowid, len(values)))
+            self.invalidate()
+
+        limit = int(self._database.max_allowed_packet * 0.9) - len(head) - len(tail)
+        values, size = [], 0
+        for row in rows:
+            if prepared:
+                value = tuple(column.cast(item) for column, item in check(row))
+                length = sum(_param_size(item) for item in value) + 2 * len(value)
+            else:
+                value = f"({', '.join(column.parse(item) for column, item in check(row))})"
+                length = len(value.encode()) + 2
+            if values and (len(values) >= batch_size or size + length > limit):
+                flush()
+                values, size = [], 0
+
+            values.append(value)
+            size += length
+
+        if values:
+            flush()
+
+        return ranges
+
+    def load(self, source: Union[str, os.PathLike, Iterable[Sequence[Any]]], columns: SOS_ECOS = None, mode: str = None) -> dict:
+        """
+        Bulk load rows with LOAD DATA LOCAL INFILE, requires `_local_infile` on the database and local_infile on the server
+
+        Rows are cast by their columns and streamed into a temporary tab separated file one by one, so a generator is never held in memory.
+
+        :param source: values of each row in the order of the columns, or the path of a tab separated file with `\\N` as NULL
+        :param columns: columns receiving the values, all columns of the table if not provided
+        :param mode: 'REPLACE' to overwrite the rows with a duplicate key or 'IGNORE' to skip them, duplicates are skipped by default
+        :return: the loaded rows, the affected rows reported by the server, the seconds spent and the rows per second
+        """
+        assert self.prepared, 'Unable to perform action before preparing the table'
+        if not self._database.local_infile:
+            raise DatabaseSafetyException('Loading local files is disabled, set "_local_infile" on the database to enable it')
+        if mode is not None and mode.upper() not in ('REPLACE', 'IGNORE'):
+            raise ValueError(f'mode must be "REPLACE", "IGNORE" or None, not "{mode}"')
+
+        columns = self.assert_columns(columns) or self._columns
+        start = perf_counter()
+        written = None
+        path = source if isinstance(source, (str, os.PathLike)) else None
+        try:
+            if path is None:
+                with tempfile.NamedTemporaryFile('w', encoding='utf8', newline='', suffix='.tsv', delete=False) as file:
+                    path = file.name
+                    written = 0
+                    for row in source:
+                        if len(row) != len(columns):
+                            raise ValueError('Values length do not match with the columns of the table')
+
+                        file.write('\t'.join(_infile_value(column.cast(value)) for column, value in zip(columns, row)) + '\n')
+                        written += 1
+
+            operation = (f"LOAD DATA LOCAL INFILE %s {mode.upper() + ' ' if mode else ''}INTO TABLE {self.name} CHARACTER SET utf8mb4 "
+                         f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' ({', '.join(column.name for column in columns)})")
+            result = self._database.execute_command(operation, (os.fspath(path),))
+        finally:
+            if written is not None:
+                os.remove(path)
+            self.invalidate()
+
+        seconds = perf_counter() - start
+        rows = result.rowcount if written is None else written
+        report = {'rows': rows, 'affected': result.rowcount, 'seconds': seconds, 'rows_per_second': rows / seconds if seconds else 0.0}
+        logger.info(f'Loaded {rows} rows into {self.name} in {seconds:.3f}s ({report["rows_per_second"]:,.0f} rows per second)')
+        return report
+
+    def _execute_rows(self, operation: str, values: Sequence[Tuple[EasyColumn, Any]]) -> SQLResult:
+        # Values are bound when statements are prepared, otherwise they are parsed into the statement
+        if self._database.prepared:
+            return self._database.execute_command(operation, tuple(column.cast(value) for column, value in values), prepared=True)
+        return self._database.execute_command(operation % tuple(column.parse(value) for column, value in values))
+
+    def update_many(self, key_columns: SOS_ECOS, value_columns: SOS_ECOS, rows: Iterable[Sequence[Any]], batch_size: int = 1000,
+                    method: str = None) -> int:
+        """
+        Set different values on many rows found by their keys, all in one transaction
+
+        Rows fitting in one batch are updated with a `CASE` statement, more rows are loaded into a temporary table
+        and updated with a single join.
+
+        :param key_columns: columns finding the rows, usually the primary key, the keys of the given rows must be unique
+        :param value_columns: columns receiving the new values
+        :param rows: key values followed by the new values of each row, may be a generator
+        :param batch_size: maximum rows per statement, statements are also kept under 65535 placeholders and the server's max_allowed_packet
+        :param method: 'case' or 'join' to choose the method instead of the size of the rows
+        :return: the affected rows
+        """
+        assert self.prepared, 'Unable to perform action before preparing the table'
+        keys, values = self.assert_columns(key_columns), self.assert_columns(value_columns)
+        if not keys or not values:
+            raise ValueError('Both key columns and value columns are required')
+        if method not in (None, 'case', 'join'):
+            raise ValueError(f'method must be "case", "join" or None, not "{method}"')
+
+        def check(row):
+            if len(row) != len(keys) + len(values):
+                raise ValueError('Values length do not match with the key and value columns')
+            return tuple(row)
+
+        # A CASE row binds its keys once per value column and again in the IN list, rows loaded for the join bind every column once,
+        # so batches sized for the CASE statement also fit the temporary table
+        target, key = self._case_target(keys)
+        join = method == 'join'
+        placeholders = len(keys) + len(values) if join else len(values) * (len(keys) + 1) + len(keys)
+        if self._database.prepared:
+            batch_size = max(1, min(batch_size, _MAX_PLACEHOLDERS // placeholders))
+        clause = 0 if join else len(f'WHEN {target} = {key} THEN %s ')
+        fixed = len(f'UPDATE {self.name} SET  WHERE {target} IN ()') + sum(len(f'{column.name} = CASE ELSE {column.name} END, ') for column in values)
+
+        def weight(row):
+            sizes = [_param_size(item) for item in row]
+            key_size = sum(sizes[:len(keys)])
+            return key_size * (1 if join else len(values) + 1) + sum(sizes[len(keys):]) + len(values) * clause + 2 * placeholders
+
+        limit = int(self._database.max_allowed_packet * 0.9) - fixed
+        batches = _batches((check(row) for row in rows), batch_size, weight, limit)
+        first, second = next(batches, None), next(batches, None)
+        if first is None:
+            return 0
+
+        method = method or ('case' if second is None else 'join')
+        batches = chain([first] if second is None else [first, second], batches)
+        with self._database.transaction():
+            affected = self._update_case(keys, values, batches) if method == 'case' else self._update_join(keys, values, batches)
+
+        self.invalidate()
+        return affected
+
+    @staticmethod
+    def _case_target(keys: Sequence[EasyColumn]) -> Tuple[str, str]:
+        target = keys[0].name if len(keys) == 1 else f"({', '.join(column.name for column in keys)})"
+        return target, '%s' if len(keys) == 1 else f"({', '.join(['%s'] * len(keys))})"
+
+    def _update_case(self, keys: Sequence[EasyColumn], values: Sequence[EasyColumn], batches: Iterable[List[tuple]]) -> int:
+        target, key = self._case_target(keys)
+
+        affected = 0
+        for batch in batches:
+            cases = ', '.join(f"{column.name} = CASE {f'WHEN {target} = {key} THEN %s ' * len(batch)}ELSE {column.name} END" for column in values)
+            operation = f"UPDATE {self.name} SET {cases} WHERE {target} IN ({', '.join([key] * len(batch))})"
+
+            bound = [item for index, column in enumerate(values, len(keys))
+                     for row in batch for item in chain(zip(keys, row), ((column, row[index]),))]
+            bound += [item for row in batch for item in zip(keys, row)]
+            affected += self._execute_rows(operation, bound).rowcount
+
+        return affected
+
+    def _update_join(self, keys: Sequence[EasyColumn], values: Sequence[EasyColumn], batches: Iterable[List[tuple]]) -> int:
+        # Temporary tables belong to their connection, the transaction keeps every statement on the same one
+        temporary = f'easysql_update_{self.name}'
+        columns = tuple(keys) + tuple(values)
+        definition = ', '.join(' '.join((column.name, column.sql_type.name) + tuple(column.sql_type.tags)) for column in columns)
+
+        self._database.execute_command(f'DROP TEMPORARY TABLE IF EXISTS {temporary}')
+        self._database.execute_command(f"CREATE TEMPORARY TABLE {temporary} ({definition}, PRIMARY KEY ({', '.join(column.name for column in keys)}))")
+        try:
+            head = f"INSERT INTO {temporary} ({', '.join(column.name for column in columns)}) VALUES "
+            row = f"({', '.join(['%s'] * len(columns))})"
+            for batch in batches:
+                self._execute_rows(head + ', '.join([row] * len(batch)), [item for data in batch for item in zip(columns, data)])
+
+            on = ' AND '.join(f'{self.name}.{column.name} = {temporary}.{column.name}' for column in keys)
+            sets = ', '.join(f'{self.name}.{column.name} = {temporary}.{column.name}' for column in values)
+            return self._database.execute_command(f'UPDATE {self.name} JOIN {temporary} ON {on} SET {sets}').rowcount
+        finally:
+            self._database.execute_command(f'DROP TEMPORARY TABLE IF EXISTS {temporary}')
+
+    def purge_older_than(self, column: ECOS, age: Union[timedelta, float], size: int = 1000, pause: float = 0.0,
+                         progress: Callable[[int, int], Any] = None) -> int:
+        """
+        Delete the rows whose timestamp column is older than `age`, in committed chunks like `Delete.in_chunks`
+
+        The column holds unix timestamps in seconds, the rows are removed from the oldest one.
+
+        :param column: the timestamp column, an index on it keeps every chunk cheap
+        :param age: retention as a timedelta or in seconds
+        :return: the total rows removed
+        """
+        assert self.prepared, 'Unable to perform action before preparing the table'
+        column = self.get_column(column, force=True)
+        seconds = age.total_seconds() if isinstance(age, timedelta) else age
+        order = (column,) + tuple(key for key in self.PRIMARY if key != column)
+        return self.delete(column.is_lesser(time() - seconds)).in_chunks(size, pause, order, progress)
+
     def update(self, *columns: ECOS):
         assert self.prepared, 'Unable to perform action before preparing the table'
         return Update(self._database, self, *columns)
@@ -545,28 +1769,143 @@ class Select(SQLCommandExecutable):
         self._desc = False
         self._force_one = False
         self._convertor = None
+        self._cache = True
+        self._primary = False
+        self._after = None
+        self._group = None
+        self._having = None
+        self._joins = ()
+        self._prefetch = ()
+        self._prefetch_size = 1000
+
+    def _template(self) -> Tuple[str, str, str]:
+        def compile_template():
+            # Joined selects qualify every column by its table, the same names may appear in many of them
+            name = (lambda col: col.sql_name) if self._joins else (lambda col: col.name)
+            columns = self._selected() if self._joins else self._columns
+            head = f"SELECT {', '.join([name(col) for col in columns]) if columns else '*'} FROM {self._table.name}"
+            for table, on, left, _ in self._joins:
+                head += f" {'LEFT ' if left else ''}JOIN {table.name} ON {on}"
+            group = f" GROUP BY {', '.join(name(col) for col in self._group)}" if self._group else ''
+            tail = ''
+            if self._order:
+                tail += f" ORDER BY {', '.join([name(col) + (' DESC' if self._desc else '') for col in self._order])}"
+            if self._force_one or self._limit is not None:
+                tail += " LIMIT %s"
+            if self._offset is not None:
+                tail += " OFFSET %s"
+            return head, group, tail
+
+        # Columns compare by name and type, so the key names them by table to tell apart the same named columns of joined tables
+        joins = tuple((table.name, on, left, _sql_names(columns)) for table, on, left, columns in self._joins)
+        key = ('SELECT', self._table.name, _sql_names(self._columns), joins, _sql_names(self._group), _sql_names(self._order), self._desc,
+               self._force_one or self._limit is not None, self._offset is not None)
+        return compiled_template(key, compile_template)
+
+    def _bounds(self) -> tuple:
+        limit = 1 if self._force_one else self._limit
+        bounds = () if limit is None else (int(limit),)
+        return bounds if self._offset is None else bounds + (int(self._offset),)
 
     def get_value(self) -> str:
-        parts = [
-            f"SELECT {', '.join([col.name for col in self._columns]) if self._columns else '*'}",
-            f"FROM {self._table.name}",
-        ]
+        head, group, tail = self._template()
+        where = f' {self._where.get_value()}' if self._where else ''
+        having = f' HAVING {self._having.value}' if self._having else ''
+        return head + where + group + having + tail % self._bounds() + ';'
+
+    def get_query(self) -> Tuple[str, tuple]:
+        head, group, tail = self._template()
+        params = ()
         if self._where:
-            parts.append(self._where.get_value())
-        if self._order:
-            parts.append(f"ORDER BY {', '.join([col.name for col in self._order])}{' DESC' if self._desc else ''}")
-        limit = 1 if self._force_one else self._limit
-        if limit is not None:
-            parts.append(f"LIMIT {limit}")
-        if self._offset is not None:
-            parts.append(f"OFFSET {self._offset}")
-        return " ".join(parts) + ";"
+            where, params = self._where.get_query()
+            head = f'{head} {where}'
+        if self._having:
+            group = f'{group} HAVING {self._having.template}'
+            params = params + self._having.params
 
-    def execute(self) -> Union[None, SD, List[SD]]:
-        result = self._database.execute(self, auto_commit=False).fetchall()
-        columns = self._columns or self._table.columns
-        new_result = [SQLData(self._table, item, columns) for item in result]
+        return head + group + tail, params + self._bounds()
+
+    def _selected(self) -> Tuple[EasyColumn, ...]:
+        if self._group and self._joins:
+            # Grouped rows only hold the grouped columns and the aggregates, other columns would break ONLY_FULL_GROUP_BY
+            return tuple(self._columns or self._group)
+
+        columns = tuple(self._columns or self._table.columns)
+        for _, _, _, joined in self._joins:
+            columns += joined
+        return columns
+
+    def _tables(self) -> Tuple[str, ...]:
+        return (self._table.name,) + tuple(table.name for table, _, _, _ in self._joins)
 
+    def _bare_joins(self) -> tuple:
+        return tuple((table, on, left, ()) for table, on, left, _ in self._joins)
+
+    def _assert_columns(self, columns: SOS_ECOS) -> Optional[Sequence[EasyColumn]]:
+        if not self._joins or columns is None or columns == '*':
+            return self._table.assert_columns(columns)
+        if not isinstance(columns, Sequence):
+            columns = (columns,)
+
+        # Columns are matched by name and type, so the joined ones are recognized by their table first
+        joined = {id(table): table for table, _, _, _ in self._joins}
+        return tuple(column if isinstance(column, EasyColumn) and id(column.table) in joined else self._table.assert_columns((column,))[0]
+                     for column in columns)
+
+    def _join_on(self, other: EasyTable, on) -> str:
+        if on is None:
+            tables = (self._table,) + tuple(table for table, _, _, _ in self._joins)
+            references = [column for table in tables for column in table.columns
+                          if isinstance(column, EasyForeignColumn) and column.refer_table is other]
+            references += [column for column in other.columns
+                           if isinstance(column, EasyForeignColumn) and any(column.refer_table is table for table in tables)]
+            if len(references) != 1:
+                raise ValueError(f'Found {len(references)} foreign columns between Table({other.name}) and the selected tables, pass `on` to pick one')
+            on = references[0]
+
+        if isinstance(on, EasyForeignColumn):
+            return f'{on.sql_name} = {on.refer_table.name}.{on.refer_column.name}'
+
+        a, b = on
+        return f'{a.sql_name} = {b.sql_name}'
+
+    def schema(self) -> SQLSchema:
+        return SQLSchema(self._table, self._selected())
+
+    def execute(self) -> Union[None, SD, List[SD]]:
+        return self._process(self._database.fetch(self, self._tables(), self._cache))
+
+    async def execute_async(self) -> Union[None, SD, List[SD]]:
+        result = await self._database.fetch_async(self, self._tables(), self._cache)
+        return await asyncio.to_thread(self._process, result) if self._prefetch else self._process(result)
+
+    def _attach(self, rows: List[SQLData]):
+        for column in self._prefetch:
+            table = column.refer_table
+            target = table.get_column(column.refer_column, force=True)
+            keys = dict.fromkeys(value for value in (data.get(column) for data in rows) if value is not None)
+
+            related = {}
+            for chunk in _batches(keys, self._prefetch_size):
+                # Selected through the table, so the rows of a sharded table are read from its shards
+                select = table.select().where(target.is_in(chunk))._set(cache=self._cache, convertor=None)
+                select._executed = True
+                schema = select.schema()
+                for row in select._database.fetch(select, select._tables(), self._cache):
+                    data = SQLData(table, row, schema)
+                    related[data.get(target)] = table._data_convertor(data) if table._data_convertor else data
+
+            for data in rows:
+                if data._related is None:
+                    data._related = {}
+                data._related[column] = related.get(data.get(column))
+
+    def _process(self, result: List[tuple]) -> Union[None, SD, List[SD]]:
+        schema = self.schema()
+        new_result = [SQLData(self._table, item, schema) for item in result]
+
+        if self._prefetch:
+            self._attach(new_result)
         if self._convertor:
             new_result = [self._convertor(item) for item in new_result]
 
@@ -580,13 +1919,182 @@ class Select(SQLCommandExecutable):
             else new_result
         )
 
+    def stream(self, chunk_size: int = 1000) -> Iterator[SD]:
+        """
+        Lazily yield the selected rows, only `chunk_size` rows are fetched from the server at a time
+
+        Stop early by breaking out of the loop or closing the generator, the connection is cleaned up either way.
+        """
+        schema = self.schema()
+        for rows in self._database.iterate(self, chunk_size):
+            rows = [SQLData(self._table, item, schema) for item in rows]
+            if self._prefetch:
+                self._attach(rows)
+            for data in rows:
+                yield self._convertor(data) if self._convertor else data
+
+    async def stream_async(self, chunk_size: int = 1000) -> AsyncIterator[SD]:
+        """
+        Asynchronous version of `stream`, use it with `async for`
+        """
+        schema = self.schema()
+        chunks = self._database.iterate_async(self, chunk_size)
+        try:
+            async for rows in chunks:
+                rows = [SQLData(self._table, item, schema) for item in rows]
+                if self._prefetch:
+                    await asyncio.to_thread(self._attach, rows)
+                for data in rows:
+                    yield self._convertor(data) if self._convertor else data
+        finally:
+            # Async generators are not closed when they are dropped, the connection would stay checked out until the loop ends
+            await chunks.aclose()
+
+    def scalar(self) -> Any:
+        """
+        First value of the first row cast by its column, None if there are no rows
+        """
+        select = copy.copy(self)._set(limit=1, force_one=False)
+        self._executed = True
+        rows = self._database.fetch(select, self._tables(), self._cache)
+        return select.schema().casters[0](rows[0][0]) if rows else None
+
+    def count(self) -> int:
+        """
+        Number of rows matching the condition, counted by the server
+        """
+        select = copy.copy(self)._set(columns=(EasyAggregate('COUNT'),), joins=self._bare_joins(), group=None, having=None, order=None, limit=None, offset=None)
+        self._executed = True
+        return select.scalar()
+
+    def exists(self) -> bool:
+        """
+        Whether any row matches the condition, the server stops at the first one
+        """
+        select = copy.copy(self)._set(columns=(_ONE,), joins=self._bare_joins(), group=None, having=None, order=None, limit=1, offset=None, force_one=False)
+        self._executed = True
+        return bool(self._database.fetch(select, self._tables(), self._cache))
+
+    def _keyset(self) -> Tuple[EasyColumn, ...]:
+        order = tuple(self._order or ())
+        keys = [tuple(self._table.PRIMARY)] + [unique.columns for unique in self._table.UNIQUES
+                                               if all(NOT_NULL in column.tags for column in unique.columns)]
+        if any(key and all(column in order for column in key) for key in keys):
+            return order
+
+        if not self._table.PRIMARY:
+            raise ValueError(f'Table({self._table.name}) needs a primary key or a not null unique ordered column set to paginate')
+        return order + tuple(column for column in self._table.PRIMARY if column not in order)
+
+    def _page_select(self, page_size: int) -> Tuple['Select', Tuple[EasyColumn, ...]]:
+        keys = self._keyset()
+        select = copy.copy(self)
+        self._executed = True
+        columns = self._columns + tuple(column for column in keys if column not in self._columns) if self._columns else None
+        select._set(columns=columns, order=keys, limit=page_size, offset=None, force_one=False)
+
+        if self._after is not None:
+            try:
+                names, values = json.loads(base64.urlsafe_b64decode(self._after.encode()))
+            except Exception:
+                raise ValueError('The continuation token is malformed')
+            if names != [column.name for column in keys]:
+                raise ValueError(f'The continuation token was made for the order ({", ".join(names)}) of another select')
+
+            after = WhereIsAfter(keys, values, self._desc)
+            select._set(where=self._where & after if self._where else after)
+
+        return select, keys
+
+    def _page(self, select: 'Select', keys: Tuple[EasyColumn, ...], rows: List[tuple]) -> Page:
+        schema = select.schema()
+        page = Page(SQLData(self._table, row, schema) for row in rows)
+        if self._prefetch:
+            self._attach(page)
+        if self._convertor:
+            page[:] = [self._convertor(data) for data in page]
+
+        if len(rows) == select._limit:
+            values = [rows[-1][schema.index_of(column)] for column in keys]
+            page.token = base64.urlsafe_b64encode(json.dumps([[column.name for column in keys], values], default=str).encode()).decode()
+        return page
+
+    def paginate(self, page_size: int) -> Page:
+        """
+        Fetch one page with keyset pagination, continue with `after(page.token)` on the same select
+
+        Rows are sought with `(order columns) > (last values)` instead of skipping them with OFFSET,
+        the primary key is added to the order unless it already holds the primary key or a not null unique set.
+        Nullable order columns are compared NULL safely with an expanded condition, which may use the index less well.
+        """
+        select, keys = self._page_select(page_size)
+        return self._page(select, keys, self._database.fetch(select, self._tables(), self._cache))
+
+    async def paginate_async(self, page_size: int) -> Page:
+        select, keys = self._page_select(page_size)
+        rows = await self._database.fetch_async(select, self._tables(), self._cache)
+        return await asyncio.to_thread(self._page, select, keys, rows) if self._prefetch else self._page(select, keys, rows)
+
+    def explain(self) -> QueryPlan:
+        """
+        Plan of the select from `EXPLAIN FORMAT=JSON`, with the access type, key and rows estimate of each table
+        """
+        self._executed = True
+        return self._database.explain(*self.get_query())
+
+    def to_columns(self, chunk_size: int = 10000) -> dict:
+        """
+        Fetch the result as one numpy masked array per selected column, NULL values are masked
+
+        Rows are read in chunks and never converted to SQLData, integer ranges are validated per chunk. Requires numpy.
+        The arrays are keyed by the column names, qualified with their tables like `Pet.Name` when the select has joins.
+        """
+        return fetch_columns(self._database.iterate(self, chunk_size), self._selected(), qualified=bool(self._joins))
+
     def where(self, where: Where) -> "Select": return self._set(where=where)
     def limit(self, limit: int) -> "Select": return self._set(limit=limit)
     def offset(self, offset: int) -> "Select": return self._set(offset=offset)
-    def order(self, *order: ECOS) -> "Select": return self._set(order=self._table.assert_columns(order))
+    def order(self, *order: ECOS) -> "Select": return self._set(order=self._assert_columns(order))
     def descending(self) -> "Select": return self._set(desc=True)
     def just_one(self) -> "Select": return self._set(force_one=True)
     def convert_by(self, convertor=None) -> "Select": return self._set(convertor=convertor)
+    def no_cache(self) -> "Select": return self._set(cache=False)
+    def on_primary(self) -> "Select": return self._set(primary=True)
+    def after(self, token: Optional[str]) -> "Select": return self._set(after=token)
+    def group_by(self, *columns: ECOS) -> "Select": return self._set(group=self._assert_columns(columns))
+    def having(self, having: Where) -> "Select": return self._set(having=having)
+
+    def join(self, other: EasyTable, on: Union[EasyForeignColumn, Tuple[EasyColumn, EasyColumn]] = None, left: bool = False,
+             columns: SOS_ECOS = None) -> "Select":
+        """
+        Join another table, its columns are added to the rows and read from them like the columns of this table
+
+        :param other: the prepared table to join, a table can be joined only once
+        :param on: foreign column or pair of columns to match, defaults to the only foreign column between the tables
+        :param left: keep the rows without a match, the columns of the other table are None then
+        :param columns: columns of the other table to select, all of them by default
+        """
+        assert other.prepared, 'Unable to perform action before preparing the table'
+        if other is self._table or any(other is table for table, _, _, _ in self._joins):
+            raise ValueError(f'Table({other.name}) is already part of the select')
+
+        columns = tuple(other.assert_columns(columns) or other.columns)
+        return self._set(joins=self._joins + ((other, self._join_on(other, on), left, columns),))
+
+    def prefetch(self, *columns: ECOS, chunk_size: int = 1000) -> "Select":
+        """
+        Load the rows referenced by foreign columns with one `IN` query per chunk of distinct values, read them by `data.related(column)`
+
+        The referenced rows are converted by the data class of their table and attached before the rows are converted.
+        """
+        columns = self._table.assert_columns(columns) or ()
+        for column in columns:
+            if not isinstance(column, EasyForeignColumn):
+                raise ValueError(f'Only foreign columns can be prefetched, got `{column}`')
+            if self._columns and column not in self._columns:
+                raise ValueError(f'`{column}` has to be selected to be prefetched')
+
+        return self._set(prefetch=self._prefetch + tuple(columns), prefetch_size=chunk_size)
 
 
 class Insert(SQLCommandExecutable):
@@ -597,23 +2105,45 @@ class Insert(SQLCommandExecutable):
         self._values = values
         self._update = True
 
-    def get_value(self) -> str:
+    def _template(self) -> str:
+        def compile_template():
+            columns = ', '.join(column.name for column in self._columns)
+            values = ', '.join(['%s'] * len(self._columns))
+            extra = (
+                f" ON DUPLICATE KEY UPDATE " + ', '.join(f"{column.name}=VALUES({column.name})" for column in self._columns)
+                if self._update else ""
+            )
+            return f"INSERT INTO {self._table.name} ({columns}) VALUES ({values}){extra}"
+
         if len(self._columns) != len(self._values):
             raise ValueError('Values length do not match with the columns of the table')
 
-        columns = ', '.join(column.name for column in self._columns)
-        values = ', '.join(column.parse(value) for column, value in zip(self._columns, self._values))
+        return compiled_template(('INSERT', self._table.name, self._columns, self._update), compile_template)
 
-        extra = (
-            f" ON DUPLICATE KEY UPDATE " +
-            ', '.join(f"{column.name}={column.parse(value)}" for column, value in zip(self._columns, self._values))
-            if self._update else ""
-        )
+    def get_value(self) -> str:
+        template = self._template()
+        return template % tuple(column.parse(value) for column, value in zip(self._columns, self._values)) + ';'
 
-        return f"INSERT INTO {self._table.name} ({columns}) VALUES ({values}){extra};"
+    def get_query(self) -> Tuple[str, tuple]:
+        template = self._template()
+        return template, tuple(column.cast(value) for column, value in zip(self._columns, self._values))
 
     def execute(self):
-        return self._database.execute(self, buffered=True).lastrowid
+        result = self._database.execute(self, buffered=True)
+        self._invalidate()
+        return result.lastrowid
+
+    async def execute_async(self):
+        result = await self._database.execute_async(self, buffered=True)
+        self._invalidate()
+        return result.lastrowid
+
+    def _invalidate(self):
+        if all(column in self._columns for column in self._table.PRIMARY):
+            values = dict(zip(self._columns, self._values))
+            self._table.invalidate(*(values[column] for column in self._table.PRIMARY))
+        else:
+            self._table.invalidate()
 
     def into(self, *columns: ECOS) -> "Insert": return self._set(columns=self._table.assert_columns(columns))
 
@@ -630,18 +2160,43 @@ class Update(SQLCommandExecutable):
         self._values = []
         self._where = None
 
-    def get_value(self) -> str:
+    def _template(self) -> str:
+        def compile_template():
+            return f"UPDATE {self._table.name} SET " + ', '.join([f'{column.name} = %s' for column in self._columns])
+
         if len(self._columns) != len(self._values):
             raise ValueError('Values length do not match with the columns')
 
-        set_command = ', '.join([f'{column.name} = {column.parse(value)}' for column, value in zip(self._columns, self._values)])
-        return f"UPDATE {self._table.name} SET {set_command}" + f' {self._where.get_value()};' if self._where else ";"
+        return compiled_template(('UPDATE', self._table.name, self._columns), compile_template)
+
+    def get_value(self) -> str:
+        command = self._template() % tuple(column.parse(value) for column, value in zip(self._columns, self._values))
+        return command + (f' {self._where.get_value()};' if self._where else ";")
+
+    def get_query(self) -> Tuple[str, tuple]:
+        command = self._template()
+        params = tuple(column.cast(value) for column, value in zip(self._columns, self._values))
+        if not self._where:
+            return command, params
+
+        where, where_params = self._where.get_query()
+        return f"{command} {where}", params + where_params
 
     def execute(self):
         if self._database.safe and self._where is None:
             raise DatabaseSafetyException('Update without any condition is prohibited')
 
-        return self._database.execute(self, buffered=True).lastrowid
+        result = self._database.execute(self, buffered=True)
+        self._table.invalidate()
+        return result.lastrowid
+
+    async def execute_async(self):
+        if self._database.safe and self._where is None:
+            raise DatabaseSafetyException('Update without any condition is prohibited')
+
+        result = await self._database.execute_async(self, buffered=True)
+        self._table.invalidate()
+        return result.lastrowid
 
     def where(self, where: Where) -> "Update":
         return self._set(where=where)
@@ -657,12 +2212,77 @@ class Delete(SQLCommandExecutable):
         self._database = database
         self._table = table
         self._where = where
+        self._order = None
+        self._limit = None
+
+    def _tail(self) -> str:
+        tail = f" ORDER BY {', '.join(column.name for column in self._order)}" if self._order else ""
+        return tail + " LIMIT %s" if self._limit is not None else tail
 
     def get_value(self) -> str:
-        return f"DELETE FROM {self._table.name}" + (f' {self._where.get_value()};' if self._where else ";")
+        tail = self._tail() % ((int(self._limit),) if self._limit is not None else ())
+        return f"DELETE FROM {self._table.name}" + (f' {self._where.get_value()}' if self._where else "") + tail + ";"
+
+    def get_query(self) -> Tuple[str, tuple]:
+        limit = (int(self._limit),) if self._limit is not None else ()
+        if not self._where:
+            return f"DELETE FROM {self._table.name}{self._tail()}", limit
+
+        where, params = self._where.get_query()
+        return f"DELETE FROM {self._table.name} {where}{self._tail()}", params + limit
 
     def execute(self):
         if self._database.safe and self._where is None:
             raise DatabaseSafetyException('Delete without any condition is prohibited')
 
-        return self._database.execute(self, buffered=True).lastrowid
+        result = self._database.execute(self, buffered=True)
+        self._table.invalidate()
+        return result.lastrowid
+
+    async def execute_async(self):
+        if self._database.safe and self._where is None:
+            raise DatabaseSafetyException('Delete without any condition is prohibited')
+
+        result = await self._database.execute_async(self, buffered=True)
+        self._table.invalidate()
+        return result.lastrowid
+
+    def in_chunks(self, size: int = 1000, pause: float = 0.0, order: SOS_ECOS = None, progress: Callable[[int, int], Any] = None) -> int:
+        """
+        Delete the matching rows `size` at a time, every chunk is committed on its own so locks are held briefly
+
+        Each chunk deletes the first rows by `order`, so an interrupted delete is resumed by running it again.
+
+        :param size: maximum rows deleted per chunk
+        :param pause: seconds to sleep between chunks, gives replicas time to catch up
+        :param order: columns ordering the deleted rows, the primary key if not provided
+        :param progress: called with the rows removed by the chunk and the total after every chunk
+        :return: the total rows removed
+        """
+        if self._database.safe and self._where is None:
+            raise DatabaseSafetyException('Delete without any condition is prohibited')
+        if self._database.in_transaction:
+            raise DatabaseSafetyException('Chunked deletes commit every chunk, unable to run them inside a transaction')
+
+        chunk = copy.copy(self)
+        chunk._set(order=self._table.assert_columns(order) or self._table.PRIMARY or None, limit=size)
+        self._executed = True
+
+        total = 0
+        while True:
+            removed = self._database.execute(chunk).rowcount
+            total += removed
+            self._table.invalidate()
+
+            if progress is not None:
+                progress(removed, total)
+            elif logger.isEnabledFor(DEBUG):
+                logger.debug(f'Deleted {removed} rows from {self._table.name}, {total} rows so far')
+
+            if removed < size:
+                break
+            if pause:
+                sleep(pause)
+
+        logger.info(f'Deleted {total} rows from {self._table.name} in chunks of {size}')
+        return total
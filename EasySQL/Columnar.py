@@ -0,0 +1,95 @@
+from typing import Iterable, Sequence, Dict, List
+
+from .ABC import SQLType
+from .Types import BOOL
+
+__all__ = ['numpy_dtype', 'fetch_columns']
+
+_FLOAT_TYPES = {'FLOAT': 'float32', 'DOUBLE': 'float64', 'DECIMAL': 'float64'}
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError('numpy is required for columnar results, install it with "pip install numpy"') from None
+
+    return numpy
+
+
+def numpy_dtype(sql_type: SQLType):
+    """
+    The numpy dtype holding the values of a SQLType, object for the types without a numeric dtype
+    """
+    numpy = _numpy()
+    if sql_type is BOOL:
+        return numpy.dtype('bool')
+
+    name = sql_type.name.split('(')[0]
+    if name in _FLOAT_TYPES:
+        return numpy.dtype(_FLOAT_TYPES[name])
+
+    bit_size = getattr(sql_type.caster, 'bit_size', None)
+    if bit_size is None:
+        return numpy.dtype('object')
+
+    width = next(width for width in (8, 16, 32, 64) if bit_size <= width or width == 64)
+    unsigned = name == 'BIT' or 'UNSIGNED' in sql_type.tags
+    return numpy.dtype(f'{"uint" if unsigned else "int"}{width}')
+
+
+def _convert(numpy, sql_type: SQLType, dtype, values: list):
+    mask = numpy.fromiter((value is None for value in values), dtype=bool, count=len(values))
+    if dtype.kind == 'O':
+        array = numpy.empty(len(values), dtype=object)
+        array[:] = [None if value is None else sql_type.cast(value) for value in values]
+        return array, mask
+
+    filled = [0 if value is None else value for value in values] if mask.any() else values
+    try:
+        array = numpy.array(filled, dtype=dtype)
+    except OverflowError as e:
+        raise ValueError(f'{sql_type.name} value does not fit in {dtype}: {e}') from None
+
+    minimum = getattr(sql_type.caster, 'minimum', None)
+    maximum = getattr(sql_type.caster, 'maximum', None)
+    if minimum is not None and dtype.kind in 'iu':
+        info = numpy.iinfo(dtype)
+        invalid = ((array < max(minimum, info.min)) | (array > min(maximum, info.max))) & ~mask
+        if invalid.any():
+            raise ValueError(f'can only accept between {minimum} and {maximum}, but got {array[invalid.argmax()]}')
+
+    return array, mask
+
+
+def fetch_columns(chunks: Iterable[List[tuple]], columns: Sequence, qualified: bool = False) -> Dict[str, 'numpy.ma.MaskedArray']:
+    """
+    Build one masked array per column from chunks of rows, NULL values are masked
+
+    :param chunks: lists of rows as returned by the driver
+    :param columns: the columns of the rows, in order
+    :param qualified: key the arrays by the names qualified with their tables, needed when the rows come from a join
+    :return: the arrays by the name of their columns
+    """
+    names = [column.sql_name if qualified else column.name for column in columns]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f'Columns {", ".join(duplicates)} are selected more than once, their arrays would overwrite each other')
+
+    numpy = _numpy()
+    dtypes = [numpy_dtype(column.sql_type) for column in columns]
+    parts = [([], []) for _ in columns]
+
+    for rows in chunks:
+        for i, (column, dtype) in enumerate(zip(columns, dtypes)):
+            array, mask = _convert(numpy, column.sql_type, dtype, [row[i] for row in rows])
+            parts[i][0].append(array)
+            parts[i][1].append(mask)
+
+    result = {}
+    for name, dtype, (arrays, masks) in zip(names, dtypes, parts):
+        data = numpy.concatenate(arrays) if arrays else numpy.empty(0, dtype=dtype)
+        mask = numpy.concatenate(masks) if masks else numpy.empty(0, dtype=bool)
+        result[name] = numpy.ma.MaskedArray(data, mask=mask)
+
+    return result
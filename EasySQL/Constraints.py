@@ -1,16 +1,17 @@
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional, Sequence
 
 from .ABC import SQLConstraints
 
 if TYPE_CHECKING:
     from .Classes import EasyColumn
 
-__all__ = ['PRIMARY', 'NOT_NULL', 'AUTO_INCREMENT', 'UNIQUE', 'Unique']
+__all__ = ['PRIMARY', 'NOT_NULL', 'AUTO_INCREMENT', 'UNIQUE', 'INDEX', 'Unique', 'Index']
 
 PRIMARY = SQLConstraints('PRIMARY KEY')
 NOT_NULL = SQLConstraints('NOT NULL')
 AUTO_INCREMENT = SQLConstraints('AUTO_INCREMENT')
 UNIQUE = SQLConstraints('UNIQUE')
+INDEX = SQLConstraints('INDEX')
 
 
 class Unique(SQLConstraints):
@@ -25,7 +26,39 @@ class Unique(SQLConstraints):
         :param columns: the column or columns for this constraint
         :param name: the name for this constraint
         """
+        self.columns = columns
         if name is None:
             super().__init__(f'UNIQUE ({", ".join([column.name for column in columns])})')
         else:
             super().__init__(f'CONSTRAINT {name} UNIQUE ({", ".join([column.name for column in columns])})')
+
+
+class Index(SQLConstraints):
+    """
+    Constraint representing a secondary index
+    """
+
+    def __init__(self, *columns: 'EasyColumn', name: str = None, prefix_lengths: Sequence[Optional[int]] = None):
+        """
+        Index constractor
+
+        :param columns: the column or columns of this index, in the order they are indexed
+        :param name: the name for this index, made of the column names by default
+        :param prefix_lengths: characters indexed of each column, None indexes the whole value
+        """
+        prefix_lengths = (None,) * len(columns) if prefix_lengths is None else tuple(prefix_lengths)
+        if len(prefix_lengths) != len(columns):
+            raise ValueError(f'Expected {len(columns)} prefix lengths, got {len(prefix_lengths)}')
+
+        self.columns = columns
+        self.prefix_lengths = prefix_lengths
+        self.name = f'index_{"_".join(column.name for column in columns)}' if name is None else name
+        parts = [column.name if length is None else f'{column.name}({length})' for column, length in zip(columns, prefix_lengths)]
+        super().__init__(f'INDEX {self.name} ({", ".join(parts)})')
+
+    @property
+    def definition(self) -> list:
+        """
+        Columns and prefix lengths laid out like the rows of information_schema.STATISTICS
+        """
+        return [[column.name, length] for column, length in zip(self.columns, self.prefix_lengths)]
@@ -0,0 +1,158 @@
+import json
+from random import random
+from threading import Lock
+from typing import Optional, List, Union
+
+from .Exceptions import DatabaseConnectionException
+from .Logging import logger
+from .Metrics import QueryEvent
+
+__all__ = ['TableAccess', 'QueryPlan', 'QuerySampler']
+
+_EXPLAINABLE = ('SELECT', 'UPDATE', 'DELETE')
+
+
+class TableAccess:
+    """
+    How one table is read by a plan, `access_type` ALL is a full scan
+    """
+    __slots__ = ('table', 'access_type', 'key', 'possible_keys', 'rows', 'filtered', 'condition')
+
+    def __init__(self, node: dict):
+        self.table: Optional[str] = node.get('table_name')
+        self.access_type: Optional[str] = node.get('access_type')
+        self.key: Optional[str] = node.get('key')
+        self.possible_keys: List[str] = node.get('possible_keys', [])
+        self.rows = int(node.get('rows_examined_per_scan', 0))
+        self.filtered = float(node.get('filtered', 100.0))
+        self.condition: Optional[str] = node.get('attached_condition')
+
+    def __repr__(self):
+        return f'<TableAccess {self.table} type={self.access_type} key={self.key} rows={self.rows}>'
+
+
+class QueryPlan:
+    """
+    Parsed output of `EXPLAIN FORMAT=JSON`, the raw document stays in `document`
+    """
+    __slots__ = ('tables', 'filesort', 'temporary', 'cost', 'document')
+
+    def __init__(self, document: Union[dict, str, bytes]):
+        if isinstance(document, (str, bytes, bytearray)):
+            document = json.loads(document)
+
+        self.document = document
+        self.tables: List[TableAccess] = []
+        self.filesort = False
+        self.temporary = False
+        self.cost = float(document.get('query_block', {}).get('cost_info', {}).get('query_cost', 0.0))
+        self._walk(document)
+
+    def _walk(self, node):
+        if isinstance(node, list):
+            for item in node:
+                self._walk(item)
+            return
+        if not isinstance(node, dict):
+            return
+
+        for key, value in node.items():
+            if key == 'table' and isinstance(value, dict) and 'access_type' in value:
+                self.tables.append(TableAccess(value))
+            elif key == 'using_filesort' and value is True:
+                self.filesort = True
+            elif key == 'using_temporary_table' and value is True:
+                self.temporary = True
+            self._walk(value)
+
+    def __repr__(self):
+        return f'<QueryPlan tables={self.tables} filesort={self.filesort} temporary={self.temporary} cost={self.cost}>'
+
+    @property
+    def full_scan(self) -> bool:
+        return any(table.access_type == 'ALL' for table in self.tables)
+
+    @property
+    def rows(self) -> int:
+        """
+        Largest estimate of the rows examined by one table scan of the plan
+        """
+        return max((table.rows for table in self.tables), default=0)
+
+
+class QuerySampler:
+    def __init__(self, database, rate: float = 0.01, threshold: float = None, max_rows: int = 10000):
+        """
+        Execute hook explaining a fraction of the statements and every statement slower than a threshold
+
+        Plans with a full scan or more than `max_rows` examined rows are logged once and collected by statement shape.
+        The plans are explained on a spare pooled connection, statements are not sampled while the pool is exhausted.
+
+        :param database: the database whose statements are sampled
+        :param rate: fraction of the statements to explain
+        :param threshold: seconds after which a statement is always explained, None to only sample by rate
+        :param max_rows: examined rows estimate above which a plan is collected
+        """
+        self._database = database
+        self._rate = rate
+        self._threshold = threshold
+        self._max_rows = max_rows
+        self._findings = {}
+        self._lock = Lock()
+
+    def __repr__(self):
+        return f'<QuerySampler rate={self._rate} threshold={self._threshold} findings={len(self._findings)}>'
+
+    def __call__(self, event: QueryEvent):
+        if event.error is not None or not event.shape or event.shape.lstrip()[:6].upper() not in _EXPLAINABLE:
+            return
+
+        slow = self._threshold is not None and event.duration is not None and event.duration >= self._threshold
+        if not slow and not (self._rate and random() < self._rate):
+            return
+
+        plan = self._explain(event)
+        if plan is None:
+            return
+
+        reasons = []
+        if plan.full_scan:
+            reasons.append('full scan')
+        if plan.rows > self._max_rows:
+            reasons.append(f'{plan.rows} rows examined')
+        if not reasons:
+            return
+
+        with self._lock:
+            finding = self._findings.get(event.shape)
+            if finding is None:
+                finding = self._findings[event.shape] = {'count': 0, 'max_duration': 0.0, 'reasons': reasons, 'plan': plan}
+                logger.warning(f'Statement has a poor plan ({", ".join(reasons)}): {event.shape}')
+
+            finding['count'] += 1
+            finding['max_duration'] = max(finding['max_duration'], event.duration or 0.0)
+            finding['reasons'] = reasons
+            finding['plan'] = plan
+
+    def _explain(self, event: QueryEvent) -> Optional[QueryPlan]:
+        try:
+            with self._database.pool.connection(timeout=0) as connection:
+                result = self._database._execute_on(connection, f'EXPLAIN FORMAT=JSON {event.shape}', event.params)
+            return QueryPlan(result.fetchone()[0])
+        except DatabaseConnectionException:
+            return None
+        except Exception as e:
+            logger.debug(f'Explaining a sampled statement failed due {e}')
+            return None
+
+    @property
+    def findings(self) -> dict:
+        """
+        Count, longest duration, reasons and latest plan of each collected statement shape
+        """
+        with self._lock:
+            return {shape: dict(finding) for shape, finding in self._findings.items()}
+
+    def clear(self):
+        with self._lock:
+            self._findings.clear()
@@ -0,0 +1,82 @@
+from bisect import bisect_left
+from threading import Lock
+from typing import Optional
+
+__all__ = ['QueryEvent', 'LatencyHistogram']
+
+
+class QueryEvent:
+    """
+    One executed statement as seen by the execute hooks
+
+    `shape` is the statement with `%s` placeholders, `command` and `table` are set for the commands built by EasySQL.
+    `duration`, `wait_time`, `rows` and `error` are filled once the statement has run.
+    """
+    __slots__ = ('shape', 'params', 'command', 'table', 'duration', 'wait_time', 'rows', 'error')
+
+    def __init__(self, shape: str, params=(), command: Optional[str] = None, table: Optional[str] = None):
+        self.shape = shape
+        self.params = params
+        self.command = command
+        self.table = table
+        self.duration: Optional[float] = None
+        self.wait_time = 0.0
+        self.rows: Optional[int] = None
+        self.error: Optional[BaseException] = None
+
+    def __repr__(self):
+        return f'<QueryEvent {self.command or "Command"} on {self.table} duration={self.duration} rows={self.rows}>'
+
+
+class LatencyHistogram:
+    # Bucket upper bounds in seconds, doubling from 0.1ms up to about 52s
+    BOUNDS = tuple(0.0001 * 2 ** i for i in range(20))
+
+    def __init__(self):
+        self._counts = [0] * (len(self.BOUNDS) + 1)
+        self._count = 0
+        self._total = 0.0
+        self._max = 0.0
+        self._lock = Lock()
+
+    def __repr__(self):
+        return f'<LatencyHistogram count={self._count}>'
+
+    def record(self, seconds: float):
+        index = bisect_left(self.BOUNDS, seconds)
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._total += seconds
+            if seconds > self._max:
+                self._max = seconds
+
+    def quantile(self, q: float) -> float:
+        """
+        Upper bound of the bucket holding the `q` quantile, the maximum for the values above the last bucket
+        """
+        with self._lock:
+            if not self._count:
+                return 0.0
+
+            rank, seen = q * self._count, 0
+            for bound, count in zip(self.BOUNDS, self._counts):
+                seen += count
+                if seen >= rank:
+                    return min(bound, self._max)
+            return self._max
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            count, total, maximum, counts = self._count, self._total, self._max, list(self._counts)
+
+        return {
+            'count': count,
+            'sum': total,
+            'mean': total / count if count else 0.0,
+            'max': maximum,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+            'buckets': {bound: value for bound, value in zip(self.BOUNDS + (float('inf'),), counts) if value},
+        }
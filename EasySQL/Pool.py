@@ -0,0 +1,443 @@
+import asyncio
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
+from threading import Condition
+from time import monotonic
+from typing import Callable, Any, Optional, List, Awaitable
+
+from .Cache import StatementCache
+from .Exceptions import DatabaseConnectionException
+from .Logging import logger
+
+__all__ = ['EasyConnectionPool', 'AsyncEasyConnectionPool', 'PooledConnection', 'SQLResult']
+
+
+class SQLResult:
+    """
+    Detached result of an executed statement, safe to read after its connection went back to the pool
+    """
+
+    def __init__(self, rows: Optional[List[tuple]], lastrowid: Any = None, rowcount: int = -1, column_names: tuple = ()):
+        self._rows = rows
+        self._index = 0
+        self.lastrowid = lastrowid
+        self.rowcount = rowcount
+        self.column_names = column_names
+
+    @classmethod
+    def of(cls, cursor) -> 'SQLResult':
+        rows = cursor.fetchall() if cursor.with_rows else None
+        return cls(rows, cursor.lastrowid, cursor.rowcount, tuple(cursor.column_names or ()))
+
+    @property
+    def with_rows(self):
+        return self._rows is not None
+
+    def fetchone(self):
+        if not self._rows or self._index >= len(self._rows):
+            return None
+
+        self._index += 1
+        return self._rows[self._index - 1]
+
+    def fetchmany(self, size: int = 1):
+        rows = (self._rows or [])[self._index:self._index + size]
+        self._index += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = (self._rows or [])[self._index:]
+        self._index += len(rows)
+        return rows
+
+
+class PooledConnection:
+    """
+    A connection owned by a pool, every other attribute is delegated to the driver connection
+    """
+
+    def __init__(self, pool: 'EasyConnectionPool', connection, statement_cache_size: int = 64):
+        self.pool = pool
+        self.connection = connection
+        self.statements = StatementCache(connection, statement_cache_size)
+        self.last_used = monotonic()
+
+    def __getattr__(self, item):
+        return getattr(self.connection, item)
+
+    def __repr__(self):
+        return f'<PooledConnection of {self.pool}>'
+
+    def close(self):
+        try:
+            self.statements.clear()
+            self.connection.close()
+        except Exception as e:
+            logger.debug(f'Closing a pooled connection failed due {e}')
+
+
+class EasyConnectionPool:
+    def __init__(self, factory: Callable[[float], Any], min_size: int = 1, max_size: int = 10, timeout: float = 30.0, health_interval: float = 30.0,
+                 statement_cache_size: int = 64):
+        """
+        Pool of connections made by a factory
+
+        :param factory: callable returning a new connected driver connection, it gets the monotonic deadline of the checkout and gives up after it
+        :param min_size: connections opened together on the first checkout
+        :param max_size: maximum connections opened at the same time
+        :param timeout: default seconds to wait for a free connection
+        :param health_interval: seconds a connection may stay idle before it is pinged on checkout
+        :param statement_cache_size: prepared statements kept per connection
+        """
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f'pool size must satisfy 0 <= min_size <= max_size and max_size >= 1, got {min_size} and {max_size}')
+
+        self._factory = factory
+        self._min_size = min_size
+        self._max_size = max_size
+        self._timeout = timeout
+        self._health_interval = health_interval
+        self._statement_cache_size = statement_cache_size
+
+        self._lock = Condition()
+        self._idle: deque = deque()
+        self._size = 0
+        self._in_use = 0
+        self._filled = False
+
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._timeouts = 0
+        self._health_checks = 0
+        self._discarded = 0
+
+    def __repr__(self):
+        return f'<EasyConnectionPool size={self._size} in_use={self._in_use} max={self._max_size}>'
+
+    def _create(self, deadline: float) -> PooledConnection:
+        connection = self._factory(deadline)
+        if connection is None:
+            raise DatabaseConnectionException('Database is not connected')
+
+        return PooledConnection(self, connection, self._statement_cache_size)
+
+    def _fill(self, deadline: float):
+        with self._lock:
+            missing = max(0, self._min_size - self._size)
+            self._size += missing
+            self._filled = True
+
+        for index in range(missing):
+            try:
+                entry = self._create(deadline)
+            except Exception:
+                with self._lock:
+                    self._size -= missing - index
+                    self._lock.notify_all()
+                raise
+
+            with self._lock:
+                self._idle.append(entry)
+                self._lock.notify()
+
+    def _check(self, entry: PooledConnection, deadline: float) -> PooledConnection:
+        if monotonic() - entry.last_used < self._health_interval:
+            return entry
+
+        with self._lock:
+            self._health_checks += 1
+
+        try:
+            if entry.connection.is_connected():
+                return entry
+        except Exception:
+            pass
+
+        logger.info('A pooled connection failed the health check, replacing it')
+        entry.close()
+        with self._lock:
+            self._discarded += 1
+        return self._create(deadline)
+
+    def checkout(self, timeout: float = None) -> PooledConnection:
+        start = monotonic()
+        deadline = start + (self._timeout if timeout is None else timeout)
+
+        if not self._filled:
+            self._fill(deadline)
+
+        waited = False
+        with self._lock:
+            while True:
+                if self._idle:
+                    entry = self._idle.pop()
+                    break
+                if self._size < self._max_size:
+                    self._size += 1
+                    entry = None
+                    break
+
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise DatabaseConnectionException(f'Timed out after {monotonic() - start:.3f}s waiting for a free connection')
+
+                waited = True
+                self._lock.wait(remaining)
+
+        try:
+            entry = self._create(deadline) if entry is None else self._check(entry, deadline)
+        except Exception:
+            with self._lock:
+                self._size -= 1
+                self._lock.notify()
+            raise
+
+        with self._lock:
+            self._in_use += 1
+            self._checkouts += 1
+            self._waits += waited
+            self._wait_time += monotonic() - start
+
+        return entry
+
+    def release(self, entry: PooledConnection, discard: bool = False):
+        entry.last_used = monotonic()
+        if discard:
+            entry.close()
+
+        with self._lock:
+            self._in_use -= 1
+            if discard:
+                self._size -= 1
+                self._discarded += 1
+            else:
+                self._idle.append(entry)
+            self._lock.notify()
+
+    @contextmanager
+    def connection(self, timeout: float = None):
+        entry = self.checkout(timeout)
+        try:
+            yield entry
+        except BaseException:
+            try:
+                alive = entry.connection.is_connected()
+            except Exception:
+                alive = False
+
+            self.release(entry, discard=not alive)
+            raise
+        else:
+            self.release(entry)
+
+    def close(self):
+        with self._lock:
+            entries = list(self._idle)
+            self._idle.clear()
+            self._size -= len(entries)
+            self._filled = False
+
+        for entry in entries:
+            entry.close()
+
+    @property
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'size': self._size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'min_size': self._min_size,
+                'max_size': self._max_size,
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'wait_time': self._wait_time,
+                'timeouts': self._timeouts,
+                'health_checks': self._health_checks,
+                'discarded': self._discarded,
+            }
+
+
+class AsyncEasyConnectionPool:
+    def __init__(self, factory: Callable[[float], Awaitable[Any]], min_size: int = 1, max_size: int = 10, timeout: float = 30.0,
+                 health_interval: float = 30.0, statement_cache_size: int = 64):
+        """
+        Pool of connections for asyncio, waiting for a connection never blocks the event loop
+
+        The driver calls made on the connections are expected to run in worker threads,
+        the arguments are the same as `EasyConnectionPool` but the factory is a coroutine function.
+        """
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f'pool size must satisfy 0 <= min_size <= max_size and max_size >= 1, got {min_size} and {max_size}')
+
+        self._factory = factory
+        self._min_size = min_size
+        self._max_size = max_size
+        self._timeout = timeout
+        self._health_interval = health_interval
+        self._statement_cache_size = statement_cache_size
+
+        self._condition: Optional[asyncio.Condition] = None
+        self._idle: deque = deque()
+        self._size = 0
+        self._in_use = 0
+        self._filled = False
+
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._timeouts = 0
+        self._health_checks = 0
+        self._discarded = 0
+
+    def __repr__(self):
+        return f'<AsyncEasyConnectionPool size={self._size} in_use={self._in_use} max={self._max_size}>'
+
+    @property
+    def _lock(self) -> asyncio.Condition:
+        # Created lazily to bind to the running event loop
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def _create(self, deadline: float) -> PooledConnection:
+        connection = await self._factory(deadline)
+        if connection is None:
+            raise DatabaseConnectionException('Database is not connected')
+
+        return PooledConnection(self, connection, self._statement_cache_size)
+
+    async def _fill(self, deadline: float):
+        missing = max(0, self._min_size - self._size)
+        self._size += missing
+        self._filled = True
+
+        for index in range(missing):
+            try:
+                entry = await self._create(deadline)
+            except Exception:
+                self._size -= missing - index
+                async with self._lock:
+                    self._lock.notify_all()
+                raise
+
+            async with self._lock:
+                self._idle.append(entry)
+                self._lock.notify()
+
+    async def _check(self, entry: PooledConnection, deadline: float) -> PooledConnection:
+        if monotonic() - entry.last_used < self._health_interval:
+            return entry
+
+        self._health_checks += 1
+        try:
+            if await asyncio.to_thread(entry.connection.is_connected):
+                return entry
+        except Exception:
+            pass
+
+        logger.info('A pooled connection failed the health check, replacing it')
+        await asyncio.to_thread(entry.close)
+        self._discarded += 1
+        return await self._create(deadline)
+
+    async def checkout(self, timeout: float = None) -> PooledConnection:
+        start = monotonic()
+        deadline = start + (self._timeout if timeout is None else timeout)
+
+        if not self._filled:
+            await self._fill(deadline)
+
+        waited = False
+        async with self._lock:
+            while True:
+                if self._idle:
+                    entry = self._idle.pop()
+                    break
+                if self._size < self._max_size:
+                    self._size += 1
+                    entry = None
+                    break
+
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise DatabaseConnectionException(f'Timed out after {monotonic() - start:.3f}s waiting for a free connection')
+
+                waited = True
+                try:
+                    await asyncio.wait_for(self._lock.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+
+        try:
+            entry = await self._create(deadline) if entry is None else await self._check(entry, deadline)
+        except BaseException:
+            self._size -= 1
+            async with self._lock:
+                self._lock.notify()
+            raise
+
+        self._in_use += 1
+        self._checkouts += 1
+        self._waits += waited
+        self._wait_time += monotonic() - start
+        return entry
+
+    async def release(self, entry: PooledConnection, discard: bool = False):
+        entry.last_used = monotonic()
+        if discard:
+            await asyncio.to_thread(entry.close)
+
+        self._in_use -= 1
+        if discard:
+            self._size -= 1
+            self._discarded += 1
+        else:
+            self._idle.append(entry)
+
+        async with self._lock:
+            self._lock.notify()
+
+    @asynccontextmanager
+    async def connection(self, timeout: float = None):
+        entry = await self.checkout(timeout)
+        try:
+            yield entry
+        except BaseException:
+            try:
+                alive = await asyncio.to_thread(entry.connection.is_connected)
+            except BaseException:
+                alive = False
+
+            await self.release(entry, discard=not alive)
+            raise
+        else:
+            await self.release(entry)
+
+    async def close(self):
+        entries = list(self._idle)
+        self._idle.clear()
+        self._size -= len(entries)
+        self._filled = False
+
+        for entry in entries:
+            await asyncio.to_thread(entry.close)
+
+    @property
+    def stats(self) -> dict:
+        return {
+            'size': self._size,
+            'in_use': self._in_use,
+            'idle': len(self._idle),
+            'min_size': self._min_size,
+            'max_size': self._max_size,
+            'checkouts': self._checkouts,
+            'waits': self._waits,
+            'wait_time': self._wait_time,
+            'timeouts': self._timeouts,
+            'health_checks': self._health_checks,
+            'discarded': self._discarded,
+        }
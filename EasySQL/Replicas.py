@@ -0,0 +1,151 @@
+from threading import Lock, Thread
+from time import monotonic
+from typing import Optional, Sequence, List
+
+from .Logging import logger
+from .Pool import EasyConnectionPool
+
+__all__ = ['Replica', 'ReplicaSet']
+
+
+class Replica:
+    """
+    One read replica and its own connection pool
+    """
+
+    def __init__(self, host: str, port: int, pool: EasyConnectionPool):
+        self.host = host
+        self.port = port
+        self.pool = pool
+        self.latency: Optional[float] = None
+        self.ejected_until = 0.0
+        self.reads = 0
+        self.failures = 0
+
+    def __repr__(self):
+        return f'<Replica {self.host}:{self.port} latency={self.latency}>'
+
+    @property
+    def healthy(self) -> bool:
+        return self.ejected_until <= monotonic()
+
+
+class ReplicaSet:
+    # Weight of the latest read in the moving average of the latency
+    SMOOTHING = 0.2
+    # Seconds a replica coming back from ejection has to answer its probe
+    PROBE_TIMEOUT = 5.0
+
+    def __init__(self, replicas: Sequence[Replica], selection: str = 'round_robin', eject_time: float = 30.0):
+        """
+        Replicas the reads are spread over, a replica failing a read or a health check is left out for `eject_time` seconds
+
+        Once the time is over the next `choose` starts a probe of the replica in the background and leaves it out meanwhile,
+        it is back in rotation if the probe succeeds or ejected again otherwise, so reads never wait for a replica that is down.
+
+        :param replicas: the replicas to read from
+        :param selection: `round_robin` to take turns, `least_latency` to pick the replica with the lowest average read time
+        :param eject_time: seconds an unhealthy replica is left out before it is tried again
+        """
+        if selection not in ('round_robin', 'least_latency'):
+            raise ValueError(f'selection must be round_robin or least_latency, got {selection}')
+
+        self._replicas = tuple(replicas)
+        self._selection = selection
+        self._eject_time = eject_time
+        self._turn = 0
+        self._lock = Lock()
+
+    def __repr__(self):
+        return f'<ReplicaSet {len(self._replicas)} replicas selection={self._selection}>'
+
+    def __iter__(self):
+        return iter(self._replicas)
+
+    def __len__(self):
+        return len(self._replicas)
+
+    def choose(self) -> Optional[Replica]:
+        """
+        Replica for the next read, None when every replica is ejected
+        """
+        now = monotonic()
+        for replica in self._replicas:
+            if 0.0 < replica.ejected_until <= now:
+                self._probe(replica)
+
+        healthy = [replica for replica in self._replicas if replica.healthy]
+        if not healthy:
+            return None
+
+        if self._selection == 'least_latency':
+            # Replicas without a measured latency are tried first to get one
+            return min(healthy, key=lambda replica: -1.0 if replica.latency is None else replica.latency)
+
+        with self._lock:
+            self._turn += 1
+            return healthy[self._turn % len(healthy)]
+
+    def record(self, replica: Replica, seconds: float):
+        with self._lock:
+            replica.reads += 1
+            replica.latency = seconds if replica.latency is None else replica.latency + self.SMOOTHING * (seconds - replica.latency)
+
+    def eject(self, replica: Replica, reason: Exception = None):
+        with self._lock:
+            replica.failures += 1
+            replica.ejected_until = monotonic() + self._eject_time
+
+        logger.warning(f'Replica {replica.host}:{replica.port} is ejected for {self._eject_time}s due {reason}')
+        replica.pool.close()
+
+    def _probe(self, replica: Replica):
+        with self._lock:
+            if not 0.0 < replica.ejected_until <= monotonic():
+                return
+            # Only one caller probes, the replica stays out of rotation meanwhile
+            replica.ejected_until = monotonic() + self._eject_time
+
+        Thread(target=self._run_probe, args=(replica,), name=f'EasySQL-probe-{replica.host}', daemon=True).start()
+
+    def _run_probe(self, replica: Replica):
+        try:
+            self._ping(replica, self.PROBE_TIMEOUT)
+        except Exception as e:
+            self.eject(replica, e)
+        else:
+            replica.ejected_until = 0.0
+            logger.info(f'Replica {replica.host}:{replica.port} passed its probe and is back in rotation')
+
+    @staticmethod
+    def _ping(replica: Replica, timeout: float):
+        with replica.pool.connection(timeout) as connection:
+            if not connection.connection.is_connected():
+                raise ConnectionError('the connection is closed')
+
+    def check_health(self, timeout: float = 5.0) -> List[Replica]:
+        """
+        Ping every replica that is not ejected and eject the ones failing, returns the healthy replicas
+        """
+        healthy = []
+        for replica in self._replicas:
+            if not replica.healthy:
+                continue
+
+            try:
+                self._ping(replica, timeout)
+                healthy.append(replica)
+            except Exception as e:
+                self.eject(replica, e)
+
+        return healthy
+
+    def close(self):
+        for replica in self._replicas:
+            replica.pool.close()
+
+    @property
+    def stats(self) -> List[dict]:
+        now = monotonic()
+        return [{'host': replica.host, 'port': replica.port, 'latency': replica.latency, 'reads': replica.reads, 'failures': replica.failures,
+                 'ejected_for': max(0.0, replica.ejected_until - now), 'pool': replica.pool.stats} for replica in self._replicas]
@@ -0,0 +1,533 @@
+import asyncio
+import copy
+import heapq
+import os
+import tempfile
+import unicodedata
+import zlib
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, islice
+from threading import Lock
+from time import perf_counter
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+from .ABC import SQLCommandExecutable
+from .Classes import EasyDatabase, EasyTable, EasyColumn, EasyAggregate, Select, Insert, Update, Delete, _safe_pop, _batches, ECOS, SOS_ECOS, SD
+from .Explain import QueryPlan
+from .Pool import SQLResult
+from .Where import Where, WhereJoin, WhereIsEqual, WhereIsIn
+
+__all__ = ['HashRouter', 'RangeRouter', 'ShardSet', 'ShardedTable']
+
+# How the single row of each shard is merged for the aggregates that can be merged
+_MERGES = {'COUNT': sum, 'SUM': sum, 'MIN': min, 'MAX': max}
+
+# Collation of the tables without a charset, the server default since MySQL 8.0
+_DEFAULT_COLLATION = 'utf8mb4_0900_ai_ci'
+
+
+def _fold_accents(value: str) -> str:
+    return ''.join(char for char in unicodedata.normalize('NFKD', value) if not unicodedata.combining(char)).casefold()
+
+
+def _folding(column: EasyColumn) -> Optional[Callable[[str], str]]:
+    """
+    Python approximation of how the collation of a column orders text, None for the binary and case sensitive collations
+
+    Case and accents are folded for the `_ci` collations, language specific rules and trailing space padding are not followed,
+    so rows whose order differs only by those may be merged in another order than a single server would return them.
+    """
+    charset = getattr(column.table, 'charset', None)
+    collation = _DEFAULT_COLLATION if charset is None else charset.collation
+    if collation.endswith(('_bin', '_cs')):
+        return None
+    return str.casefold if '_as_' in collation else _fold_accents
+
+
+class HashRouter:
+    def __init__(self, size: int):
+        """
+        Spread the shard key values evenly, integers by their remainder and other values by their CRC32
+
+        :param size: the number of shards
+        """
+        if size < 1:
+            raise ValueError(f'router size must be at least 1, got {size}')
+        self.size = size
+
+    def __repr__(self):
+        return f'<HashRouter size={self.size}>'
+
+    def route(self, value) -> int:
+        if isinstance(value, int):
+            return value % self.size
+        return zlib.crc32(value if isinstance(value, (bytes, bytearray)) else str(value).encode()) % self.size
+
+
+class RangeRouter:
+    def __init__(self, bounds: Sequence[Any]):
+        """
+        Keep ranges of shard key values together, shard `i + 1` starts at `bounds[i]`
+
+        :param bounds: sorted first values of every shard but the first one
+        """
+        self.bounds = tuple(bounds)
+        if list(self.bounds) != sorted(self.bounds):
+            raise ValueError('range router bounds must be sorted')
+        self.size = len(self.bounds) + 1
+
+    def __repr__(self):
+        return f'<RangeRouter bounds={self.bounds}>'
+
+    def route(self, value) -> int:
+        return bisect_right(self.bounds, value)
+
+
+class ShardSet:
+    """
+    Databases of a sharded table, it stands for the database of the table's commands and routes every command to its shards
+
+    Inserts go to the shard of their key, updates, deletes and selects go to the shards the `Where` pins with `is_equal` or `is_in`
+    on the key and to every shard otherwise. Selects over many shards run in parallel and their rows are merged by the order
+    of the select before the offset and the limit are applied. Text is merged by an approximation of the column's collation.
+    """
+
+    def __init__(self, databases: Sequence[EasyDatabase], column: EasyColumn, router):
+        self._databases = tuple(databases)
+        self._column = column
+        self._router = router
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = Lock()
+
+    def __repr__(self):
+        return f'<ShardSet {len(self._databases)} shards by {self._column.name}>'
+
+    def __len__(self):
+        return len(self._databases)
+
+    def __iter__(self):
+        return iter(self._databases)
+
+    @property
+    def safe(self) -> bool:
+        return any(database.safe for database in self._databases)
+
+    @property
+    def in_transaction(self) -> bool:
+        return any(database.in_transaction for database in self._databases)
+
+    def _route(self, value) -> int:
+        index = self._router.route(self._column.cast(value))
+        if not 0 <= index < len(self._databases):
+            raise ValueError(f'Router {self._router} sent `{value}` to shard {index} of {len(self._databases)}')
+        return index
+
+    def shard_of(self, value) -> EasyDatabase:
+        return self._databases[self._route(value)]
+
+    def _pins(self, where: Optional[Where]) -> Optional[Set[int]]:
+        if isinstance(where, (WhereIsEqual, WhereIsIn)) and where._column == self._column and where._column.table is self._column.table:
+            return {self._route(value) for value in where._values}
+
+        if isinstance(where, WhereJoin):
+            a, b = (self._pins(part) for part in where._parts)
+            if where._operator == 'AND':
+                return a if b is None else b if a is None else a & b
+            return None if a is None or b is None else a | b
+
+        return None
+
+    def shards(self, where: Optional[Where]) -> List[EasyDatabase]:
+        """
+        Shards holding the rows the condition may match
+        """
+        pins = self._pins(where)
+        return list(self._databases) if pins is None else [self._databases[index] for index in sorted(pins)]
+
+    def _scatter(self, function: Callable[[EasyDatabase], Any], databases: List[EasyDatabase]) -> list:
+        # A transaction lives in the context of its thread, so it keeps the commands in this thread
+        if len(databases) == 1 or self.in_transaction:
+            return [function(database) for database in databases]
+        return list(self._threads().map(function, databases))
+
+    def _threads(self) -> ThreadPoolExecutor:
+        # Started on the first scattered command, so sets only ever reading one shard never start threads
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(len(self._databases), thread_name_prefix='EasySQL-shard')
+            return self._executor
+
+    def invalidate(self, table):
+        for database in self._databases:
+            database.invalidate(table)
+
+    def execute(self, sql: SQLCommandExecutable, params=(), buffered=False, auto_commit=True) -> SQLResult:
+        if isinstance(sql, Insert):
+            values = dict(zip(sql._columns, sql._values))
+            if self._column not in values:
+                raise ValueError(f'Inserts into a sharded table need the shard key `{self._column.name}`')
+            databases = [self.shard_of(values[self._column])]
+        elif isinstance(sql, (Update, Delete)):
+            if isinstance(sql, Update) and self._column in sql._columns:
+                raise ValueError(f'Updating the shard key `{self._column.name}` would move rows between shards, delete and insert them instead')
+            databases = self.shards(sql._where)
+        else:
+            raise TypeError(f'Unable to route {type(sql).__name__} commands to the shards')
+
+        results = self._scatter(lambda database: database.execute(copy.copy(sql), params, buffered, auto_commit), databases)
+        sql._executed = True
+        if len(results) == 1:
+            return results[0]
+        return SQLResult(None, results[-1].lastrowid if results else None, sum(result.rowcount for result in results))
+
+    async def execute_async(self, sql: SQLCommandExecutable, params=(), buffered=False, auto_commit=True) -> SQLResult:
+        return await asyncio.to_thread(self.execute, sql, params, buffered, auto_commit)
+
+    def _part(self, sql: Select) -> Select:
+        # Every shard returns the rows up to the end of the requested window, the offset is applied after merging
+        limit = 1 if sql._force_one else sql._limit
+        part = copy.copy(sql)._set(offset=None, force_one=False, limit=None if limit is None else int(limit) + int(sql._offset or 0))
+        part._executed = True
+        return part
+
+    def _order_key(self, sql: Select) -> Optional[Callable[[tuple], tuple]]:
+        if not sql._order:
+            return None
+
+        schema = sql.schema()
+        indexes = [schema.index_of(column) for column in sql._order]
+        if None in indexes:
+            raise ValueError('The order columns have to be selected to merge the rows of many shards')
+
+        # NULL values come first like they do in the server's ascending order
+        keys = [(index, _folding(column)) for index, column in zip(indexes, sql._order)]
+        return lambda row: tuple((row[i] is not None, fold(row[i]) if fold is not None and isinstance(row[i], str) else row[i]) for i, fold in keys)
+
+    def _window(self, sql: Select, rows: Iterator[tuple]) -> Iterator[tuple]:
+        limit = 1 if sql._force_one else sql._limit
+        start = int(sql._offset or 0)
+        return islice(rows, start, None if limit is None else start + int(limit))
+
+    @staticmethod
+    def _aggregate(sql: Select, results: List[List[tuple]]) -> List[tuple]:
+        columns = sql._selected()
+        if sql._group or sql._having or not all(isinstance(column, EasyAggregate) for column in columns):
+            raise ValueError('Grouped aggregates or aggregates mixed with columns can not be merged across shards, pin the shard key')
+
+        row = []
+        for i, column in enumerate(columns):
+            merge = _MERGES.get(column.function)
+            if merge is None or column.distinct:
+                raise ValueError(f'{column.name} can not be merged across shards, pin the shard key')
+
+            values = [rows[0][i] for rows in results if rows and rows[0][i] is not None]
+            row.append(merge(values) if values else 0 if column.function == 'COUNT' else None)
+        return [tuple(row)]
+
+    def fetch(self, sql: Select, tables: Tuple[str, ...] = (), cache: bool = True) -> List[tuple]:
+        databases = self.shards(sql._where)
+        sql._executed = True
+        if len(databases) == 1:
+            return databases[0].fetch(sql, tables, cache)
+        if not databases:
+            return []
+
+        part = self._part(sql)
+        results = self._scatter(lambda database: database.fetch(part, tables, cache), databases)
+        if any(isinstance(column, EasyAggregate) for column in sql._selected()):
+            return self._aggregate(sql, results)
+
+        key = self._order_key(sql)
+        rows = heapq.merge(*results, key=key, reverse=sql._desc) if key else chain.from_iterable(results)
+        return list(self._window(sql, rows))
+
+    async def fetch_async(self, sql: Select, tables: Tuple[str, ...] = (), cache: bool = True) -> List[tuple]:
+        return await asyncio.to_thread(self.fetch, sql, tables, cache)
+
+    def iterate(self, sql: Select, chunk_size: int = 1000) -> Iterator[List[tuple]]:
+        databases = self.shards(sql._where)
+        sql._executed = True
+        if len(databases) == 1:
+            yield from databases[0].iterate(sql, chunk_size)
+            return
+        if any(isinstance(column, EasyAggregate) for column in sql._selected()):
+            raise ValueError('Aggregates can not be streamed across shards, use execute instead')
+
+        part = self._part(sql)
+        streams = [database.iterate(part, chunk_size) for database in databases]
+        try:
+            iterators = [chain.from_iterable(stream) for stream in streams]
+            key = self._order_key(sql)
+            rows = heapq.merge(*iterators, key=key, reverse=sql._desc) if key else chain.from_iterable(iterators)
+            yield from _batches(self._window(sql, rows), chunk_size)
+        finally:
+            for stream in streams:
+                stream.close()
+
+    async def iterate_async(self, sql: Select, chunk_size: int = 1000) -> AsyncIterator[List[tuple]]:
+        iterator = self.iterate(sql, chunk_size)
+        try:
+            while True:
+                rows = await asyncio.to_thread(next, iterator, None)
+                if rows is None:
+                    break
+                yield rows
+        finally:
+            iterator.close()
+
+    def explain(self, operation: str, params=()) -> QueryPlan:
+        """
+        Plan of the command on the first shard, the shards share the schema
+        """
+        return self._databases[0].explain(operation, params)
+
+    def close(self):
+        """
+        Stop the threads of the scattered commands, the next scattered command starts them again
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+
+class ShardedTable(EasyTable):
+    """
+    Table split over many databases by the value of its shard key
+
+    Declare it like a table with `shards`, `shard_key` and an optional `router` (a HashRouter over the shards by default),
+    it is prepared on every shard and its commands are routed by a ShardSet. Transactions stay within one shard.
+
+    The bulk methods split their keys or rows by the shard key and run the EasyTable method on each shard,
+    keys and rows without the shard key go to every shard. Each shard commits on its own, so a failing shard does not undo the others.
+    """
+    _shards: Sequence[EasyDatabase] = ()
+    _shard_key: ECOS = None
+    _router = None
+
+    def __init_subclass__(cls, **kwargs):
+        for key in ('shards', 'shard_key', 'router'):
+            value = _safe_pop(kwargs, key)
+            setattr(cls, f'_{key}', getattr(cls, f'_{key}') if value is None else value)
+
+        if cls._shards and kwargs.get('database') is None:
+            kwargs['database'] = cls._shards[0]
+        # The constraint lists belong to each table, not to this base class
+        for name in ('PRIMARY', 'UNIQUES', 'INDEXES'):
+            setattr(cls, name, cls.__dict__.get(name))
+
+        super().__init_subclass__(**kwargs)
+
+    def __init__(self, auto_prepare: bool = True, *, _force=False):
+        if self.__class__ == ShardedTable and not _force:
+            raise TypeError('Unable to instance \'ShardedTable\' directly, Create a subclass')
+        if not self._shards:
+            raise TypeError('Shards are not implemented')
+        if self._shard_key is None:
+            raise TypeError('Shard key is not implemented')
+
+        self._router = HashRouter(len(self._shards)) if self._router is None else self._router
+        if getattr(self._router, 'size', len(self._shards)) != len(self._shards):
+            raise ValueError(f'Router {self._router} does not route to the {len(self._shards)} shards')
+
+        self._shard_set: Optional[ShardSet] = None
+        # Held in a list so the tables bound to one shard count the writes of the table itself
+        self._generations = [0]
+        super().__init__(auto_prepare, _force=_force)
+
+    @property
+    def _generation(self) -> int:
+        return self._generations[0]
+
+    @_generation.setter
+    def _generation(self, value: int):
+        self._generations[0] = value
+
+    def prepare(self, alter_columns=True):
+        for database in self._shards:
+            self._database = database
+            super().prepare(alter_columns)
+
+        self._database = self._shards[0]
+        if self._shard_set is not None:
+            self._shard_set.close()
+        self._shard_set = ShardSet(self._shards, self.get_column(self._shard_key, force=True), self._router)
+
+    @property
+    def shards(self) -> ShardSet:
+        return self._shard_set
+
+    def close(self):
+        if self._shard_set is not None:
+            self._shard_set.close()
+
+    def invalidate(self, *pk_values: Any):
+        super().invalidate(*pk_values)
+        for database in self._shards[1:]:
+            database.invalidate(self)
+
+    def count_rows(self):
+        return self.select().count()
+
+    def select(self, *columns: ECOS):
+        assert self.prepared, 'Unable to perform action before preparing the table'
+        return Select(self._shard_set, self, *columns).convert_by(self._data_convertor)
+
+    def insert(self, *values: Any):
+        assert self.prepared, 'Unable to perform action before preparing the table'
+        return Insert(self._shard_set, self, *values)
+
+    def update(self, *columns: ECOS):
+        assert self.prepared, 'Unable to perform action before preparing the table'
+        return Update(self._shard_set, self, *columns)
+
+    def delete(self, where: Where = None):
+        assert self.prepared, 'Unable to perform action before preparing the table'
+        return Delete(self._shard_set, self, where)
+
+    def _on(self, database: EasyDatabase) -> 'ShardedTable':
+        # The table bound to one shard, the EasyTable methods run on it unchanged.
+        # The copy shares the identity map and the write generation, so rows read before a write on any shard are not kept
+        table = copy.copy(self)
+        table._database = database
+        return table
+
+    def _spread(self, items: Iterable[Sequence[Any]], position: Optional[int]) -> Dict[int, list]:
+        """
+        Items by the index of the shard of their value at `position`, every shard gets every item when the position is None
+        """
+        if position is None:
+            items = list(items)
+            return {index: items for index in range(len(self._shards))}
+
+        spread = {}
+        for item in items:
+            spread.setdefault(self._shard_set._route(item[position]), []).append(item)
+        return spread
+
+    def _scatter(self, function: Callable[['ShardedTable', Any], Any], spread: Dict[int, Any]) -> list:
+        work = {self._shards[index]: spread[index] for index in sorted(spread)}
+        return self._shard_set._scatter(lambda database: function(self._on(database), work[database]), list(work))
+
+    def _position(self, columns: Sequence[EasyColumn]) -> Optional[int]:
+        return next((index for index, column in enumerate(columns) if column is self._shard_set._column), None)
+
+    def get(self, *pk_values: Any) -> Optional[SD]:
+        return self.get_many([pk_values])[0]
+
+    def _fetch_keys(self, keys: List[tuple]) -> Dict[tuple, SD]:
+        found = {}
+        for fetched in self._scatter(EasyTable._fetch_keys, self._spread(keys, self._position(self.PRIMARY))):
+            found.update(fetched)
+        return found
+
+    def insert_many(self, rows: Iterable[Sequence[Any]], columns: SOS_ECOS = None, update: bool = True, batch_size: int = 1000) -> List[range]:
+        """
+        Insert rows on the shard of their key, rows are buffered per shard up to `batch_size`
+
+        :return: the auto increment ids generated by each batch, each on its own shard
+        """
+        assert self.prepared, 'Unable to perform action before preparing the table'
+        columns = self.assert_columns(columns) or self._columns
+        position = self._position(columns)
+        if position is None:
+            raise ValueError(f'Inserts into a sharded table need the shard key `{self._shard_set._column.name}`')
+
+        ranges, buffers = [], {}
+        for row in rows:
+            index = self._shard_set._route(row[position])
+            buffer = buffers.setdefault(index, [])
+            buffer.append(row)
+            if len(buffer) >= batch_size:
+                ranges += EasyTable.insert_many(self._on(self._shards[index]), buffer, columns, update, batch_size)
+                buffers[index] = []
+
+        for result in self._scatter(lambda table, rows: EasyTable.insert_many(table, rows, columns, update, batch_size),
+                                    {index: buffer for index, buffer in buffers.items() if buffer}):
+            ranges += result
+        self.invalidate()
+        return ranges
+
+    def load(self, source: Union[str, os.PathLike, Iterable[Sequence[Any]]], columns: SOS_ECOS = None, mode: str = None) -> dict:
+        """
+        Load the rows of every shard in parallel, rows are split by their shard key in memory and the lines of a file into a file per shard
+        """
+        assert self.prepared, 'Unable to perform action before preparing the table'
+        columns = self.assert_columns(columns) or self._columns
+        position = self._position(columns)
+        if position is None:
+            raise ValueError(f'Loading into a sharded table needs the shard key `{self._shard_set._column.name}`')
+
+        start = perf_counter()
+        if isinstance(source, (str, os.PathLike)):
+            paths = self._split_file(source, position)
+            try:
+                reports = self._scatter(lambda table, path: EasyTable.load(table, path, columns, mode), paths)
+            finally:
+                for path in paths.values():
+                    os.remove(path)
+        else:
+            reports = self._scatter(lambda table, rows: EasyTable.load(table, rows, columns, mode), self._spread(source, position))
+        seconds = perf_counter() - start
+        rows = sum(report['rows'] for report in reports)
+        return {'rows': rows, 'affected': sum(report['affected'] for report in reports), 'seconds': seconds,
+                'rows_per_second': rows / seconds if seconds else 0.0}
+
+    def _split_file(self, path: Union[str, os.PathLike], position: int) -> Dict[int, str]:
+        files = {}
+        try:
+            with open(path, encoding='utf8', newline='') as source:
+                for line in source:
+                    if not line.strip('\n'):
+                        continue
+                    index = self._shard_set._route(_infile_text(line.rstrip('\n').split('\t')[position]))
+                    if index not in files:
+                        files[index] = tempfile.NamedTemporaryFile('w', encoding='utf8', newline='', suffix='.tsv', delete=False)
+                    files[index].write(line if line.endswith('\n') else line + '\n')
+        except BaseException:
+            for file in files.values():
+                file.close()
+                os.remove(file.name)
+            raise
+
+        for file in files.values():
+            file.close()
+        return {index: file.name for index, file in files.items()}
+
+    def update_many(self, key_columns: SOS_ECOS, value_columns: SOS_ECOS, rows: Iterable[Sequence[Any]], batch_size: int = 1000,
+                    method: str = None) -> int:
+        """
+        Update the rows of every shard in parallel, each shard in its own transaction
+        """
+        assert self.prepared, 'Unable to perform action before preparing the table'
+        keys, values = self.assert_columns(key_columns), self.assert_columns(value_columns)
+        if not keys or not values:
+            raise ValueError('Both key columns and value columns are required')
+        if self._position(values) is not None:
+            raise ValueError(f'Updating the shard key `{self._shard_set._column.name}` would move rows between shards, delete and insert them instead')
+
+        spread = self._spread(rows, self._position(keys))
+        affected = sum(self._scatter(lambda table, rows: EasyTable.update_many(table, keys, values, rows, batch_size, method), spread))
+        self.invalidate()
+        return affected
+
+
+_INFILE_UNESCAPES = {'\\\\': '\\', '\\t': '\t', '\\n': '\n', '\\r': '\r', '\\0': '\0'}
+
+
+def _infile_text(field: str) -> Optional[str]:
+    # A field of a tab separated file in the format read by EasyTable.load, `\\N` is NULL
+    if field == '\\N':
+        return None
+
+    text, index = [], 0
+    while index < len(field):
+        pair = field[index:index + 2]
+        if pair in _INFILE_UNESCAPES:
+            text.append(_INFILE_UNESCAPES[pair])
+            index += 2
+        else:
+            text.append(field[index])
+            index += 1
+    return ''.join(text)
@@ -17,6 +17,9 @@ def _get_int_cast_(size, unsigned=False):
 
         return value
 
+    cast.bit_size = size
+    cast.minimum = minimum
+    cast.maximum = maximum
     return cast
 
 
@@ -1,21 +1,38 @@
+from typing import Sequence, Tuple
+
 from .ABC import SQLCommand
+from .Constraints import NOT_NULL
 
 
 class Where(SQLCommand):
-    def __init__(self, sql_string):
-        self.value = sql_string
+    def __init__(self, sql_string: str = None, template: str = None, params: Sequence = ()):
+        self._value = sql_string
+        self.template = sql_string if template is None else template
+        self.params = tuple(params)
+
+    @property
+    def value(self) -> str:
+        if self._value is None:
+            self._value = self._render()
+        return self._value
+
+    def _render(self) -> str:
+        return self.template
 
     def get_value(self) -> str:
         return f'WHERE {self.value}'
 
+    def get_query(self) -> Tuple[str, tuple]:
+        return f'WHERE {self.template}', self.params
+
     def AND(self, other: 'Where'):
-        return Where(f'({self.value} AND {other.value})')
+        return WhereJoin('AND', self, other)
 
     def OR(self, other: 'Where'):
-        return Where(f'({self.value} OR {other.value})')
+        return WhereJoin('OR', self, other)
 
     def NOT(self):
-        return Where(f'NOT {self.value}')
+        return WhereNot(self)
 
     def __and__(self, other):
         if isinstance(other, Where):
@@ -33,52 +50,142 @@ class Where(SQLCommand):
         return self.NOT()
 
 
-class WhereIsEqual(Where):
+class WhereJoin(Where):
+    def __init__(self, operator: str, a: Where, b: Where):
+        self._operator = operator
+        self._parts = (a, b)
+        super().__init__(None, f'({a.template} {operator} {b.template})', a.params + b.params)
+
+    def _render(self) -> str:
+        return f'({self._parts[0].value} {self._operator} {self._parts[1].value})'
+
+
+class WhereNot(Where):
+    def __init__(self, where: Where):
+        self._where = where
+        super().__init__(None, f'NOT {where.template}', where.params)
+
+    def _render(self) -> str:
+        return f'NOT {self._where.value}'
+
+
+class WhereColumn(Where):
+    """
+    Condition comparing a column, values are kept apart to be bound as parameters or inlined on demand
+    """
+
+    def __init__(self, column, template: str, *values):
+        self._column = column
+        self._values = values
+        super().__init__(None, template, (column.cast(value) for value in values))
+
+    def _render(self) -> str:
+        return self.template % tuple(self._column.parse(value) for value in self._values)
+
+
+class WhereIsEqual(WhereColumn):
     def __init__(self, column, value):
-        super().__init__(f'{column.name} = {column.parse(value)}')
+        super().__init__(column, f'{column.sql_name} = %s', value)
 
 
-class WhereIsNotEqual(Where):
+class WhereIsNotEqual(WhereColumn):
     def __init__(self, column, value):
-        super().__init__(f'{column.name} <> {column.parse(value)}')
+        super().__init__(column, f'{column.sql_name} <> %s', value)
 
 
-class WhereIsGreater(Where):
+class WhereIsGreater(WhereColumn):
     def __init__(self, column, value):
-        super().__init__(f'{column.name} > {column.parse(value)}')
+        super().__init__(column, f'{column.sql_name} > %s', value)
 
 
-class WhereIsGreaterEqual(Where):
+class WhereIsGreaterEqual(WhereColumn):
     def __init__(self, column, value):
-        super().__init__(f'{column.name} >= {column.parse(value)}')
+        super().__init__(column, f'{column.sql_name} >= %s', value)
 
 
-class WhereIsLesser(Where):
+class WhereIsLesser(WhereColumn):
     def __init__(self, column, value):
-        super().__init__(f'{column.name} < {column.parse(value)}')
+        super().__init__(column, f'{column.sql_name} < %s', value)
 
 
-class WhereIsLesserEqual(Where):
+class WhereIsLesserEqual(WhereColumn):
     def __init__(self, column, value):
-        super().__init__(f'{column.name} <= {column.parse(value)}')
+        super().__init__(column, f'{column.sql_name} <= %s', value)
 
 
-class WhereIsLike(Where):
+class WhereIsLike(WhereColumn):
     def __init__(self, column, value):
-        super().__init__(f'{column.name} LIKE {column.parse(value)}')
+        super().__init__(column, f'{column.sql_name} LIKE %s', value)
 
 
-class WhereIsIn(Where):
+class WhereIsIn(WhereColumn):
     def __init__(self, column, values):
-        values = (column.parse(value) for value in values)
-        super().__init__(f'{column.name} IN {values}')
+        values = tuple(values)
+        super().__init__(column, f'{column.sql_name} IN ({", ".join(["%s"] * len(values))})', *values)
 
 
-class WhereIsBetween(Where):
+class WhereIsBetween(WhereColumn):
     def __init__(self, column, a, b):
-        values = (column.parse(a), column.parse(b))
-        super().__init__(f'{column.name} = {values}')
-
-
-__all__ = ['Where', 'WhereIsEqual', 'WhereIsNotEqual', 'WhereIsGreater', 'WhereIsLesser',
-           'WhereIsGreaterEqual', 'WhereIsLesserEqual', 'WhereIsLike', 'WhereIsIn', 'WhereIsBetween']
\ No newline at end of file
+        super().__init__(column, f'{column.sql_name} BETWEEN %s AND %s', a, b)
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace("'", "\\'") if isinstance(value, str) else value
+
+
+class WhereIsAfter(Where):
+    """
+    Condition true for the rows ordered after the values of many columns
+
+    Not null columns are compared as a row, `(a, b) > (x, y)`. With a nullable column the comparison is expanded into
+    `a > x OR (a = x AND b > y)` where NULL sorts first ascending and last descending like MySQL orders it.
+    """
+
+    def __init__(self, columns, values, descending: bool = False):
+        self._columns = tuple(columns)
+        self._values = tuple(values)
+        if any(_nullable(column) for column in self._columns):
+            template, self._bound = self._expand(descending)
+        else:
+            names = ', '.join(column.sql_name for column in self._columns)
+            template = f'({names}) {"<" if descending else ">"} ({", ".join(["%s"] * len(self._columns))})'
+            self._bound = tuple(zip(self._columns, self._values))
+        super().__init__(None, template, (column.cast(value) for column, value in self._bound))
+
+    def _expand(self, descending: bool) -> Tuple[str, tuple]:
+        terms, bound = [], []
+        equal, equal_bound = [], []
+        for column, value in zip(self._columns, self._values):
+            name = column.sql_name
+            if value is None:
+                # Nothing but other NULLs follows a NULL in descending order
+                after, after_bound = (None, ()) if descending else (f'{name} IS NOT NULL', ())
+                same, same_bound = f'{name} IS NULL', ()
+            else:
+                after = f'{name} {"<" if descending else ">"} %s'
+                if descending and _nullable(column):
+                    after = f'({after} OR {name} IS NULL)'
+                after_bound = ((column, value),)
+                same, same_bound = f'{name} = %s', ((column, value),)
+
+            if after is not None:
+                terms.append(' AND '.join(equal + [after]))
+                bound.extend(equal_bound + list(after_bound))
+            equal.append(same)
+            equal_bound.extend(same_bound)
+
+        return f'({" OR ".join(f"({term})" for term in terms) or "FALSE"})', tuple(bound)
+
+    def _render(self) -> str:
+        # The values usually come back from a client inside a continuation token, so they are escaped
+        return self.template % tuple(column.parse(_escape(column.cast(value))) for column, value in self._bound)
+
+
+def _nullable(column) -> bool:
+    # Tables move the PRIMARY tag of their columns into their PRIMARY list
+    return NOT_NULL not in column.tags and all(key is not column for key in getattr(column.table, 'PRIMARY', None) or ())
+
+
+__all__ = ['Where', 'WhereJoin', 'WhereNot', 'WhereColumn', 'WhereIsEqual', 'WhereIsNotEqual', 'WhereIsGreater', 'WhereIsLesser',
+           'WhereIsGreaterEqual', 'WhereIsLesserEqual', 'WhereIsLike', 'WhereIsIn', 'WhereIsBetween',
+           'WhereIsAfter']
@@ -3,6 +3,13 @@ from .Classes import *
 from .Where import *
 from .Exceptions import *
 from .Constraints import *
+from .Pool import *
+from .Replicas import *
+from .Cache import *
+from .Metrics import *
+from .Explain import *
+from .Async import *
+from .Sharding import *
 
 from .Logging import enable_debug, disable_debug
 from .Decorators import auto_init
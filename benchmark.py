@@ -0,0 +1,277 @@
+"""
+Benchmarks against a live database, run `python benchmark.py [name ...]` to run some or all of them.
+The connection info below is the same as in test.py, every benchmark works on its own tables.
+"""
+import os
+import sys
+import tempfile
+import tracemalloc
+import types
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+import EasySQL
+
+
+@EasySQL.auto_init
+class BenchDatabase(EasySQL.EasyDatabase):
+    _database = 'MyDatabase'
+    _password = ''
+    _host = '127.0.0.1'
+    _port = 3306
+    _user = 'root'
+
+    _pool_max_size = 16
+    _local_infile = True
+
+
+@EasySQL.auto_init
+class BenchTable(EasySQL.EasyTable, database=BenchDatabase, name='BenchTable'):
+    ID = EasySQL.EasyColumn('ID', EasySQL.Types.BIGINT, EasySQL.PRIMARY, EasySQL.AUTO_INCREMENT)
+    Name = EasySQL.EasyColumn('Name', EasySQL.Types.STRING(255), EasySQL.NOT_NULL, default='Missing')
+    Balance = EasySQL.EasyColumn('Balance', EasySQL.Types.INT, EasySQL.NOT_NULL)
+    Premium = EasySQL.EasyColumn('Premium', EasySQL.Types.BOOL, EasySQL.NOT_NULL, default=False)
+
+
+@EasySQL.auto_init
+class BenchOrder(EasySQL.EasyTable, database=BenchDatabase, name='BenchOrder'):
+    ID = EasySQL.EasyColumn('ID', EasySQL.Types.BIGINT, EasySQL.PRIMARY, EasySQL.AUTO_INCREMENT)
+    Buyer = EasySQL.EasyForeignColumn('Buyer', BenchTable, BenchTable.ID, EasySQL.NOT_NULL)
+    Seller = EasySQL.EasyForeignColumn('Seller', BenchTable, BenchTable.ID, EasySQL.NOT_NULL)
+
+
+def timed(title, function, *args, count=None):
+    start = perf_counter()
+    function(*args)
+    spent = perf_counter() - start
+    print(f'{title}: {spent:.3f}s' + (f' ({count / spent:,.0f} per second)' if count else ''))
+    return spent
+
+
+def clean():
+    BenchDatabase.remove_safety(confirm=True)
+    BenchOrder.delete().execute()
+    BenchTable.delete().execute()
+    BenchDatabase.remove_safety(confirm=False)
+
+
+def bench_insert_many(count=20_000):
+    rows = [(f'User-{i}', i % 1000, i % 2 == 0) for i in range(count)]
+    columns = (BenchTable.Name, BenchTable.Balance, BenchTable.Premium)
+
+    def one_by_one():
+        for row in rows:
+            BenchTable.insert(*row).into(*columns).execute()
+
+    clean()
+    timed('Insert.execute per row', one_by_one, count=count)
+    clean()
+    timed('EasyTable.insert_many', BenchTable.insert_many, rows, columns, count=count)
+    clean()
+    timed('EasyTable.load', BenchTable.load, iter(rows), columns, count=count)
+    clean()
+
+
+class LegacySQLData:
+    """
+    The row holder used before SQLSchema, one dict per row and a column scan on every access
+    """
+
+    def __init__(self, table, data_array, columns):
+        columns = table.assert_columns(columns)
+        self._table = table
+        self._data = dict(zip(columns, data_array))
+
+    def get(self, column):
+        column = self._table.get_column(column)
+        return column.cast(self._data[column])
+
+
+def bench_rows(count=200_000):
+    columns = BenchTable.columns
+    rows = [(i, f'User-{i}', i % 1000, i % 2) for i in range(count)]
+
+    def build(factory, *args):
+        tracemalloc.start()
+        start = perf_counter()
+        result = [factory(BenchTable, row, *args) for row in rows]
+        for data in result:
+            for column in columns:
+                data.get(column)
+        spent = perf_counter() - start
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f'{factory.__name__}: {spent / count * 1e6:.2f}us and {memory / count:.0f} bytes per row')
+
+    build(LegacySQLData, columns)
+    build(EasySQL.SQLData, EasySQL.SQLSchema(BenchTable, columns))
+
+
+def bench_threads(duration=5.0):
+    BenchTable.insert_many([(f'User-{i}', i, False) for i in range(1000)], (BenchTable.Name, BenchTable.Balance, BenchTable.Premium))
+    ids = [data.get(BenchTable.ID) for data in BenchTable.select(BenchTable.ID).execute()]
+
+    def worker(offset):
+        count, end = 0, perf_counter() + duration
+        while perf_counter() < end:
+            BenchTable.select().where(BenchTable.ID.is_equal(ids[(offset + count) % len(ids)])).execute()
+            count += 1
+        return count
+
+    for threads in (1, 2, 4, 8, 16):
+        with ThreadPoolExecutor(threads) as executor:
+            total = sum(executor.map(worker, range(threads)))
+        print(f'{threads} threads: {total / duration:,.0f} selects per second, pool: {BenchDatabase.pool.stats}')
+
+    clean()
+
+
+def bench_transactions(count=2000):
+    def insert_all():
+        for i in range(count):
+            BenchTable.insert(f'User-{i}', i).into(BenchTable.Name, BenchTable.Balance).execute()
+
+    def insert_all_in_transaction():
+        with BenchDatabase.transaction():
+            insert_all()
+
+    clean()
+    timed('Insert.execute with a commit per statement', insert_all, count=count)
+    clean()
+    timed('Insert.execute inside one transaction', insert_all_in_transaction, count=count)
+    clean()
+
+
+def bench_pagination(page=10_000, page_size=20):
+    rows = [(f'User-{i}', i % 1000, False) for i in range(page * page_size)]
+    BenchTable.insert_many(rows, (BenchTable.Name, BenchTable.Balance, BenchTable.Premium))
+
+    select = BenchTable.select().order(BenchTable.ID).no_cache()
+    token = None
+    for _ in range(page - 1):
+        token = select.after(token).paginate(page_size).token
+
+    timed(f'Page {page:,} with OFFSET', lambda: BenchTable.select().order(BenchTable.ID).limit(page_size).offset((page - 1) * page_size).no_cache().execute())
+    timed(f'Page {page:,} with keyset', lambda: select.after(token).paginate(page_size))
+    clean()
+
+
+def bench_update_many(count=20_000):
+    BenchTable.insert_many([(f'User-{i}', i, False) for i in range(count)], (BenchTable.Name, BenchTable.Balance, BenchTable.Premium))
+    ids = [data.get(BenchTable.ID) for data in BenchTable.select(BenchTable.ID).execute()]
+
+    def one_by_one():
+        with BenchDatabase.transaction():
+            for index in ids:
+                BenchTable.update(BenchTable.Balance).to(index * 2).where(BenchTable.ID.is_equal(index)).execute()
+
+    timed('Update.execute per row in one transaction', one_by_one, count=count)
+    timed('EasyTable.update_many with CASE', BenchTable.update_many, BenchTable.ID, BenchTable.Balance,
+          [(index, index * 3) for index in ids], 1000, 'case', count=count)
+    timed('EasyTable.update_many with a join', BenchTable.update_many, BenchTable.ID, BenchTable.Balance,
+          [(index, index * 4) for index in ids], 1000, 'join', count=count)
+    clean()
+
+
+def bench_prefetch(count=1000):
+    BenchTable.insert_many([(f'User-{i}', i, False) for i in range(100)], (BenchTable.Name, BenchTable.Balance, BenchTable.Premium))
+    ids = [data.get(BenchTable.ID) for data in BenchTable.select(BenchTable.ID).execute()]
+    BenchOrder.insert_many([(ids[i % len(ids)], ids[i * 7 % len(ids)]) for i in range(count)], (BenchOrder.Buyer, BenchOrder.Seller))
+    queries = []
+    BenchDatabase.on_after_execute(queries.append)
+
+    def one_by_one():
+        for data in BenchOrder.select().no_cache().execute():
+            BenchTable.get(data.get(BenchOrder.Buyer))
+            BenchTable.get(data.get(BenchOrder.Seller))
+
+    def prefetched():
+        for data in BenchOrder.select().no_cache().prefetch(BenchOrder.Buyer, BenchOrder.Seller).execute():
+            data.related(BenchOrder.Buyer)
+            data.related(BenchOrder.Seller)
+
+    for title, function in (('A query per reference', one_by_one), ('Select.prefetch', prefetched)):
+        queries.clear()
+        timed(title, function, count=count)
+        print(f'  {len(queries)} queries')
+
+    BenchDatabase.remove_hook(queries.append)
+    clean()
+
+
+def bench_prepared(count=20_000):
+    BenchTable.insert_many([(f'User-{i}', i, False) for i in range(1000)], (BenchTable.Name, BenchTable.Balance, BenchTable.Premium))
+    ids = [data.get(BenchTable.ID) for data in BenchTable.select(BenchTable.ID).execute()]
+
+    def status(name):
+        return int(BenchDatabase.execute_command(f"SHOW GLOBAL STATUS LIKE '{name}';").fetchone()[1])
+
+    def build(render):
+        start = perf_counter()
+        for i in range(count):
+            render(BenchTable.select().where(BenchTable.ID.is_equal(ids[i % len(ids)])))
+        print(f'  building: {(perf_counter() - start) / count * 1e6:.2f}us per query')
+
+    def lookups():
+        for i in range(count):
+            BenchTable.select().where(BenchTable.ID.is_equal(ids[i % len(ids)])).no_cache().execute()
+
+    for prepared, render in ((False, lambda select: select.get_value()), (True, lambda select: select.get_query())):
+        BenchDatabase._prepared = prepared
+        prepares = status('Com_stmt_prepare')
+        timed(f'Select by ID with the {"binary protocol and prepared statements" if prepared else "text protocol"}', lookups, count=count)
+        print(f'  {status("Com_stmt_prepare") - prepares} statements prepared')
+        build(render)
+
+    BenchDatabase._prepared = False
+    clean()
+
+
+def bench_startup(count=100):
+    def define(index):
+        def body(namespace):
+            namespace['ID'] = EasySQL.EasyColumn('ID', EasySQL.Types.BIGINT, EasySQL.PRIMARY, EasySQL.AUTO_INCREMENT)
+            namespace['Name'] = EasySQL.EasyColumn('Name', EasySQL.Types.STRING(255), EasySQL.NOT_NULL, default='Missing')
+
+        name = f'StartupTable{index}'
+        return types.new_class(name, (EasySQL.EasyTable,), {'database': BenchDatabase, 'name': name}, body)
+
+    def prepare_all():
+        BenchDatabase.refresh_catalog()
+        for cls in classes:
+            cls()
+
+    classes = [define(i) for i in range(count)]
+    prepare_all()
+    snapshot = os.path.join(tempfile.mkdtemp(), 'schema.json')
+
+    BenchDatabase._schema_catalog = False
+    timed(f'Preparing {count} tables one by one', prepare_all, count=count)
+    BenchDatabase._schema_catalog = True
+    timed(f'Preparing {count} tables with the batched catalog', prepare_all, count=count)
+    BenchDatabase._schema_snapshot = snapshot
+    prepare_all()
+    timed(f'Preparing {count} tables from the schema snapshot', prepare_all, count=count)
+    BenchDatabase._schema_snapshot = None
+
+    for cls in classes:
+        BenchDatabase.execute_command(f'DROP TABLE {cls._name};')
+    BenchDatabase.refresh_catalog()
+
+
+BENCHMARKS = {
+    'insert_many': bench_insert_many,
+    'rows': bench_rows,
+    'threads': bench_threads,
+    'transactions': bench_transactions,
+    'pagination': bench_pagination,
+    'prepared': bench_prepared,
+    'prefetch': bench_prefetch,
+    'startup': bench_startup,
+    'update_many': bench_update_many,
+}
+
+if __name__ == '__main__':
+    for name in sys.argv[1:] or BENCHMARKS.keys():
+        print(f'--- {name} ---')
+        BENCHMARKS[name]()
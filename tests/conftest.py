@@ -0,0 +1,131 @@
+"""
+Fixtures running EasySQL against an in-memory fake of the mysql.connector driver, no server is needed
+"""
+import mysql.connector
+import pytest
+
+import EasySQL
+
+
+class FakeCursor:
+    def __init__(self, connection, prepared=False):
+        self.connection = connection
+        self.prepared = prepared
+        self._rows = None
+        self._index = 0
+        self.lastrowid = None
+        self.rowcount = -1
+        self.column_names = ()
+
+    @property
+    def with_rows(self):
+        return self._rows is not None
+
+    def execute(self, operation, params=()):
+        rows = self.connection.server.run(self.connection, operation, tuple(params or ()), self.prepared)
+        self._rows, self._index = rows, 0
+        self.rowcount = len(rows) if rows is not None else 1
+        self.lastrowid = 1
+
+    def executemany(self, operation, seq_params):
+        seq_params = list(seq_params)
+        self.connection.server.run(self.connection, operation, tuple(seq_params), 'many')
+        self._rows, self.rowcount, self.lastrowid = None, len(seq_params), 1
+
+    def fetchall(self):
+        rows = self._rows[self._index:]
+        self._index = len(self._rows)
+        return rows
+
+    def fetchone(self):
+        if self._index >= len(self._rows):
+            return None
+        self._index += 1
+        return self._rows[self._index - 1]
+
+    def fetchmany(self, size=1):
+        rows = self._rows[self._index:self._index + size]
+        self._index += len(rows)
+        return rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, server, options):
+        self.server = server
+        self.options = options
+        self.open = True
+
+    @property
+    def host(self):
+        return self.options.get('host')
+
+    def is_connected(self):
+        return self.open and self.host not in self.server.down
+
+    def cursor(self, buffered=False, prepared=False):
+        return FakeCursor(self, prepared)
+
+    def set_charset_collation(self, *args):
+        pass
+
+    def start_transaction(self, **kwargs):
+        self.server.run(self, 'START TRANSACTION', (), False)
+
+    def commit(self):
+        self.server.run(self, 'COMMIT', (), False)
+
+    def rollback(self):
+        self.server.run(self, 'ROLLBACK', (), False)
+
+    def consume_results(self):
+        pass
+
+    def close(self):
+        self.open = False
+
+
+class FakeServer:
+    """
+    Every statement is logged as (host, database, operation, params, prepared) and answered by `respond`
+    """
+
+    def __init__(self):
+        self.log = []
+        self.down = set()
+        self.connects = 0
+        self.respond = lambda connection, operation, params: [(4194304,)] if '@@max_allowed_packet' in operation else []
+
+    def run(self, connection, operation, params, prepared):
+        if connection.host in self.down:
+            raise mysql.connector.errors.OperationalError('Lost connection to MySQL server during query', errno=2013)
+
+        self.log.append((connection.host, connection.options.get('database'), operation, params, prepared))
+        return self.respond(connection, operation, params)
+
+    def connect(self, **options):
+        self.connects += 1
+        if options.get('host') in self.down:
+            raise mysql.connector.errors.InterfaceError(f"Can't connect to MySQL server on '{options.get('host')}'", errno=2003)
+        return FakeConnection(self, options)
+
+    def statements(self, prefix: str = '') -> list:
+        return [entry for entry in self.log if entry[2].startswith(prefix)]
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = FakeServer()
+    monkeypatch.setattr(mysql.connector, 'connect', server.connect)
+    return server
+
+
+@pytest.fixture
+def make_database(server):
+    def make_database(name: str = 'test', base: type = EasySQL.EasyDatabase, **attributes) -> EasySQL.EasyDatabase:
+        attributes = {'_database': name, '_password': '', '_auto_connect': False, **attributes}
+        return type('Database', (base,), attributes)()
+
+    return make_database
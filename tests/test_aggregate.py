@@ -0,0 +1,38 @@
+import decimal
+
+import EasySQL
+
+
+def make_table(database):
+    class Pet(EasySQL.EasyTable, database=database, name='Pet'):
+        ID = EasySQL.EasyColumn('ID', EasySQL.Types.BIGINT, EasySQL.PRIMARY, EasySQL.AUTO_INCREMENT)
+        Kind = EasySQL.EasyColumn('Kind', EasySQL.Types.STRING(16))
+        Age = EasySQL.EasyColumn('Age', EasySQL.Types.INT)
+
+    return Pet()
+
+
+def test_group_by_reads_the_aggregates_by_their_expression(make_database, server):
+    pet = make_table(make_database())
+    server.respond = lambda connection, operation, params: [('Cat', 3, decimal.Decimal('11')), ('Dog', 2, decimal.Decimal('12'))] if 'GROUP BY' in operation else []
+
+    rows = pet.select(pet.Kind, pet.ID.count(), pet.Age.sum()).group_by(pet.Kind).having(pet.Age.sum().is_greater(10)).order(pet.Kind).execute()
+
+    assert server.statements('SELECT')[-1][2] == 'SELECT Kind, COUNT(ID), SUM(Age) FROM Pet GROUP BY Kind HAVING SUM(Pet.Age) > 10 ORDER BY Kind;'
+    row = rows[0]
+    assert (row.get(pet.Kind), row.get(pet.ID.count()), row.get(pet.Age.sum())) == ('Cat', 3, 11)
+    assert isinstance(row.get(pet.Age.sum()), int)
+
+
+def test_count_and_exists_drop_the_order_and_limit(make_database, server):
+    pet = make_table(make_database())
+    server.respond = lambda connection, operation, params: [(7,)] if 'COUNT(*)' in operation else [(1,)] if operation.startswith('SELECT 1') else []
+    select = pet.select().where(pet.Age.is_greater(2)).order(pet.Age).limit(5)
+    server.log.clear()
+
+    assert select.count() == 7
+    assert select.exists() is True
+    assert [entry[2] for entry in server.log] == ['SELECT COUNT(*) FROM Pet WHERE Pet.Age > 2 LIMIT 1;', 'SELECT 1 FROM Pet WHERE Pet.Age > 2 LIMIT 1;']
+
+    server.respond = lambda connection, operation, params: []
+    assert select.exists() is False
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+import EasySQL
+
+
+def make_table(database):
+    class Pet(EasySQL.EasyTable, database=database, name='Pet'):
+        ID = EasySQL.EasyColumn('ID', EasySQL.Types.BIGINT, EasySQL.PRIMARY, EasySQL.AUTO_INCREMENT)
+        Name = EasySQL.EasyColumn('Name', EasySQL.Types.STRING(32))
+
+    return Pet()
+
+
+def test_async_pool_checkout_times_out_and_release_wakes_a_waiter():
+    async def connect(deadline):
+        return object()
+
+    async def run():
+        pool = EasySQL.AsyncEasyConnectionPool(connect, min_size=0, max_size=1)
+        entry = await pool.checkout()
+        with pytest.raises(EasySQL.DatabaseConnectionException):
+            await pool.checkout(timeout=0.05)
+
+        waiter = asyncio.create_task(pool.checkout(timeout=1.0))
+        await asyncio.sleep(0.01)
+        await pool.release(entry)
+        assert await waiter is entry
+        return pool.stats
+
+    stats = asyncio.run(run())
+    assert (stats['size'], stats['in_use'], stats['timeouts'], stats['waits']) == (1, 1, 1, 1)
+
+
+def test_execute_and_fetch_async(make_database, server):
+    pet = make_table(make_database(base=EasySQL.AsyncEasyDatabase))
+    server.respond = lambda connection, operation, params: [(1, 'Rex')] if operation.startswith('SELECT') else []
+    server.log.clear()
+
+    async def run():
+        await pet.insert('Rex').into(pet.Name).execute_async()
+        return await pet.select().execute_async()
+
+    rows = asyncio.run(run())
+    assert [row.get(pet.Name) for row in rows] == ['Rex']
+    assert [entry[2].split(' ')[0] for entry in server.log] == ['INSERT', 'SELECT']
+
+
+def test_transaction_async_rolls_back_to_the_savepoint(make_database, server):
+    database = make_database(base=EasySQL.AsyncEasyDatabase)
+
+    async def run():
+        async with database.transaction_async():
+            await database.execute_command_async('DELETE FROM Pet WHERE ID = 1;')
+            with pytest.raises(ValueError):
+                async with database.transaction_async():
+                    await database.execute_command_async('DELETE FROM Pet WHERE ID = 2;')
+                    raise ValueError
+        return database.async_pool.stats
+
+    stats = asyncio.run(run())
+    assert [entry[2] for entry in server.log] == ['START TRANSACTION', 'DELETE FROM Pet WHERE ID = 1;', 'SAVEPOINT easysql_0',
+                                                  'DELETE FROM Pet WHERE ID = 2;', 'ROLLBACK TO SAVEPOINT easysql_0', 'COMMIT']
+    assert stats['in_use'] == 0
+
+
+def test_iterate_async_drops_the_connection_when_left_early(make_database, server):
+    database = make_database(base=EasySQL.AsyncEasyDatabase)
+    pet = make_table(database)
+    server.respond = lambda connection, operation, params: [(key, f'Pet-{key}') for key in range(10)] if 'FROM Pet' in operation else []
+
+    async def run():
+        rows = pet.select().stream_async(chunk_size=3)
+        async for row in rows:
+            break
+        await rows.aclose()
+        return row, database.async_pool.stats
+
+    row, stats = asyncio.run(run())
+    assert row.get(pet.Name) == 'Pet-0'
+    assert (stats['in_use'], stats['size'], stats['discarded']) == (0, 0, 1)
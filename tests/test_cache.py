@@ -0,0 +1,87 @@
+from time import sleep
+
+import EasySQL
+
+
+def make_tables(database, **attributes):
+    class Owner(EasySQL.EasyTable, database=database, name='Owner'):
+        ID = EasySQL.EasyColumn('ID', EasySQL.Types.BIGINT, EasySQL.PRIMARY, EasySQL.AUTO_INCREMENT)
+        Name = EasySQL.EasyColumn('Name', EasySQL.Types.STRING(32))
+
+    owner = Owner()
+
+    class Pet(EasySQL.EasyTable, database=database, name='Pet', **attributes):
+        ID = EasySQL.EasyColumn('ID', EasySQL.Types.BIGINT, EasySQL.PRIMARY, EasySQL.AUTO_INCREMENT)
+        Name = EasySQL.EasyColumn('Name', EasySQL.Types.STRING(32))
+        Owner = EasySQL.EasyForeignColumn('Owner', owner, owner.ID)
+
+    return owner, Pet()
+
+
+def reads(server, table='Pet'):
+    return len([entry for entry in server.statements('SELECT') if f'FROM {table}' in entry[2]])
+
+
+def test_repeated_select_is_served_from_the_cache_until_a_write(make_database, server):
+    owner, pet = make_tables(make_database(_result_cache_size=1 << 20))
+
+    pet.select().execute()
+    pet.select().execute()
+    assert reads(server) == 1
+
+    owner.insert('Sam').into(owner.Name).execute()
+    pet.select().execute()
+    assert reads(server) == 1
+
+    pet.insert('Rex').into(pet.Name).execute()
+    pet.select().execute()
+    assert reads(server) == 2
+
+
+def test_write_to_a_joined_table_invalidates_the_join(make_database, server):
+    owner, pet = make_tables(make_database(_result_cache_size=1 << 20))
+
+    for _ in range(2):
+        select = pet.select().join(owner)
+        select.execute()
+    assert reads(server) == 1
+
+    owner.delete(owner.ID.is_equal(1)).execute()
+    pet.select().join(owner).execute()
+    assert reads(server) == 2
+
+
+def test_transaction_reads_bypass_the_cache_and_invalidate_when_it_ends(make_database, server):
+    database = make_database(_result_cache_size=1 << 20)
+    owner, pet = make_tables(database)
+    pet.select().execute()
+
+    with database.transaction():
+        pet.update(pet.Name).to('Max').where(pet.ID.is_equal(1)).execute()
+        pet.select().execute()
+    assert reads(server) == 2
+
+    pet.select().execute()
+    assert reads(server) == 3
+
+
+def test_cached_rows_expire(make_database, server):
+    owner, pet = make_tables(make_database(_result_cache_size=1 << 20, _result_cache_ttl=0.05))
+
+    pet.select().execute()
+    sleep(0.06)
+    pet.select().execute()
+    assert reads(server) == 2
+
+
+def test_identity_map_is_invalidated_by_writes(make_database, server):
+    owner, pet = make_tables(make_database(), identity_map_size=16)
+    server.respond = lambda connection, operation, params: [(1, 'Rex', None)] if operation.startswith('SELECT ID') else []
+
+    assert pet.get(1).get(pet.Name) == 'Rex'
+    assert pet.get(1) is pet.get_many([1])[0]
+    assert reads(server) == 1
+
+    pet.update(pet.Name).to('Max').where(pet.ID.is_equal(1)).execute()
+    pet.get(1)
+    assert reads(server) == 2
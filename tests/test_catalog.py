@@ -0,0 +1,63 @@
+import json
+
+import EasySQL
+
+CATALOG = {
+    'information_schema.TABLES': [('Pet', 'utf8mb4_general_ci'), ('Owner', 'utf8mb4_general_ci')],
+    'information_schema.COLUMNS': [('Owner', 'ID', 'bigint', 'NO', 'PRI', None), ('Pet', 'ID', 'bigint', 'NO', 'PRI', None),
+                                   ('Pet', 'Name', 'varchar(32)', 'YES', '', None)],
+    'information_schema.STATISTICS': [('Owner', 'PRIMARY', 'ID', None), ('Pet', 'PRIMARY', 'ID', None)],
+}
+
+
+def answer(checksum=('3', '11', '22', '33')):
+    def respond(connection, operation, params):
+        if operation.startswith('SELECT (SELECT COUNT(*)'):
+            return [checksum]
+        if operation.startswith('SELECT TABLE_NAME'):
+            return next(rows for name, rows in CATALOG.items() if name in operation)
+        return []
+
+    return respond
+
+
+def prepare(database):
+    class Pet(EasySQL.EasyTable, database=database, name='Pet'):
+        pass
+
+    class Owner(EasySQL.EasyTable, database=database, name='Owner'):
+        pass
+
+    return Pet(), Owner()
+
+
+def catalog_reads(server):
+    return [entry for entry in server.log if 'information_schema.' in entry[2] and 'SCHEMATA' not in entry[2]]
+
+
+def test_tables_are_prepared_from_one_batched_catalog_read(make_database, server):
+    server.respond = answer()
+    pet, owner = prepare(make_database())
+
+    assert [column.name for column in pet.columns] == ['ID', 'Name']
+    assert [column.name for column in owner.columns] == ['ID']
+    assert len(catalog_reads(server)) == 3
+    assert not server.statements('DESCRIBE') and not server.statements('SHOW TABLES')
+
+
+def test_snapshot_is_read_again_when_the_checksum_changed(make_database, server, tmp_path):
+    path = tmp_path / 'schema.json'
+    server.respond = answer()
+    prepare(make_database(_schema_snapshot=str(path)))
+    assert json.loads(path.read_text())['checksum'] == ['3', '11', '22', '33']
+
+    # A matching checksum reuses the snapshot, only the checksum query runs
+    server.log.clear()
+    prepare(make_database(_schema_snapshot=str(path)))
+    assert len(catalog_reads(server)) == 1
+
+    server.log.clear()
+    server.respond = answer(('4', '12', '22', '33'))
+    prepare(make_database(_schema_snapshot=str(path)))
+    assert len(catalog_reads(server)) == 4
+    assert json.loads(path.read_text())['checksum'] == ['4', '12', '22', '33']
@@ -0,0 +1,42 @@
+import pytest
+
+import EasySQL
+
+
+def make_table(database):
+    class Pet(EasySQL.EasyTable, database=database, name='Pet'):
+        ID = EasySQL.EasyColumn('ID', EasySQL.Types.BIGINT, EasySQL.PRIMARY, EasySQL.AUTO_INCREMENT)
+        Age = EasySQL.EasyColumn('Age', EasySQL.Types.INT)
+
+    return Pet()
+
+
+def test_in_chunks_stops_after_a_short_chunk(make_database, server):
+    pet = make_table(make_database())
+    remaining = [25]
+
+    def respond(connection, operation, params):
+        if not operation.startswith('DELETE'):
+            return []
+        removed = min(10, remaining[0])
+        remaining[0] -= removed
+        return [()] * removed
+
+    server.respond = respond
+    progress = []
+    total = pet.delete(pet.Age.is_greater(3)).in_chunks(10, progress=lambda removed, total: progress.append((removed, total)))
+
+    assert total == 25
+    assert progress == [(10, 10), (10, 20), (5, 25)]
+    assert [entry[2] for entry in server.statements('DELETE')] == ['DELETE FROM Pet WHERE Pet.Age > 3 ORDER BY ID LIMIT 10;'] * 3
+
+
+def test_in_chunks_refuses_to_run_inside_a_transaction(make_database, server):
+    database = make_database()
+    pet = make_table(database)
+
+    with database.transaction():
+        with pytest.raises(EasySQL.DatabaseSafetyException):
+            pet.delete(pet.Age.is_greater(3)).in_chunks(10)
+
+    assert not server.statements('DELETE')
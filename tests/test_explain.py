@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+import EasySQL
+import EasySQL.Explain
+
+PLAN = {
+    'query_block': {
+        'cost_info': {'query_cost': '12.50'},
+        'ordering_operation': {
+            'using_filesort': True,
+            'nested_loop': [
+                {'table': {'table_name': 'Pet', 'access_type': 'ALL', 'rows_examined_per_scan': 2400, 'filtered': '10.00',
+                           'attached_condition': '(`test`.`Pet`.`Age` > 3)'}},
+                {'table': {'table_name': 'Owner', 'access_type': 'eq_ref', 'key': 'PRIMARY', 'possible_keys': ['PRIMARY'],
+                           'rows_examined_per_scan': 1}},
+            ],
+        },
+    },
+}
+
+
+def make_table(database):
+    class Pet(EasySQL.EasyTable, database=database, name='Pet'):
+        ID = EasySQL.EasyColumn('ID', EasySQL.Types.BIGINT, EasySQL.PRIMARY, EasySQL.AUTO_INCREMENT)
+        Age = EasySQL.EasyColumn('Age', EasySQL.Types.INT)
+
+    return Pet()
+
+
+@pytest.fixture
+def explained(server):
+    server.respond = lambda connection, operation, params: [(json.dumps(PLAN),)] if operation.startswith('EXPLAIN') else []
+    return server
+
+
+def test_plan_is_parsed_from_the_json_document():
+    plan = EasySQL.QueryPlan(json.dumps(PLAN))
+
+    assert [(table.table, table.access_type, table.key, table.rows) for table in plan.tables] == [
+        ('Pet', 'ALL', None, 2400), ('Owner', 'eq_ref', 'PRIMARY', 1)]
+    assert plan.tables[0].filtered == 10.0
+    assert (plan.full_scan, plan.filesort, plan.temporary, plan.rows, plan.cost) == (True, True, False, 2400, 12.5)
+
+
+def test_sampler_explains_the_sampled_fraction(make_database, explained, monkeypatch):
+    database = make_database(_explain_sample_rate=0.5, _explain_max_rows=1000)
+    pet = make_table(database)
+    draws = iter([0.1, 0.9, 0.3, 0.7])
+    monkeypatch.setattr(EasySQL.Explain, 'random', lambda: next(draws))
+    explained.log.clear()
+
+    for age in range(4):
+        pet.select().where(pet.Age.is_greater(age)).execute()
+    pet.insert(1, 2).execute()
+
+    assert len(explained.statements('EXPLAIN')) == 2
+    finding = database.plan_findings()['SELECT * FROM Pet WHERE Pet.Age > %s']
+    assert (finding['count'], finding['reasons']) == (2, ['full scan', '2400 rows examined'])
+
+
+def test_sampler_explains_every_statement_over_the_threshold(make_database, explained):
+    database = make_database(_explain_threshold=0.0)
+    pet = make_table(database)
+    explained.log.clear()
+
+    pet.select().execute()
+    pet.select().execute()
+
+    assert len(explained.statements('EXPLAIN')) == 2
@@ -0,0 +1,26 @@
+import EasySQL
+
+
+def make_table(database):
+    class Pet(EasySQL.EasyTable, database=database, name='Pet'):
+        ID = EasySQL.EasyColumn('ID', EasySQL.Types.BIGINT, EasySQL.PRIMARY, EasySQL.AUTO_INCREMENT)
+        Name = EasySQL.EasyColumn('Name', EasySQL.Types.STRING(32))
+
+    return Pet()
+
+
+def test_get_many_pads_chunks_to_fixed_sizes(make_database, server):
+    pet = make_table(make_database(_prepared=True))
+    server.respond = lambda connection, operation, params: [(key, f'Pet-{key}') for key in dict.fromkeys(params)] if ' IN ' in operation else []
+
+    rows = pet.get_many(range(600))
+    assert [row.get(pet.Name) for row in rows] == [f'Pet-{key}' for key in range(600)]
+
+    selects = server.statements('SELECT ID, Name FROM Pet')
+    assert [len(entry[3]) for entry in selects] == [512, 128]
+    assert selects[1][3][-41:] == (599,) * 41
+    assert all(entry[4] for entry in selects)
+
+    server.log.clear()
+    pet.get_many([1, 2, 2, 3])
+    assert [len(entry[3]) for entry in server.statements('SELECT')] == [8]
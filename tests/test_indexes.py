@@ -0,0 +1,52 @@
+import pytest
+
+import EasySQL
+
+
+def prepare(database, alter=True):
+    class Pet(EasySQL.EasyTable, database=database, name='Pet'):
+        ID = EasySQL.EasyColumn('ID', EasySQL.Types.BIGINT, EasySQL.PRIMARY)
+        Name = EasySQL.EasyColumn('Name', EasySQL.Types.STRING(32))
+        ByName = EasySQL.Index(Name, prefix_lengths=(8,))
+
+    pet = Pet(auto_prepare=False)
+    pet.prepare(alter)
+    return pet
+
+
+@pytest.fixture
+def statistics(server):
+    rows = []
+
+    def respond(connection, operation, params):
+        if 'information_schema.TABLES' in operation:
+            return [('Pet', 'utf8mb4_general_ci')]
+        if 'information_schema.COLUMNS' in operation:
+            return [('Pet', 'ID', 'bigint', 'NO', 'PRI', None), ('Pet', 'Name', 'varchar(32)', 'YES', '', None)]
+        if 'information_schema.STATISTICS' in operation:
+            return [('Pet', 'PRIMARY', 'ID', None)] + rows
+        return []
+
+    server.respond = respond
+    return rows
+
+
+@pytest.mark.parametrize('rows, alter', [
+    ([('Pet', 'index_Name', 'Name', 8)], True),
+    ([('Pet', 'pet_name', 'Name', 8)], True),
+    ([('Pet', 'index_Name', 'Name', None)], True),
+    ([], False),
+])
+def test_existing_indexes_are_left_as_they_are(make_database, server, statistics, rows, alter):
+    statistics.extend(rows)
+    prepare(make_database(), alter)
+
+    assert not server.statements('ALTER TABLE')
+
+
+def test_missing_index_is_added_from_the_statistics(make_database, server, statistics):
+    statistics.append(('Pet', 'pet_name', 'ID', None))
+    prepare(make_database())
+
+    assert [entry[2] for entry in server.statements('ALTER TABLE')] == ['ALTER TABLE Pet ADD INDEX index_Name (Name(8));']
+
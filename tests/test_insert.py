@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+import EasySQL
+
+
+def make_table(database):
+    class Pet(EasySQL.EasyTable, database=database, name='Pet'):
+        ID = EasySQL.EasyColumn('ID', EasySQL.Types.BIGINT, EasySQL.PRIMARY, EasySQL.AUTO_INCREMENT)
+        Name = EasySQL.EasyColumn('Name', EasySQL.Types.STRING(255))
+
+    return Pet()
+
+
+@pytest.fixture
+def packet(server):
+    server.respond = lambda connection, operation, params: [(4096,)] if '@@max_allowed_packet' in operation else []
+    return 4096
+
+
+@pytest.mark.parametrize('prepared', [False, True])
+def test_insert_many_splits_batches_by_size(make_database, server, packet, prepared):
+    pet = make_table(make_database(_prepared=prepared))
+
+    pet.insert_many([(f'Pet-{i}',) for i in range(25)], [pet.Name], batch_size=10)
+    inserts = server.statements('INSERT')
+    assert [len(entry[3]) if prepared else entry[2].count("'Pet-") for entry in inserts] == [10, 10, 5]
+    server.log.clear()
+
+    pet.insert_many([('x' * 1000,) for _ in range(10)], [pet.Name], batch_size=10)
+    inserts = server.statements('INSERT')
+    assert len(inserts) == 4
+    if prepared:
+        assert [len(entry[3]) for entry in inserts] == [3, 3, 3, 1]
+    else:
+        assert all(len(entry[2]) < packet for entry in inserts)
+
+
+def test_load_refuses_to_run_without_local_infile(make_database, server):
+    pet = make_table(make_database())
+
+    with pytest.raises(EasySQL.DatabaseSafetyException):
+        pet.load([('Rex',)], [pet.Name])
+    assert not server.statements('LOAD')
+
+
+def test_load_streams_rows_into_a_tab_separated_file(make_database, server):
+    pet = make_table(make_database(_local_infile=True))
+    files = []
+    server.respond = lambda connection, operation, params: files.append(open(params[0]).read()) if operation.startswith('LOAD') else []
+
+    report = pet.load([('Rex',), ('Tab\there',), (None,)], [pet.Name], mode='replace')
+
+    assert report['rows'] == 3
+    assert files == ['Rex\nTab\\there\n\\N\n']
+    assert server.statements('LOAD')[0][2].startswith('LOAD DATA LOCAL INFILE %s REPLACE INTO TABLE Pet')
+    # The temporary file is removed once the rows are loaded
+    assert not os.path.exists(server.statements('LOAD')[0][3][0])
@@ -0,0 +1,86 @@
+import pytest
+
+import EasySQL
+from EasySQL.Columnar import fetch_columns
+
+
+def make_tables(database):
+    class Owner(EasySQL.EasyTable, database=database, name='Owner'):
+        ID = EasySQL.EasyColumn('ID', EasySQL.Types.BIGINT, EasySQL.PRIMARY, EasySQL.AUTO_INCREMENT)
+        Name = EasySQL.EasyColumn('Name', EasySQL.Types.STRING(32))
+
+    owner = Owner()
+
+    class Pet(EasySQL.EasyTable, database=database, name='Pet'):
+        ID = EasySQL.EasyColumn('ID', EasySQL.Types.BIGINT, EasySQL.PRIMARY, EasySQL.AUTO_INCREMENT)
+        Name = EasySQL.EasyColumn('Name', EasySQL.Types.STRING(32))
+        Owner = EasySQL.EasyForeignColumn('Owner', owner, owner.ID)
+
+    return owner, Pet()
+
+
+def test_join_follows_the_foreign_column(make_database):
+    owner, pet = make_tables(make_database())
+
+    select = pet.select().join(owner, left=True)
+    assert select.get_value() == ('SELECT Pet.ID, Pet.Name, Pet.Owner, Owner.ID, Owner.Name FROM Pet '
+                                  'LEFT JOIN Owner ON Pet.Owner = Owner.ID;')
+    select.no_cache()._executed = True
+
+
+def test_same_named_columns_of_joined_tables_do_not_share_templates(make_database):
+    owner, pet = make_tables(make_database())
+
+    by_pet = pet.select().join(owner).order(pet.Name)
+    by_owner = pet.select().join(owner).order(owner.Name)
+    assert by_pet.get_value().endswith('ORDER BY Pet.Name;')
+    assert by_owner.get_value().endswith('ORDER BY Owner.Name;')
+
+    grouped_by_owner = pet.select(pet.ID.count()).join(owner).group_by(owner.Name)
+    grouped_by_pet = pet.select(pet.ID.count()).join(owner).group_by(pet.Name)
+    assert 'GROUP BY Owner.Name' in grouped_by_owner.get_value()
+    assert 'GROUP BY Pet.Name' in grouped_by_pet.get_value()
+
+    for select in (by_pet, by_owner, grouped_by_owner, grouped_by_pet):
+        select._executed = True
+
+
+def test_grouped_join_selects_only_the_grouped_and_aggregate_columns(make_database):
+    owner, pet = make_tables(make_database())
+
+    select = pet.select().join(owner).group_by(owner.Name)
+    assert select.get_value().startswith('SELECT Owner.Name FROM Pet JOIN Owner')
+    select._executed = True
+
+    select = pet.select(pet.ID.count()).join(owner).group_by(owner.Name)
+    assert select.get_value().startswith('SELECT COUNT(Pet.ID) FROM Pet JOIN Owner')
+    select._executed = True
+
+
+def test_rows_of_a_join_read_both_tables(make_database, server):
+    owner, pet = make_tables(make_database())
+    server.respond = lambda connection, operation, params: [(1, 'Rex', 7, 7, 'Sam')] if operation.startswith('SELECT Pet.ID') else []
+
+    data = pet.select().join(owner).execute()
+    assert (data.get(pet.Name), data.get(owner.Name), data.get('Owner.ID')) == ('Rex', 'Sam', 7)
+
+
+def test_columns_of_a_join_are_keyed_by_their_tables(make_database, server):
+    pytest.importorskip('numpy')
+    owner, pet = make_tables(make_database())
+    server.respond = lambda connection, operation, params: [(1, 'Rex', 7, 7, 'Ann'), (2, 'Sam', None, None, None)] if 'JOIN' in operation else []
+
+    columns = pet.select().join(owner, left=True).to_columns()
+
+    assert list(columns) == ['Pet.ID', 'Pet.Name', 'Pet.Owner', 'Owner.ID', 'Owner.Name']
+    assert list(columns['Pet.Name']) == ['Rex', 'Sam']
+    assert list(columns['Owner.Name'].mask) == [False, True]
+    assert list(pet.select().to_columns()) == ['ID', 'Name', 'Owner']
+
+
+def test_columns_selected_twice_are_refused(make_database, server):
+    pytest.importorskip('numpy')
+    owner, pet = make_tables(make_database())
+
+    with pytest.raises(ValueError):
+        fetch_columns([], [pet.Name, pet.Name])
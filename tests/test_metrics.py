@@ -0,0 +1,64 @@
+import mysql.connector
+import pytest
+
+import EasySQL
+
+
+def make_table(database):
+    class Pet(EasySQL.EasyTable, database=database, name='Pet'):
+        ID = EasySQL.EasyColumn('ID', EasySQL.Types.BIGINT, EasySQL.PRIMARY, EasySQL.AUTO_INCREMENT)
+        Age = EasySQL.EasyColumn('Age', EasySQL.Types.INT)
+
+    return Pet()
+
+
+def test_hooks_see_every_statement_including_the_failed_ones(make_database, server):
+    database = make_database()
+    pet = make_table(database)
+    before, after = [], []
+    database.on_before_execute(lambda event: before.append((event.command, event.table, event.duration)))
+
+    @database.on_after_execute
+    def record(event):
+        after.append((event.command, event.table, event.shape, event.params, event.rows, event.error))
+        raise RuntimeError('hooks never break a statement')
+
+    server.respond = lambda connection, operation, params: [(1, 3), (2, 5)]
+    assert len(pet.select().where(pet.Age.is_greater(2)).execute()) == 2
+
+    server.down.add('127.0.0.1')
+    with pytest.raises(mysql.connector.errors.OperationalError):
+        pet.select().execute()
+
+    assert before == [('Select', 'Pet', None), ('Select', 'Pet', None)]
+    assert after[0] == ('Select', 'Pet', 'SELECT * FROM Pet WHERE Pet.Age > %s', (2,), 2, None)
+    assert isinstance(after[1][-1], mysql.connector.errors.OperationalError)
+
+    database.remove_hook(record)
+    server.down.clear()
+    pet.select().execute()
+    assert len(after) == 2
+
+
+def test_histogram_counts_each_duration_in_its_bucket():
+    histogram = EasySQL.LatencyHistogram()
+    for seconds in (0.00005, 0.00015, 0.00015, 0.003, 100.0):
+        histogram.record(seconds)
+
+    snapshot = histogram.snapshot()
+    assert snapshot['buckets'] == {0.0001: 1, 0.0002: 2, 0.0032: 1, float('inf'): 1}
+    assert (snapshot['count'], snapshot['max'], snapshot['p50'], snapshot['p99']) == (5, 100.0, 0.0002, 100.0)
+    assert EasySQL.LatencyHistogram().quantile(0.5) == 0.0
+
+
+def test_latency_snapshot_is_kept_by_table_and_command(make_database, server):
+    database = make_database(_latency_histograms=True)
+    pet = make_table(database)
+
+    pet.select().execute()
+    pet.select().execute()
+    pet.delete(pet.ID.is_equal(1)).execute()
+
+    snapshot = database.latency_snapshot()
+    assert snapshot['Pet']['Select']['count'] == 2
+    assert snapshot['Pet']['Delete']['count'] == 1
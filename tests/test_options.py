@@ -0,0 +1,20 @@
+import EasySQL
+
+
+def test_falsy_keywords_override_the_defaults(server):
+    class Database(EasySQL.EasyDatabase, database='test', password='', auto_connect=False, schema_catalog=False, pool_min_size=0,
+                   read_your_writes=0, prepared=False):
+        pass
+
+    assert Database._schema_catalog is False
+    assert Database._pool_min_size == 0
+    assert Database._read_your_writes == 0
+    assert Database._auto_connect is False
+    assert Database._host == '127.0.0.1'
+
+
+def test_none_keyword_keeps_the_default(server):
+    class Database(EasySQL.EasyDatabase, database='test', password='', host=None):
+        pass
+
+    assert Database._host == '127.0.0.1'
@@ -0,0 +1,68 @@
+import pytest
+
+import EasySQL
+
+
+def make_table(database):
+    class Pet(EasySQL.EasyTable, database=database, name='Pet'):
+        ID = EasySQL.EasyColumn('ID', EasySQL.Types.BIGINT, EasySQL.PRIMARY, EasySQL.AUTO_INCREMENT)
+        Name = EasySQL.EasyColumn('Name', EasySQL.Types.STRING(32), EasySQL.NOT_NULL)
+        Age = EasySQL.EasyColumn('Age', EasySQL.Types.INT)
+
+    return Pet()
+
+
+def test_token_continues_after_the_last_row(make_database, server):
+    pet = make_table(make_database(_prepared=True))
+    server.respond = lambda connection, operation, params: [(1, 'Rex', 3), (2, 'Sam', 4)]
+
+    select = pet.select().order(pet.Name)
+    page = select.paginate(2)
+    assert page.token is not None
+
+    select.after(page.token).paginate(2)
+    operation, params = server.statements('SELECT')[-1][2:4]
+    assert 'WHERE (Pet.Name, Pet.ID) > (%s, %s) ORDER BY Name, ID' in operation
+    assert params == ('Sam', 2, 2)
+
+
+def test_last_page_has_no_token(make_database, server):
+    pet = make_table(make_database())
+    server.respond = lambda connection, operation, params: [(1, 'Rex', 3)]
+
+    assert pet.select().paginate(2).token is None
+
+
+def test_token_of_another_order_is_rejected(make_database, server):
+    pet = make_table(make_database())
+    server.respond = lambda connection, operation, params: [(1, 'Rex', 3), (2, 'Sam', 4)]
+
+    token = pet.select().order(pet.Name).paginate(2).token
+    with pytest.raises(ValueError):
+        pet.select().order(pet.Age).after(token).paginate(2)
+    with pytest.raises(ValueError):
+        pet.select().after('not a token').paginate(2)
+
+
+@pytest.mark.parametrize('descending, age, condition, params', [
+    (False, 4, '((Pet.Age > %s) OR (Pet.Age = %s AND Pet.ID > %s))', (4, 4, 2)),
+    (False, None, '((Pet.Age IS NOT NULL) OR (Pet.Age IS NULL AND Pet.ID > %s))', (2,)),
+    (True, 4, '(((Pet.Age < %s OR Pet.Age IS NULL)) OR (Pet.Age = %s AND Pet.ID < %s))', (4, 4, 2)),
+    (True, None, '((Pet.Age IS NULL AND Pet.ID < %s))', (2,)),
+])
+def test_nullable_order_column_is_compared_null_safely(make_database, server, descending, age, condition, params):
+    pet = make_table(make_database(_prepared=True))
+    server.respond = lambda connection, operation, params: [(1, 'Rex', 3), (2, 'Sam', age)]
+
+    select = pet.select().order(pet.Age)
+    if descending:
+        select = select.descending()
+    token = select.paginate(2).token
+
+    select.after(token).paginate(2)
+    operation, bound = server.statements('SELECT')[-1][2:4]
+    assert f'WHERE {condition} ORDER BY' in operation
+    assert bound == params + (2,)
+
+    inline = EasySQL.WhereIsAfter((pet.Age, pet.ID), (age, 2), descending).value
+    assert '%s' not in inline and inline.count('Pet.ID') == 1
@@ -0,0 +1,65 @@
+from time import monotonic
+
+import pytest
+
+from EasySQL import DatabaseConnectionException
+
+
+def test_checkout_times_out_while_server_is_down(server, make_database):
+    server.down.add('127.0.0.1')
+    database = make_database(_auto_connect=True, _auto_connect_delay=0.05, _pool_timeout=0.3)
+
+    start = monotonic()
+    with pytest.raises(DatabaseConnectionException):
+        database.execute_command('SELECT 1;')
+
+    assert monotonic() - start < 1.0
+    assert server.connects > 1
+    assert database.pool.stats['size'] == 0
+
+
+def test_checkout_connects_once_server_is_back(server, make_database):
+    database = make_database(_auto_connect=True, _auto_connect_delay=0.05, _pool_timeout=5.0)
+    server.down.add('127.0.0.1')
+    with pytest.raises(DatabaseConnectionException):
+        database.pool.checkout(timeout=0.1)
+
+    server.down.clear()
+    database.execute_command('SELECT 1;')
+    assert server.statements('SELECT 1')
+
+
+def test_checkout_times_out_on_exhausted_pool(server, make_database):
+    database = make_database(_pool_max_size=1)
+
+    with database.pool.connection():
+        with pytest.raises(DatabaseConnectionException):
+            database.pool.checkout(timeout=0.05)
+
+    assert database.pool.stats['timeouts'] == 1
+    assert database.pool.stats['in_use'] == 0
+
+
+def test_uncommitted_statement_outside_transaction_is_committed(server, make_database, caplog):
+    database = make_database()
+
+    database.execute_command('DELETE FROM Pet;', auto_commit=False)
+    assert 'auto_commit=False is ignored' in caplog.text
+    assert [entry[2] for entry in server.log] == ['DELETE FROM Pet;']
+
+    server.log.clear()
+    with database.transaction():
+        database.execute_command('DELETE FROM Pet;', auto_commit=False)
+    assert [entry[2] for entry in server.log] == ['START TRANSACTION', 'DELETE FROM Pet;', 'COMMIT']
+
+
+def test_legacy_connection_warns(server, make_database):
+    database = make_database()
+
+    with pytest.deprecated_call():
+        connection = database.connection
+    with pytest.deprecated_call():
+        database.cursor.execute('SELECT 1;')
+
+    assert connection.is_connected()
+    assert database.pool.stats['size'] == 0
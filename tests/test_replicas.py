@@ -0,0 +1,160 @@
+import asyncio
+import threading
+from time import sleep
+
+import mysql.connector
+import pytest
+
+import EasySQL
+
+
+def make_table(database):
+    class Pet(EasySQL.EasyTable, database=database, name='Pet'):
+        ID = EasySQL.EasyColumn('ID', EasySQL.Types.BIGINT, EasySQL.PRIMARY, EasySQL.AUTO_INCREMENT)
+        Name = EasySQL.EasyColumn('Name', EasySQL.Types.STRING(32))
+
+    return Pet()
+
+
+def read_hosts(server, pet, count=1):
+    server.log.clear()
+    for _ in range(count):
+        pet.select().execute()
+    return [entry[0] for entry in server.statements('SELECT')]
+
+
+def test_reads_are_spread_over_the_replicas(make_database, server):
+    pet = make_table(make_database(_replicas=['replica1', 'replica2'], _read_your_writes=0.0))
+
+    assert sorted(read_hosts(server, pet, 4)) == ['replica1', 'replica1', 'replica2', 'replica2']
+
+
+def test_failing_replica_is_ejected_and_the_primary_answers(make_database, server):
+    database = make_database(_replicas=['replica1'], _read_your_writes=0.0)
+    pet = make_table(database)
+    server.down.add('replica1')
+
+    assert read_hosts(server, pet, 2) == ['127.0.0.1', '127.0.0.1']
+    assert database.replicas.stats[0]['failures'] == 1
+    assert database.replicas.stats[0]['ejected_for'] > 0
+
+
+def test_busy_replica_is_skipped_without_ejection(make_database, server):
+    database = make_database(_replicas=['replica1'], _read_your_writes=0.0, _pool_max_size=1, _pool_timeout=0.05)
+    pet = make_table(database)
+    replica = next(iter(database.replicas))
+
+    with replica.pool.connection():
+        assert read_hosts(server, pet) == ['127.0.0.1']
+
+    assert replica.failures == 0
+    assert read_hosts(server, pet) == ['replica1']
+
+
+def wait_for_probe(timeout=1.0):
+    for thread in threading.enumerate():
+        if thread.name.startswith('EasySQL-probe-'):
+            thread.join(timeout)
+
+
+def test_ejected_replica_is_probed_before_it_is_back(make_database, server):
+    database = make_database(_replicas=['replica1'], _read_your_writes=0.0, _replica_eject_time=0.05)
+    pet = make_table(database)
+    server.down.add('replica1')
+    read_hosts(server, pet)
+
+    sleep(0.06)
+    assert read_hosts(server, pet) == ['127.0.0.1']
+    wait_for_probe()
+    assert database.replicas.stats[0]['failures'] == 2
+
+    server.down.clear()
+    sleep(0.06)
+    # The read starts the probe without waiting for it, the replica is back once the probe succeeded
+    read_hosts(server, pet)
+    wait_for_probe()
+    assert read_hosts(server, pet) == ['replica1']
+
+
+def test_statement_error_does_not_eject_the_replica(make_database, server):
+    database = make_database(_replicas=['replica1'], _read_your_writes=0.0)
+    pet = make_table(database)
+
+    def respond(connection, operation, params):
+        if connection.host == 'replica1' and operation.startswith('SELECT'):
+            raise mysql.connector.errors.DatabaseError('Lock wait timeout exceeded', errno=1205)
+        return []
+
+    server.respond = respond
+    with pytest.raises(mysql.connector.errors.DatabaseError):
+        pet.select().execute()
+
+    assert database.replicas.stats[0]['failures'] == 0
+    assert database.replicas.stats[0]['ejected_for'] == 0
+
+
+def test_replica_connect_is_bound_by_the_checkout_deadline(make_database, server, monkeypatch):
+    connects = []
+    pet = make_table(make_database(_replicas=['replica1'], _read_your_writes=0.0, _pool_timeout=2.5))
+
+    def connect(**options):
+        connects.append(options)
+        return server.connect(**options)
+
+    monkeypatch.setattr(mysql.connector, 'connect', connect)
+    pet.select().execute()
+
+    assert [options['connection_timeout'] for options in connects if options['host'] == 'replica1'] == [3]
+
+
+def test_reads_follow_recent_writes_to_the_primary(make_database, server):
+    pet = make_table(make_database(_replicas=['replica1'], _read_your_writes=60.0))
+
+    assert read_hosts(server, pet) == ['replica1']
+    pet.delete(pet.ID.is_equal(1)).execute()
+    assert read_hosts(server, pet) == ['127.0.0.1']
+
+
+def cached_database(make_database, server):
+    database = make_database(_replicas=['replica1'], _read_your_writes=60.0, _result_cache_size=1 << 20)
+    pet = make_table(database)
+    server.respond = lambda connection, operation, params: [(1, connection.host)] if operation.startswith('SELECT') else []
+    return database, pet
+
+
+def names(select):
+    return [data.get('Name') for data in select.execute()]
+
+
+def test_primary_reads_skip_rows_cached_from_a_replica(make_database, server):
+    database, pet = cached_database(make_database, server)
+
+    assert names(pet.select()) == ['replica1']
+    assert names(pet.select().on_primary()) == ['127.0.0.1']
+    assert names(pet.select().on_primary()) == ['127.0.0.1']
+    assert len(server.statements('SELECT * FROM Pet')) == 2
+
+
+def test_read_your_writes_skips_rows_another_thread_cached_from_a_replica(make_database, server):
+    database, pet = cached_database(make_database, server)
+    pet.select().execute()
+
+    pet.delete(pet.ID.is_equal(2)).execute()
+    reader = threading.Thread(target=lambda: pet.select().execute())
+    reader.start()
+    reader.join()
+    assert [entry[0] for entry in server.statements('SELECT * FROM Pet')] == ['replica1', 'replica1']
+
+    assert names(pet.select()) == ['127.0.0.1']
+
+
+def test_async_reads_are_spread_over_the_replicas(make_database, server):
+    pet = make_table(make_database(base=EasySQL.AsyncEasyDatabase, _replicas=['replica1'], _read_your_writes=0.0))
+
+    async def read():
+        await pet.select().execute_async()
+        return [rows async for rows in pet.select().stream_async()]
+
+    server.log.clear()
+    asyncio.run(read())
+    assert [entry[0] for entry in server.statements('SELECT')] == ['replica1', 'replica1']
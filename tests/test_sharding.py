@@ -0,0 +1,159 @@
+import pytest
+
+import EasySQL
+
+
+def make_table(make_database, **attributes):
+    shards = [make_database('shard0'), make_database('shard1')]
+
+    class Pet(EasySQL.ShardedTable, shards=shards, shard_key='Owner', name='Pet', **attributes):
+        ID = EasySQL.EasyColumn('ID', EasySQL.Types.BIGINT, EasySQL.PRIMARY)
+        Owner = EasySQL.EasyColumn('Owner', EasySQL.Types.BIGINT, EasySQL.NOT_NULL)
+        Name = EasySQL.EasyColumn('Name', EasySQL.Types.STRING(32))
+
+    return Pet()
+
+
+def shards_of(server, prefix):
+    return [entry[1] for entry in server.statements(prefix) 
+            if any(target in entry[2] for target in ('FROM Pet', 'INTO Pet', 'UPDATE Pet'))]
+
+
+def test_inserts_and_pinned_selects_go_to_the_shard_of_the_key(make_database, server):
+    pet = make_table(make_database)
+
+    pet.insert(1, 4, 'Rex').into(pet.ID, pet.Owner, pet.Name).execute()
+    pet.insert(2, 5, 'Sam').into(pet.ID, pet.Owner, pet.Name).execute()
+    assert shards_of(server, 'INSERT') == ['shard0', 'shard1']
+
+    pet.select().where(pet.Owner.is_equal(5)).execute()
+    assert shards_of(server, 'SELECT') == ['shard1']
+
+    server.log.clear()
+    pet.select().where(pet.Owner.is_in([4, 5]) & pet.Name.is_equal('Rex')).execute()
+    pet.select().where(pet.Name.is_equal('Rex')).execute()
+    assert sorted(shards_of(server, 'SELECT')) == ['shard0', 'shard0', 'shard1', 'shard1']
+    pet.close()
+
+
+def test_scattered_rows_are_merged_by_the_collation(make_database, server):
+    pet = make_table(make_database)
+    rows = {'shard0': [(1, 4, 'apple'), (3, 4, 'Émile')], 'shard1': [(2, 5, 'Banana'), (4, 5, 'zebra')]}
+    server.respond = lambda connection, operation, params: rows[connection.options['database']] if operation.startswith('SELECT') else []
+
+    names = [data.get(pet.Name) for data in pet.select().order(pet.Name).limit(3).execute()]
+    assert names == ['apple', 'Banana', 'Émile']
+    pet.close()
+
+
+def test_close_stops_the_scatter_threads_until_they_are_needed(make_database, server):
+    pet = make_table(make_database)
+    assert pet.shards._executor is None
+
+    pet.select().execute()
+    executor = pet.shards._executor
+    assert executor is not None
+
+    pet.close()
+    assert pet.shards._executor is None and executor._shutdown
+
+    pet.select().execute()
+    assert pet.shards._executor is not None
+    pet.close()
+
+
+def test_get_many_reads_every_shard_without_the_shard_key(make_database, server):
+    pet = make_table(make_database)
+    rows = {'shard0': [(1, 4, 'Rex')], 'shard1': [(2, 5, 'Sam')]}
+    server.respond = lambda connection, operation, params: rows[connection.options['database']] if ' IN ' in operation else []
+
+    found = pet.get_many([1, 2, 3])
+    assert [data and data.get(pet.Name) for data in found] == ['Rex', 'Sam', None]
+    assert sorted(shards_of(server, 'SELECT')) == ['shard0', 'shard1']
+    assert pet.get(2).get(pet.Name) == 'Sam'
+    pet.close()
+
+
+def test_bulk_writes_go_to_the_shard_of_each_row(make_database, server):
+    pet = make_table(make_database)
+
+    pet.insert_many([(1, 4, 'Rex'), (2, 5, 'Sam'), (3, 6, 'Max')], [pet.ID, pet.Owner, pet.Name], batch_size=2)
+    inserts = {entry[1]: entry[2] for entry in server.statements('INSERT')}
+    assert "'Rex'" in inserts['shard0'] and "'Max'" in inserts['shard0'] and "'Sam'" in inserts['shard1']
+
+    server.log.clear()
+    pet.update_many([pet.ID, pet.Owner], [pet.Name], [(1, 4, 'Rexy'), (3, 6, 'Maxy')])
+    assert shards_of(server, 'UPDATE') == ['shard0']
+
+    with pytest.raises(ValueError):
+        pet.update_many([pet.ID], [pet.Owner], [(1, 5)])
+    with pytest.raises(ValueError):
+        pet.insert_many([(1, 'Rex')], [pet.ID, pet.Name])
+    pet.close()
+
+
+def test_load_splits_a_file_by_the_shard_key(make_database, server, tmp_path):
+    shards = [make_database('shard0', _local_infile=True), make_database('shard1', _local_infile=True)]
+
+    class Pet(EasySQL.ShardedTable, shards=shards, shard_key='Owner', name='Pet'):
+        ID = EasySQL.EasyColumn('ID', EasySQL.Types.BIGINT, EasySQL.PRIMARY)
+        Owner = EasySQL.EasyColumn('Owner', EasySQL.Types.BIGINT, EasySQL.NOT_NULL)
+
+    pet = Pet()
+    loaded = {}
+
+    def respond(connection, operation, params):
+        if operation.startswith('LOAD DATA'):
+            with open(params[0]) as file:
+                loaded[connection.options['database']] = file.read()
+        return []
+
+    server.respond = respond
+    source = tmp_path / 'pets.tsv'
+    source.write_text('1\t4\n2\t5\n3\t6\n')
+
+    pet.load(str(source), [pet.ID, pet.Owner])
+    assert loaded == {'shard0': '1\t4\n3\t6\n', 'shard1': '2\t5\n'}
+    pet.close()
+
+
+def test_prefetch_reads_the_shards_of_a_sharded_table(make_database, server):
+    pet = make_table(make_database)
+
+    class Visit(EasySQL.EasyTable, database=make_database('main'), name='Visit'):
+        ID = EasySQL.EasyColumn('ID', EasySQL.Types.BIGINT, EasySQL.PRIMARY)
+        Pet = EasySQL.EasyForeignColumn('Pet', pet, pet.ID)
+
+    visit = Visit()
+    rows = {'main': [(1, 1), (2, 2)], 'shard0': [(1, 4, 'Rex')], 'shard1': [(2, 5, 'Sam')]}
+    server.respond = lambda connection, operation, params: rows[connection.options['database']] if operation.startswith('SELECT') else []
+
+    visits = visit.select().prefetch(visit.Pet).execute()
+    assert [data.related(visit.Pet).get(pet.Name) for data in visits] == ['Rex', 'Sam']
+    pet.close()
+
+
+def test_writes_on_one_shard_count_for_the_identity_map_of_the_table(make_database, server):
+    pet = make_table(make_database, identity_map_size=16)
+    server.respond = lambda connection, operation, params: [(1, 4, 'Rex')] if ' IN ' in operation else []
+    assert pet.get(1).get(pet.Name) == 'Rex'
+
+    generation = pet._generation
+    shard = pet._on(pet._shards[0])
+    shard.invalidate()
+    assert pet._generation == generation + 1
+
+    # A row read while a shard was written is not kept
+    def respond(connection, operation, params):
+        if ' IN ' in operation:
+            shard.invalidate()
+            return [(2, 4, 'Sam')]
+        return []
+
+    server.respond = respond
+    server.log.clear()
+    pet.get(2)
+    pet.get(2)
+    # Both reads ask every shard since the key has no shard key
+    assert len(shards_of(server, 'SELECT')) == 4
+    pet.close()
@@ -0,0 +1,39 @@
+import pytest
+
+
+def test_nested_blocks_roll_back_to_their_savepoint(make_database, server):
+    database = make_database()
+
+    with pytest.raises(ValueError):
+        with database.transaction() as connection:
+            database.execute_command('DELETE FROM Pet WHERE ID = 1;')
+            with database.transaction() as inner:
+                assert inner is connection
+                database.execute_command('DELETE FROM Pet WHERE ID = 2;')
+                with database.transaction():
+                    database.execute_command('DELETE FROM Pet WHERE ID = 3;')
+            with pytest.raises(KeyError):
+                with database.transaction():
+                    raise KeyError
+            raise ValueError
+
+    assert [entry[2] for entry in server.log] == [
+        'START TRANSACTION', 'DELETE FROM Pet WHERE ID = 1;',
+        'SAVEPOINT easysql_0', 'DELETE FROM Pet WHERE ID = 2;',
+        'SAVEPOINT easysql_1', 'DELETE FROM Pet WHERE ID = 3;', 'RELEASE SAVEPOINT easysql_1',
+        'RELEASE SAVEPOINT easysql_0',
+        'SAVEPOINT easysql_0', 'ROLLBACK TO SAVEPOINT easysql_0',
+        'ROLLBACK']
+    assert database.pool.stats['in_use'] == 0
+
+
+def test_transaction_keeps_its_connection_for_every_command(make_database, server):
+    database = make_database(_pool_max_size=2)
+
+    with database.transaction():
+        database.execute_command('DELETE FROM Pet WHERE ID = 1;')
+        database.execute_command('DELETE FROM Pet WHERE ID = 2;')
+        assert database.pool.stats['in_use'] == 1
+
+    assert database.pool.stats['checkouts'] == 1
+    assert [entry[2] for entry in server.log] == ['START TRANSACTION', 'DELETE FROM Pet WHERE ID = 1;', 'DELETE FROM Pet WHERE ID = 2;', 'COMMIT']
@@ -0,0 +1,69 @@
+import pytest
+
+import EasySQL
+
+
+def make_table(database):
+    class Pet(EasySQL.EasyTable, database=database, name='Pet'):
+        ID = EasySQL.EasyColumn('ID', EasySQL.Types.BIGINT, EasySQL.PRIMARY, EasySQL.AUTO_INCREMENT)
+        Name = EasySQL.EasyColumn('Name', EasySQL.Types.STRING(255))
+        Age = EasySQL.EasyColumn('Age', EasySQL.Types.INT)
+
+    return Pet()
+
+
+def test_update_many_binds_the_case_in_column_order(make_database, server):
+    database = make_database(_prepared=True)
+    pet = make_table(database)
+    assert database.max_allowed_packet == 4194304
+    server.log.clear()
+
+    pet.update_many([pet.ID], [pet.Name, pet.Age], [(1, 'Rex', 3), (2, 'Sam', 5)])
+
+    assert [entry[2] for entry in server.log] == [
+        'START TRANSACTION',
+        'UPDATE Pet SET Name = CASE WHEN ID = %s THEN %s WHEN ID = %s THEN %s ELSE Name END, '
+        'Age = CASE WHEN ID = %s THEN %s WHEN ID = %s THEN %s ELSE Age END WHERE ID IN (%s, %s)',
+        'COMMIT']
+    assert server.log[1][3] == (1, 'Rex', 2, 'Sam', 1, 3, 2, 5, 1, 2)
+
+
+def test_update_many_joins_a_temporary_table_for_more_batches(make_database, server):
+    database = make_database(_prepared=True)
+    pet = make_table(database)
+    assert database.max_allowed_packet == 4194304
+    server.log.clear()
+
+    pet.update_many([pet.ID], [pet.Name], [(1, 'Rex'), (2, 'Sam'), (3, 'Max')], batch_size=2)
+
+    assert [entry[2] for entry in server.log] == [
+        'START TRANSACTION',
+        'DROP TEMPORARY TABLE IF EXISTS easysql_update_Pet',
+        'CREATE TEMPORARY TABLE easysql_update_Pet (ID BIGINT, Name VARCHAR(255), PRIMARY KEY (ID))',
+        'INSERT INTO easysql_update_Pet (ID, Name) VALUES (%s, %s), (%s, %s)',
+        'INSERT INTO easysql_update_Pet (ID, Name) VALUES (%s, %s)',
+        'UPDATE Pet JOIN easysql_update_Pet ON Pet.ID = easysql_update_Pet.ID SET Pet.Name = easysql_update_Pet.Name',
+        'DROP TEMPORARY TABLE IF EXISTS easysql_update_Pet',
+        'COMMIT']
+    assert [entry[3] for entry in server.statements('INSERT')] == [(1, 'Rex', 2, 'Sam'), (3, 'Max')]
+
+
+def test_update_many_keeps_prepared_statements_under_the_placeholder_limit(make_database, server):
+    pet = make_table(make_database(_prepared=True))
+
+    pet.update_many([pet.ID], [pet.Name, pet.Age], [(key, 'Pet', 1) for key in range(13108)], batch_size=20000, method='case')
+
+    # Every row binds its key three times and its two values once
+    assert [len(entry[3]) for entry in server.statements('UPDATE')] == [13107 * 5, 5]
+
+
+def test_update_many_keeps_statements_under_max_allowed_packet(make_database, server):
+    server.respond = lambda connection, operation, params: [(4096,)] if '@@max_allowed_packet' in operation else []
+    pet = make_table(make_database())
+
+    pet.update_many([pet.ID], [pet.Name], [(key, 'x' * 500) for key in range(10)], method='case')
+
+    updates = server.statements('UPDATE')
+    assert len(updates) > 1
+    assert all(len(entry[2]) < 4096 for entry in updates)
+    assert sum(entry[2].count("'xxx") for entry in updates) == 10